@@ -0,0 +1,341 @@
+"""
+Database stand-ins for the offline benchmarks.
+
+- fake: an in-process DBAPI spoken to through the real mssql+pyodbc dialect.
+  It answers catalog queries with a synthetic schema of N tables and data
+  queries with pre-built wide/tall result sets, honouring TOP and
+  OFFSET/FETCH, so every tool can run unchanged.
+- sqlite: an in-memory SQLite database with the same Wide/Tall tables.
+  Only portable SQL works there; T-SQL-only cases are skipped.
+"""
+import re
+import sys
+import types
+import uuid
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool, StaticPool
+
+SCHEMAS = ("dbo", "sales", "hr", "ops")
+
+
+@dataclass
+class Dataset:
+    tables: int = 5000
+    wide_columns: int = 60
+    wide_rows: int = 2000
+    tall_rows: int = 10000
+    seed: int = 42
+
+
+def wide_row(i: int, columns: int) -> tuple:
+    base = datetime(2024, 1, 1)
+    kinds = (
+        lambda: i,
+        lambda: f"value {i}",
+        lambda: base + timedelta(minutes=i),
+        lambda: Decimal(f"{i * 1.37:.2f}"),
+        lambda: None if i % 3 == 0 else i * 0.5,
+        lambda: uuid.UUID(int=i),
+        lambda: i % 2 == 0,
+        lambda: i.to_bytes(8, "big"),
+    )
+    return tuple(kinds[c % len(kinds)]() for c in range(columns))
+
+
+def tall_row(i: int) -> tuple:
+    return (i, 1000 + i % 977, f"customer {i % 977}", Decimal(f"{i * 3.17:.2f}"))
+
+
+class SyntheticSchema:
+    # Deterministic catalog: every table has an Id primary key, a handful of
+    # typed columns and one or two foreign keys to earlier tables.
+    def __init__(self, n: int, seed: int):
+        rng = random.Random(seed)
+        self.tables = []
+        self.columns = []
+        self.foreign_keys = []
+        modified = datetime(2024, 1, 1)
+        types_ = ("int", "nvarchar", "datetime2", "decimal", "bit", "uniqueidentifier")
+        for i in range(n):
+            schema = SCHEMAS[i % len(SCHEMAS)] if i % 5 else "dbo"
+            name = f"T{i:05d}"
+            object_id = 1000 + i
+            self.tables.append((schema, name, object_id, modified))
+            cols = [("Id", "int", 0, 1)]
+            parents = sorted({rng.randrange(i) for _ in range(rng.randint(1, 2))}) if i else []
+            for p in parents:
+                p_schema, p_name = self.tables[p][0], self.tables[p][1]
+                column = f"{p_name}Id"
+                cols.append((column, "int", 1, 0))
+                self.foreign_keys.append(
+                    (f"FK_{name}_{p_name}", schema, name, column, p_schema, p_name, "Id", object_id)
+                )
+            for c in range(rng.randint(6, 14)):
+                cols.append((f"Col{c:02d}", types_[(i + c) % len(types_)], 1, 0))
+            for column, type_, nullable, pk in cols:
+                self.columns.append((object_id, schema, name, column, type_, nullable, pk))
+
+    def rows_for(self, rows: list[tuple], ids: set[int] | None, position: int) -> list[tuple]:
+        if ids is None:
+            return rows
+        return [r for r in rows if r[position] in ids]
+
+
+_TOP = re.compile(r"\bSELECT\s+TOP\s*\(?\s*(\d+)", re.I)
+_OFFSET = re.compile(r"\bOFFSET\s+(\d+)\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+(\d+)", re.I)
+_SELECT_LIST = re.compile(r"^\s*SELECT\s+(?:TOP\s*\(?\s*\d+\s*\)?\s+)?(.*?)\s+FROM\b", re.I | re.S)
+_FROM = re.compile(r"\bFROM\s+(?:\[?\w+\]?\.)?\[?(\w+)\]?", re.I)
+_WHERE_EQ = re.compile(r"\bWHERE\s+\[?(\w+)\]?\s*=\s*(\?|\d+)", re.I)
+_PLAN = (
+    '<ShowPlanXML xmlns="http://schemas.microsoft.com/sqlserver/2004/07/showplan" Version="1.6">'
+    '<BatchSequence><Batch><Statements><StmtSimple StatementText="{sql}" StatementType="SELECT" '
+    'StatementSubTreeCost="0.0132" StatementEstRows="{rows}"><QueryPlan><RelOp NodeId="0" '
+    'PhysicalOp="Clustered Index Scan" LogicalOp="Clustered Index Scan" EstimateRows="{rows}" '
+    'EstimatedTotalSubtreeCost="0.0132"/></QueryPlan></StmtSimple></Statements></Batch>'
+    '</BatchSequence></ShowPlanXML>'
+)
+
+
+def _description(names: list[str]) -> list[tuple]:
+    return [(name, None, None, None, None, None, True) for name in names]
+
+
+class FakeDatabase:
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+        self.schema = SyntheticSchema(dataset.tables, dataset.seed)
+        self.wide_columns = [f"C{c:02d}" for c in range(dataset.wide_columns)]
+        self.wide = [wide_row(i, dataset.wide_columns) for i in range(dataset.wide_rows)]
+        self.tall_columns = ["Id", "CustomerId", "Customer", "Amount"]
+        self.tall = [tall_row(i) for i in range(dataset.tall_rows)]
+        self.synthetic = {t[1].lower() for t in self.schema.tables}
+
+    def answer(self, sql: str, params: tuple, session: dict) -> tuple[list[str] | None, list[tuple]]:
+        upper = sql.lstrip().upper()
+        if upper.startswith("SET "):
+            if "SHOWPLAN_XML" in upper:
+                session["showplan"] = upper.rstrip().endswith("ON")
+            return None, []
+        if session.get("showplan"):
+            return ["Microsoft SQL Server 2005 XML Showplan"], [
+                (_PLAN.format(sql=sql.replace('"', "&quot;")[:200], rows=len(self.tall)),)
+            ]
+
+        # Dialect start-up probes.
+        if "SERVERPROPERTY('ProductVersion')" in sql:
+            return ["v"], [("16.0.4135.4",)]
+        if "schema_name()" in sql:
+            return ["s"], [("dbo",)]
+        if "sys.system_views" in sql:
+            return ["name"], [("dm_exec_sessions",)]
+        if "transaction_isolation_level" in sql:
+            return ["level"], [("READ COMMITTED",)]
+        if "fn_listextendedproperty" in sql or "NVARCHAR(max)" in sql:
+            return ["x"], []
+
+        # Profiler catalog queries: every synthetic table holds as many rows as
+        # Tall and has no statistics, so profiles are built from samples.
+        if "sys.partitions" in sql:
+            rows = [t for t in self.schema.tables if (t[0], t[1]) == params]
+            return ["object_id", "modify_date", "row_count"], [(t[2], t[3], len(self.tall)) for t in rows]
+        if "dm_db_stats_properties" in sql:
+            return ["stats_id", "column_name", "last_updated", "rows", "rows_sampled", "modification_counter"], []
+
+        # Catalog queries issued by SchemaCache.
+        ids = set(params) if params else None
+        if "sys.foreign_keys" in sql:
+            rows = self.schema.rows_for(self.schema.foreign_keys, ids, 7)
+            names = ["fk_name", "parent_schema", "parent_table", "parent_column",
+                     "ref_schema", "ref_table", "ref_column"]
+            return names, [r[:7] for r in rows]
+        if "sys.columns" in sql:
+            names = ["object_id", "table_schema", "table_name", "column_name",
+                     "data_type", "is_nullable", "is_pk"]
+            return names, self.schema.rows_for(self.schema.columns, ids, 0)
+        if "sys.tables" in sql:
+            return ["table_schema", "table_name", "object_id", "modify_date"], self.schema.tables
+
+        if not upper.startswith(("SELECT", "WITH", "(")):
+            return None, []
+        if "COUNT(" in upper:
+            return ["n"], [(len(self.tall),)]
+
+        m = _FROM.search(sql)
+        table = m.group(1).lower() if m else "tall"
+        columns, rows = (
+            (self.wide_columns, self.wide) if table == "wide" else (self.tall_columns, self.tall)
+        )
+        m = _WHERE_EQ.search(sql)
+        if m and m.group(1) in columns:
+            position = columns.index(m.group(1))
+            value = params[0] if m.group(2) == "?" else int(m.group(2))
+            rows = [r for r in rows if r[position] == value]
+        m = _OFFSET.search(sql)
+        if m:
+            start = int(m.group(1))
+            rows = rows[start:start + int(m.group(2))]
+        m = _TOP.search(sql)
+        if m:
+            rows = rows[:int(m.group(1))]
+        m = _SELECT_LIST.match(sql)
+        if table in self.synthetic and m and m.group(1) != "*":
+            # Named columns of a synthetic table cycle through Tall's values.
+            columns = [c.strip().strip("[]") for c in m.group(1).split(",")]
+            rows = [tuple(r[i % len(r)] for i in range(len(columns))) for r in rows]
+        return columns, rows
+
+
+class FakeCursor:
+    # Like pyodbc, the query timeout is copied from the connection when the
+    # cursor is created; cursors have no timeout attribute of their own.
+    __slots__ = ("connection", "description", "rowcount", "query_timeout", "_rows", "_pos")
+
+    def __init__(self, connection: "FakeConnection"):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.query_timeout = connection.timeout
+        self._rows: list[tuple] = []
+        self._pos = 0
+
+    def execute(self, sql: str, params=()):
+        session = self.connection.session
+        columns, rows = self.connection.database.answer(sql, tuple(params or ()), session)
+        self.description = _description(columns) if columns is not None else None
+        self.rowcount = len(rows) if columns is None else -1
+        self._rows, self._pos = rows, 0
+        return self
+
+    def executemany(self, sql: str, seq):
+        for params in seq:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchmany(self, size: int = 1):
+        chunk = self._rows[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk
+
+    def fetchall(self):
+        chunk = self._rows[self._pos:] if self._pos else self._rows
+        self._pos = len(self._rows)
+        return chunk
+
+    def nextset(self):
+        return False
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        self._rows = []
+
+
+class FakeConnection:
+    autocommit = False
+    timeout = 0
+
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.session: dict = {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def add_output_converter(self, *args):
+        pass
+
+    def getinfo(self, key):
+        return "16.00.4135"
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def fake_dbapi_module() -> types.ModuleType:
+    module = types.ModuleType("fake_pyodbc")
+    module.version = "5.1.0"
+    module.apilevel = "2.0"
+    module.threadsafety = 1
+    module.paramstyle = "qmark"
+    module.pooling = False
+    module.SQL_WVARCHAR, module.SQL_VARCHAR, module.SQL_DBMS_VER = -9, 12, 18
+    module.Error = type("Error", (Exception,), {})
+    for name in ("Warning", "InterfaceError", "DatabaseError", "DataError", "OperationalError",
+                 "IntegrityError", "InternalError", "ProgrammingError", "NotSupportedError"):
+        setattr(module, name, type(name, (module.Error,), {}))
+    module.Cursor = FakeCursor
+    module.Connection = FakeConnection
+
+    def connect(*args, **kwargs):
+        raise module.OperationalError("08001", "fake driver: use the benchmark engine")
+
+    module.connect = connect
+    return module
+
+
+def ensure_driver():
+    # The mssql+pyodbc dialect imports pyodbc when an engine is created,
+    # including the registry's own engines built on first use. Without an ODBC
+    # driver manager on this machine, let that import load the fake module;
+    # benchmarks point the registry at their own engine and never connect
+    # through it.
+    try:
+        import pyodbc  # noqa: F401
+    except ImportError:
+        sys.modules["pyodbc"] = fake_dbapi_module()
+
+
+def fake_engine(dataset: Dataset, pool_size: int = 10, database: FakeDatabase | None = None):
+    database = database or FakeDatabase(dataset)
+    return create_engine(
+        "mssql+pyodbc://",
+        module=fake_dbapi_module(),
+        creator=lambda: FakeConnection(database),
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_size,
+        pool_pre_ping=True,
+    )
+
+
+def sqlite_engine(dataset: Dataset):
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+
+    wide_columns = [f"C{c:02d}" for c in range(dataset.wide_columns)]
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE Wide ({', '.join(wide_columns)})"))
+        conn.exec_driver_sql(
+            f"INSERT INTO Wide VALUES ({', '.join('?' * dataset.wide_columns)})",
+            [
+                tuple(str(v) if isinstance(v, (uuid.UUID, Decimal)) else v
+                      for v in wide_row(i, dataset.wide_columns))
+                for i in range(dataset.wide_rows)
+            ],
+        )
+        conn.execute(text("CREATE TABLE Tall (Id INTEGER PRIMARY KEY, CustomerId INTEGER, Customer TEXT, Amount REAL)"))
+        conn.exec_driver_sql(
+            "INSERT INTO Tall VALUES (?, ?, ?, ?)",
+            [(i, c, name, float(a)) for i, c, name, a in (tall_row(i) for i in range(dataset.tall_rows))],
+        )
+    return engine
+
+
+BACKENDS = {"fake": fake_engine, "sqlite": sqlite_engine}
@@ -0,0 +1,94 @@
+"""
+Bulk loading: rows per second inserting N rows one execute_parameterized_query
+call at a time (validation, pool checkout and autocommit per row) against
+execute_bulk with chunked executemany transactions, from parameter sets and
+from an uploaded CSV. Runs offline against an on-disk SQLite database.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import csv
+import io
+import tempfile
+import time
+from sqlalchemy import create_engine, text
+
+from backends import ensure_driver
+
+ensure_driver()
+
+import structlog  # noqa: E402
+import logging  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+from mcp_mssql.config import settings  # noqa: E402
+from mcp_mssql.database.executor import QueryExecutor  # noqa: E402
+from mcp_mssql.database.spool import result_spool  # noqa: E402
+
+ROWS = int(os.getenv("BENCH_ROWS", "100000"))
+# Row by row is slow; time a slice and report its rate.
+ROW_BY_ROW = min(ROWS, int(os.getenv("BENCH_ROW_BY_ROW", "5000")))
+CHUNK = int(os.getenv("BENCH_CHUNK", "1000"))
+INSERT = "INSERT INTO Orders (Id, Customer, Region, Amount) VALUES (:id, :customer, :region, :amount)"
+
+
+def make_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Orders (Id INTEGER PRIMARY KEY, Customer TEXT, Region TEXT, Amount REAL)"))
+    return engine
+
+
+def parameter_sets(n: int, offset: int = 0) -> list[dict]:
+    return [
+        {"id": offset + i, "customer": f"customer {i}", "region": f"region {i % 17}", "amount": i * 1.5}
+        for i in range(n)
+    ]
+
+
+def upload(rows: list[dict]) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return f"spool://{result_spool.upload(buffer.getvalue().encode()).export_id}"
+
+
+def count(executor: QueryExecutor) -> int:
+    with executor.engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM Orders")).scalar()
+
+
+def main():
+    settings.ALLOW_WRITE_OPERATIONS = True
+    print("=" * 72)
+    print(f"Bulk load benchmark: {ROWS} rows, chunks of {CHUNK}")
+    print("=" * 72)
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = QueryExecutor(engine=make_engine(os.path.join(tmp, "bench.db")))
+
+        rows = parameter_sets(ROW_BY_ROW)
+        t0 = time.perf_counter()
+        for params in rows:
+            executor.execute(INSERT, params)
+        per_row = ROW_BY_ROW / (time.perf_counter() - t0)
+        print(f"  row by row ({ROW_BY_ROW} rows)   {per_row:12,.0f} rows/s")
+
+        for label, kwargs in (
+            ("execute_bulk", {"parameter_sets": parameter_sets(ROWS, 1_000_000)}),
+            ("execute_bulk csv", {"csv_resource": upload(parameter_sets(ROWS, 2_000_000))}),
+        ):
+            t0 = time.perf_counter()
+            result = executor.execute_bulk(INSERT, chunk_size=CHUNK, **kwargs)
+            rate = result["rows_succeeded"] / (time.perf_counter() - t0)
+            print(f"  {label:<27} {rate:12,.0f} rows/s  {rate / per_row:6.1f}x  failed {result['rows_failed']}")
+
+        print(f"  rows in table               {count(executor):12,d}")
+        result_spool.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Large result export: peak Python heap of returning N rows inline (MAX_ROWS
+raised to fit) against streaming them to a spool file and reading it back
+in chunks. Runs offline against an on-disk SQLite database.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import importlib.util
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine, text
+
+from backends import ensure_driver
+
+ensure_driver()
+
+from mcp_mssql.config import settings  # noqa: E402
+from mcp_mssql.database.executor import QueryExecutor  # noqa: E402
+from mcp_mssql.database.spool import result_spool  # noqa: E402
+from mcp_mssql.serialization import dumps  # noqa: E402
+
+ROWS = int(os.getenv("BENCH_ROWS", "200000"))
+QUERY = "SELECT Id, Customer, Region, Amount, CreatedAt FROM Orders"
+
+
+def make_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE Orders (Id INTEGER PRIMARY KEY, Customer TEXT, Region TEXT, Amount REAL, CreatedAt TEXT)"
+        ))
+        conn.execute(
+            text("INSERT INTO Orders (Customer, Region, Amount, CreatedAt) VALUES (:c, :r, :a, :t)"),
+            [{"c": f"customer {i}", "r": f"region {i % 17}", "a": i * 1.5, "t": "2024-05-01T10:00:00"}
+             for i in range(ROWS)],
+        )
+    return engine
+
+
+def measure(fn) -> tuple[float, float, int]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024, size
+
+
+def inline(executor: QueryExecutor) -> int:
+    return len(dumps(executor.execute(QUERY)))
+
+
+def export(executor: QueryExecutor, format: str) -> int:
+    info = executor.export(QUERY, format=format)
+    read = 0
+    for offset in range(0, info["size_bytes"], info["chunk_bytes"]):
+        read += len(result_spool.read(info["export_id"], offset))
+    return read
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        executor = QueryExecutor(engine=make_engine(os.path.join(tmp, "bench.db")))
+        settings.MAX_ROWS = ROWS
+        cases = [("inline JSON", lambda: inline(executor)), ("export csv", lambda: export(executor, "csv"))]
+        if importlib.util.find_spec("pyarrow") is not None:
+            cases.append(("export arrow", lambda: export(executor, "arrow")))
+
+        print("=" * 72)
+        print(f"Export benchmark: {ROWS} rows")
+        print("=" * 72)
+        for name, fn in cases:
+            ms, peak, size = measure(fn)
+            print(f"  {name:<16} {ms:9.1f} ms  peak heap {peak:8.1f} MiB  payload {size / 1024 / 1024:7.1f} MiB")
+        result_spool.clear()
+
+
+if __name__ == "__main__":
+    main()
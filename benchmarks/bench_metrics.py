@@ -0,0 +1,78 @@
+"""
+Instrumentation overhead: the query path (validate, checkout, execute,
+fetch, shape, serialize) with metrics enabled against metrics disabled.
+Runs offline against an in-memory SQLite engine, no SQL Server required.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from mcp_mssql import metrics
+from mcp_mssql.database.executor import QueryExecutor
+from mcp_mssql.serialization import dumps
+
+CALLS = int(os.getenv("BENCH_CALLS", "5000"))
+ROWS = int(os.getenv("BENCH_ROWS", "20"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+
+def make_engine():
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Orders (Id INTEGER PRIMARY KEY, Customer TEXT, Amount REAL)"))
+        conn.execute(
+            text("INSERT INTO Orders (Customer, Amount) VALUES (:c, :a)"),
+            [{"c": f"customer {i}", "a": i * 1.5} for i in range(ROWS)],
+        )
+    metrics.instrument_pool(engine, "bench")
+    return engine
+
+
+def run(executor: QueryExecutor) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        for _ in range(CALLS):
+            with metrics.phase("serialize"):
+                dumps(executor.execute("SELECT Id, Customer, Amount FROM Orders"))
+        best = min(best, time.perf_counter() - t0)
+    return best / CALLS * 1e6
+
+
+def main():
+    executor = QueryExecutor(engine=make_engine())
+    executor.execute("SELECT Id, Customer, Amount FROM Orders")
+
+    # Alternate the two modes so warm-up and drift hit both equally.
+    off_us = on_us = float("inf")
+    for _ in range(2):
+        metrics.enabled = False
+        off_us = min(off_us, run(executor))
+        metrics.enabled = True
+        on_us = min(on_us, run(executor))
+
+    t0 = time.perf_counter()
+    for _ in range(CALLS * 10):
+        with metrics.phase("bench"):
+            pass
+    timer_us = (time.perf_counter() - t0) / (CALLS * 10) * 1e6
+
+    print("=" * 72)
+    print(f"Metrics overhead: {CALLS} calls x {ROWS} rows, best of {REPEAT}")
+    print("=" * 72)
+    print(f"  metrics disabled        {off_us:9.2f} us/call")
+    print(f"  metrics enabled         {on_us:9.2f} us/call  "
+          f"{100 * (on_us - off_us) / off_us:+6.2f}%")
+    print(f"  single phase timer      {timer_us:9.3f} us")
+    print(f"  exposition size         {len(metrics.render()) / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
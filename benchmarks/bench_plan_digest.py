@@ -0,0 +1,107 @@
+"""
+Plan digest cost and size: streaming digest of a large synthetic SHOWPLAN
+document against shipping the raw XML and against a full DOM parse.
+Runs offline, no SQL Server required.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import json
+import time
+import tracemalloc
+from xml.etree import ElementTree
+
+from mcp_mssql.database.plan_analyzer import digest
+
+OPERATORS = int(os.getenv("BENCH_OPERATORS", "2000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+_NS = "http://schemas.microsoft.com/sqlserver/2004/07/showplan"
+_KINDS = (
+    ("Clustered Index Scan", "IndexScan"),
+    ("Index Seek", "IndexScan"),
+    ("Key Lookup", "IndexScan"),
+    ("Hash Match", "Hash"),
+    ("Nested Loops", "NestedLoops"),
+    ("Sort", "Sort"),
+)
+
+
+def relop(node_id: int, depth: int, remaining: list[int]) -> str:
+    op, child_tag = _KINDS[node_id % len(_KINDS)]
+    children = ""
+    if depth < 12:
+        for _ in range(2):
+            if remaining[0] <= 0:
+                break
+            remaining[0] -= 1
+            children += relop(remaining[0], depth + 1, remaining)
+    warnings = '<Warnings><SortSpillDetails/><SpillToTempDb SpillLevel="2"/></Warnings>' if op == "Sort" else ""
+    obj = f'<Object Database="[Shop]" Schema="[dbo]" Table="[T{node_id % 97}]" Index="[IX_{node_id}]"/>'
+    predicate = (
+        f'<Predicate><ScalarOperator ScalarString="CONVERT_IMPLICIT(nvarchar(50),[c{node_id % 7}],0)=N\'x\'"/>'
+        "</Predicate>"
+    )
+    defined = "".join(
+        f'<DefinedValue><ColumnReference Database="[Shop]" Schema="[dbo]" Table="[T{node_id % 97}]" '
+        f'Column="[Col{c}]"/></DefinedValue>' for c in range(12)
+    )
+    return (
+        f'<RelOp NodeId="{node_id}" PhysicalOp="{op}" LogicalOp="{op}" EstimateRows="{node_id * 13 + 1}" '
+        f'EstimateIO="0.01" EstimateCPU="0.002" EstimatedTotalSubtreeCost="{depth and 1 / depth or 50}">'
+        f"<OutputList/>{warnings}<DefinedValues>{defined}</DefinedValues>"
+        f"<{child_tag}>{obj}{predicate}{children}</{child_tag}></RelOp>"
+    )
+
+
+def make_plan(operators: int) -> str:
+    body = relop(operators, 0, [operators])
+    missing = (
+        '<MissingIndexes><MissingIndexGroup Impact="91.2"><MissingIndex Database="[Shop]" Schema="[dbo]" '
+        'Table="[T1]"><ColumnGroup Usage="EQUALITY"><Column Name="[Code]"/></ColumnGroup>'
+        '<ColumnGroup Usage="INCLUDE"><Column Name="[Amount]"/></ColumnGroup></MissingIndex>'
+        "</MissingIndexGroup></MissingIndexes>"
+    )
+    return (
+        f'<ShowPlanXML xmlns="{_NS}" Version="1.564"><BatchSequence><Batch><Statements>'
+        f'<StmtSimple StatementText="SELECT ..." StatementType="SELECT" StatementSubTreeCost="120.5" '
+        f'StatementEstRows="1000"><QueryPlan DegreeOfParallelism="8">{missing}{body}</QueryPlan></StmtSimple>'
+        "</Statements></Batch></BatchSequence></ShowPlanXML>"
+    )
+
+
+def dom_parse(xml: str):
+    root = ElementTree.fromstring(xml)
+    return [e.attrib for e in root.iter(f"{{{_NS}}}RelOp")]
+
+
+def measure(fn, xml: str) -> tuple[float, float]:
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn(xml)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(xml)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+def main():
+    xml = make_plan(OPERATORS)
+    summary = json.dumps(digest(xml))
+
+    print("=" * 72)
+    print(f"Plan digest benchmark: {OPERATORS} operators, best of {REPEAT}")
+    print("=" * 72)
+    for name, fn in (("full DOM parse", dom_parse), ("streaming digest", digest)):
+        ms, peak = measure(fn, xml)
+        print(f"  {name:<24} {ms:9.2f} ms  peak {peak:9.1f} KiB")
+    print(f"  raw XML returned       {len(xml) / 1024:9.1f} KiB")
+    print(f"  digest returned        {len(summary) / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
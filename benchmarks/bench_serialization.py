@@ -0,0 +1,86 @@
+"""
+Compare result serialization: legacy row dicts + json.dumps(default=str)
+against the fast encoder in row and columnar shape.
+Runs offline on a synthetic result set, no SQL Server required.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from mcp_mssql.serialization import dumps, to_columnar, orjson
+
+ROWS = int(os.getenv("BENCH_ROWS", "10000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+COLUMNS = [
+    "OrderId", "CustomerId", "OrderDate", "ShipDate", "Status", "Region",
+    "Amount", "Discount", "Tax", "TrackingId", "Notes", "RowVersion",
+]
+
+
+def make_rows(n: int) -> list[tuple]:
+    base = datetime(2024, 1, 1, 8, 30)
+    return [
+        (
+            i,
+            1000 + i % 977,
+            base + timedelta(minutes=i),
+            None if i % 7 == 0 else base + timedelta(days=3, minutes=i),
+            ("OPEN", "SHIPPED", "CLOSED")[i % 3],
+            ("EMEA", "APAC", "AMER")[i % 3],
+            Decimal(f"{i * 3.17:.2f}"),
+            Decimal("0.05") if i % 5 == 0 else None,
+            Decimal(f"{i * 0.21:.4f}"),
+            uuid.UUID(int=i),
+            f"note for order {i}",
+            i.to_bytes(8, "big"),
+        )
+        for i in range(n)
+    ]
+
+
+def best_of(fn) -> tuple[float, str]:
+    best, out = float("inf"), ""
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+def main():
+    raw = make_rows(ROWS)
+    cases = {
+        "legacy rows (json default=str)": lambda: json.dumps(
+            {"columns": COLUMNS, "rows": [dict(zip(COLUMNS, r)) for r in raw]}, default=str
+        ),
+        "rows (fast encoder)": lambda: dumps(
+            {"columns": COLUMNS, "rows": [dict(zip(COLUMNS, r)) for r in raw]}
+        ),
+        "columnar (fast encoder)": lambda: dumps(
+            {"columns": COLUMNS, "format": "columnar", "data": to_columnar(COLUMNS, raw)}
+        ),
+    }
+
+    print("=" * 72)
+    print(f"Serialization benchmark: {ROWS} rows x {len(COLUMNS)} columns, "
+          f"encoder={'orjson' if orjson else 'stdlib json'}, best of {REPEAT}")
+    print("=" * 72)
+    baseline_ms = baseline_bytes = None
+    for name, fn in cases.items():
+        ms, out = best_of(fn)
+        size = len(out.encode())
+        if baseline_ms is None:
+            baseline_ms, baseline_bytes = ms, size
+        print(f"  {name:<34} {ms:9.2f} ms  {size / 1024:9.1f} KiB  "
+              f"x{baseline_ms / ms:5.2f} CPU  {100 * size / baseline_bytes:5.1f}% size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Stampede of identical queries: N sessions issue the same slow read at once.
+Counts how many times the database actually runs it and the wall time for
+all N, with single-flight coalescing off and on. Runs offline on SQLite,
+with a SQL function that sleeps standing in for an expensive query.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, event, text
+
+from backends import ensure_driver
+
+ensure_driver()
+
+from mcp_mssql.database.executor import QueryExecutor  # noqa: E402
+
+SESSIONS = int(os.getenv("BENCH_SESSIONS", "16"))
+QUERY_SECONDS = float(os.getenv("BENCH_QUERY_SECONDS", "0.2"))
+QUERY = "SELECT Region, SUM(slow(Amount)) AS Total FROM Orders GROUP BY Region"
+
+
+def make_engine(path: str, executions: list):
+    engine = create_engine(f"sqlite:///{path}", pool_size=SESSIONS)
+
+    def slow(value):
+        time.sleep(QUERY_SECONDS)
+        return value
+
+    @event.listens_for(engine, "connect")
+    def register(dbapi_conn, _):
+        dbapi_conn.create_function("slow", 1, slow)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, *_):
+        if "slow(" in statement:
+            executions.append(statement)
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Orders (Id INTEGER PRIMARY KEY, Region TEXT, Amount REAL)"))
+        conn.execute(text("INSERT INTO Orders (Region, Amount) VALUES ('north', 10), ('south', 20)"))
+    return engine
+
+
+def stampede(executor: QueryExecutor) -> float:
+    barrier = threading.Barrier(SESSIONS)
+
+    def session():
+        barrier.wait()
+        executor.execute(QUERY)
+
+    threads = [threading.Thread(target=session) for _ in range(SESSIONS)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    print("=" * 72)
+    print(f"Single-flight benchmark: {SESSIONS} concurrent sessions, {QUERY_SECONDS}s query")
+    print("=" * 72)
+    with tempfile.TemporaryDirectory() as tmp:
+        for enabled in (False, True):
+            executions: list = []
+            executor = QueryExecutor(engine=make_engine(os.path.join(tmp, f"bench{enabled}.db"), executions))
+            executor.flight.enabled = enabled
+            ms = stampede(executor)
+            label = "coalesced" if enabled else "independent"
+            print(f"  {label:<12} executions {len(executions):4d}   wall {ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
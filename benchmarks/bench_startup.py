@@ -0,0 +1,115 @@
+"""
+Startup latency for stdio launches: import time of the server module, the
+heavy modules it pulls in before the handshake, and wall time from process
+spawn to the MCP initialize and tools/list responses. Uses the fake driver
+when pyodbc cannot load, no SQL Server required.
+"""
+import sys
+import os
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import importlib.abc
+import importlib.util
+import json
+import subprocess
+import time
+
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+HEAVY = ("sqlalchemy", "sqlglot", "pyodbc", "redis", "tenacity", "pyarrow")
+
+
+class _FakeDriver(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    # Resolves pyodbc to the benchmark's fake module, and only when something
+    # imports it, so the fake does not drag SQLAlchemy in ahead of time.
+    def find_spec(self, name, path, target=None):
+        return importlib.util.spec_from_loader(name, self) if name == "pyodbc" else None
+
+    def create_module(self, spec):
+        from backends import fake_dbapi_module
+        return fake_dbapi_module()
+
+    def exec_module(self, module):
+        pass
+
+
+def install_driver():
+    try:
+        import pyodbc  # noqa: F401
+    except ImportError:
+        sys.modules.pop("pyodbc", None)
+        sys.meta_path.insert(0, _FakeDriver())
+
+
+def child(mode: str):
+    install_driver()
+    if mode == "--import":
+        t0 = time.perf_counter()
+        import mcp_mssql.server  # noqa: F401
+        elapsed = time.perf_counter() - t0
+        print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in HEAVY if m in sys.modules]}))
+    else:
+        from mcp_mssql.server import main
+        main()
+
+
+def rpc(proc, message: dict, wait: bool = True):
+    proc.stdin.write((json.dumps(message) + "\n").encode())
+    proc.stdin.flush()
+    if wait:
+        while True:
+            reply = json.loads(proc.stdout.readline())
+            if reply.get("id") == message["id"]:
+                return reply
+
+
+def handshake() -> tuple[float, float]:
+    env = {**os.environ, "TRANSPORT": "stdio", "LOG_LEVEL": "WARNING"}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--serve"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env,
+    )
+    try:
+        rpc(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2025-06-18", "capabilities": {},
+            "clientInfo": {"name": "bench", "version": "0"},
+        }})
+        initialized = time.perf_counter() - t0
+        rpc(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"}, wait=False)
+        rpc(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        listed = time.perf_counter() - t0
+    finally:
+        proc.stdin.close()
+        proc.kill()
+        proc.wait()
+    return initialized * 1000, listed * 1000
+
+
+def main():
+    imports, loaded = [], []
+    for _ in range(REPEAT):
+        out = subprocess.run(
+            [sys.executable, __file__, "--import"], capture_output=True, text=True, check=True,
+            env={**os.environ, "LOG_LEVEL": "WARNING"},
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        imports.append(result["ms"])
+        loaded = result["loaded"]
+    runs = [handshake() for _ in range(REPEAT)]
+
+    print("=" * 72)
+    print(f"Startup benchmark: best of {REPEAT}")
+    print("=" * 72)
+    print(f"  import mcp_mssql.server     {min(imports):9.1f} ms")
+    print(f"  spawn -> initialize reply   {min(r[0] for r in runs):9.1f} ms")
+    print(f"  spawn -> tools/list reply   {min(r[1] for r in runs):9.1f} ms")
+    print(f"  loaded before handshake     {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        child(sys.argv[1])
+    else:
+        main()
@@ -0,0 +1,123 @@
+"""
+Validation throughput: legacy validate (uncompiled patterns + fresh parse
+on every call) against the memoized single-parse QueryValidator.
+Runs offline, no SQL Server required.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import re
+import time
+import sqlglot
+
+from mcp_mssql.database.validator import QueryValidator
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+
+CORPUS = [
+    """
+    WITH monthly AS (
+        SELECT CustomerId, DATEFROMPARTS(YEAR(OrderDate), MONTH(OrderDate), 1) AS month,
+               SUM(TotalDue) AS revenue
+        FROM Sales.SalesOrderHeader
+        WHERE OrderDate >= '2023-01-01'
+        GROUP BY CustomerId, DATEFROMPARTS(YEAR(OrderDate), MONTH(OrderDate), 1)
+    )
+    SELECT CustomerId, month, revenue,
+           LAG(revenue) OVER (PARTITION BY CustomerId ORDER BY month) AS prev_revenue,
+           SUM(revenue) OVER (PARTITION BY CustomerId ORDER BY month
+                              ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS running_total
+    FROM monthly
+    ORDER BY CustomerId, month
+    """,
+    """
+    SELECT TOP 20 p.Name, c.Name AS Category, SUM(d.LineTotal) AS Sales,
+           RANK() OVER (ORDER BY SUM(d.LineTotal) DESC) AS SalesRank
+    FROM Sales.SalesOrderDetail d
+    JOIN Production.Product p ON p.ProductID = d.ProductID
+    JOIN Production.ProductSubcategory s ON s.ProductSubcategoryID = p.ProductSubcategoryID
+    JOIN Production.ProductCategory c ON c.ProductCategoryID = s.ProductCategoryID
+    GROUP BY p.Name, c.Name
+    """,
+    """
+    WITH ranked AS (
+        SELECT e.BusinessEntityID, e.JobTitle, d.Name AS Department, h.Rate,
+               ROW_NUMBER() OVER (PARTITION BY d.DepartmentID ORDER BY h.Rate DESC) AS rn
+        FROM HumanResources.Employee e
+        JOIN HumanResources.EmployeeDepartmentHistory dh ON dh.BusinessEntityID = e.BusinessEntityID
+        JOIN HumanResources.Department d ON d.DepartmentID = dh.DepartmentID
+        JOIN HumanResources.EmployeePayHistory h ON h.BusinessEntityID = e.BusinessEntityID
+        WHERE dh.EndDate IS NULL
+    )
+    SELECT Department, JobTitle, Rate FROM ranked WHERE rn <= 3
+    """,
+    """
+    SELECT o.OrderId, o.OrderDate, c.CustomerName,
+           (SELECT COUNT(*) FROM dbo.OrderLines l WHERE l.OrderId = o.OrderId) AS line_count,
+           CASE WHEN o.Status = 'SHIPPED' THEN DATEDIFF(day, o.OrderDate, o.ShipDate) END AS days_to_ship
+    FROM dbo.Orders o
+    LEFT JOIN dbo.Customers c ON c.CustomerId = o.CustomerId
+    WHERE o.OrderDate BETWEEN :start AND :end AND c.Region IN ('EMEA', 'APAC')
+    """,
+    """
+    SELECT Region, Status, COUNT(*) AS orders,
+           PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY TotalDue) OVER (PARTITION BY Region) AS median_due
+    FROM dbo.Orders
+    GROUP BY Region, Status, TotalDue
+    """,
+    """
+    WITH RECURSIVE_CTE AS (
+        SELECT EmployeeId, ManagerId, 0 AS depth FROM dbo.Employees WHERE ManagerId IS NULL
+        UNION ALL
+        SELECT e.EmployeeId, e.ManagerId, r.depth + 1
+        FROM dbo.Employees e JOIN RECURSIVE_CTE r ON e.ManagerId = r.EmployeeId
+    )
+    SELECT depth, COUNT(*) AS headcount FROM RECURSIVE_CTE GROUP BY depth
+    """,
+    "SELECT TOP 10 * FROM [dbo].[Customers] WITH (NOLOCK)",
+    "SELECT COUNT(*) FROM dbo.Orders WHERE CustomerId = :customer_id",
+]
+
+_LEGACY_DANGEROUS = QueryValidator._DANGEROUS
+
+
+def legacy_validate(query: str) -> tuple[bool, str]:
+    for pattern in _LEGACY_DANGEROUS:
+        if re.search(pattern, query, re.IGNORECASE | re.DOTALL):
+            return False, f"Blocked pattern: {pattern}"
+    try:
+        statements = sqlglot.parse(query, dialect="tsql")
+    except Exception as e:
+        return False, f"Parse error: {e}"
+    if len(statements) > 1:
+        return False, "Multiple statements not allowed"
+    return True, "OK"
+
+
+def measure(name: str, fn) -> float:
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        for q in CORPUS:
+            fn(q)
+    elapsed = time.perf_counter() - t0
+    per_sec = ROUNDS * len(CORPUS) / elapsed
+    print(f"  {name:<40} {per_sec:12.0f} validations/s")
+    return per_sec
+
+
+def main():
+    print("=" * 60)
+    print(f"Validator benchmark: {len(CORPUS)} queries x {ROUNDS} rounds")
+    print("=" * 60)
+    before = measure("legacy (regex + parse per call)", legacy_validate)
+    measure("memoized, cold (cache disabled)", QueryValidator(cache_size=0).validate)
+    warm = QueryValidator()
+    for q in CORPUS:
+        warm.validate(q)
+    after = measure("memoized, warm", warm.validate)
+    print(f"\n  warm speed-up: x{after / before:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Offline benchmark suite: drives every MCP tool plus QueryExecutor,
+QueryValidator, SchemaCache and serialization against a database stand-in
+(see backends.py) and reports throughput, p50/p99 latency and peak memory.
+
+    python benchmarks/harness.py                         # fake DBAPI, 5,000 tables
+    python benchmarks/harness.py --backend sqlite        # portable cases on SQLite
+    python benchmarks/harness.py --filter tool. --save benchmarks/baseline.json
+    python benchmarks/harness.py --compare benchmarks/baseline.json --strict
+
+With --compare, cases whose p50 latency or peak memory exceed the baseline
+by more than --threshold are flagged; --strict turns that into exit code 1.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable
+
+from backends import BACKENDS, Dataset, ensure_driver
+from bench_validator import CORPUS
+
+ensure_driver()
+
+import structlog  # noqa: E402
+import logging  # noqa: E402
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+from mcp_mssql.config import settings  # noqa: E402
+from mcp_mssql.database import registry  # noqa: E402
+from mcp_mssql.database.executor import executor  # noqa: E402
+from mcp_mssql.database.schema_cache import schema_cache  # noqa: E402
+from mcp_mssql.database.schema_index import SchemaIndex  # noqa: E402
+from mcp_mssql.database.spool import result_spool  # noqa: E402
+from mcp_mssql.database.validator import QueryValidator  # noqa: E402
+from mcp_mssql.serialization import dumps, to_columnar  # noqa: E402
+from mcp_mssql.tools import query_tools as tools  # noqa: E402
+from mcp_mssql import metrics  # noqa: E402
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], object]
+    tsql: bool = False
+    setup: Callable[[], None] | None = None
+
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    peak_kib: float
+    baseline: dict = field(default_factory=dict)
+
+
+def use_engine(engine):
+    # Point every module that talks to the database at the stand-in.
+    registry._registry = registry.EngineRegistry.single(engine)
+    metrics.instrument_pool(engine, "bench")
+
+
+def plain(tool) -> Callable:
+    # Tools are wrapped for the worker pool; benchmark the tool body itself.
+    return getattr(tool, "__wrapped__", tool)
+
+
+def cycle(items: list) -> Callable[[], object]:
+    state = {"i": 0}
+
+    def next_item():
+        item = items[state["i"] % len(items)]
+        state["i"] += 1
+        return item
+    return next_item
+
+
+def build_cases(dataset: Dataset) -> list[Case]:
+    cases: list[Case] = []
+    add = cases.append
+
+    cold, warm = QueryValidator(cache_size=0), QueryValidator()
+    for q in CORPUS:
+        warm.check(q)
+    next_query = cycle(CORPUS)
+    add(Case("validator.check.cold", lambda: cold.check(next_query())))
+    add(Case("validator.check.warm", lambda: warm.check(next_query())))
+
+    from backends import tall_row, wide_row
+    wide_cols = [f"C{c:02d}" for c in range(dataset.wide_columns)]
+    wide = [wide_row(i, dataset.wide_columns) for i in range(dataset.wide_rows)]
+    tall_cols = ["Id", "CustomerId", "Customer", "Amount"]
+    tall = [tall_row(i) for i in range(dataset.tall_rows)]
+    add(Case("serialize.rows.wide", lambda: dumps(
+        {"columns": wide_cols, "rows": [dict(zip(wide_cols, r)) for r in wide]})))
+    add(Case("serialize.columnar.wide", lambda: dumps(
+        {"columns": wide_cols, "data": to_columnar(wide_cols, wide)})))
+    add(Case("serialize.rows.tall", lambda: dumps(
+        {"columns": tall_cols, "rows": [dict(zip(tall_cols, r)) for r in tall]})))
+
+    add(Case("executor.execute.point", lambda: executor.execute(
+        "SELECT Id, Customer FROM Tall WHERE Id = :id", {"id": 7})))
+    add(Case("executor.execute.tall", lambda: executor.execute("SELECT * FROM Tall")))
+    add(Case("executor.execute.tall.columnar", lambda: executor.execute(
+        "SELECT * FROM Tall", format="columnar")))
+    add(Case("executor.execute.wide", lambda: executor.execute("SELECT * FROM Wide")))
+    add(Case("executor.execute_batch.8", lambda: executor.execute_batch(
+        [("SELECT * FROM Wide", None)] * 4 + [("SELECT * FROM Tall", None)] * 4, max_parallel=4)))
+
+    add(Case("schema.refresh.full", lambda: schema_cache.refresh(full=True), tsql=True))
+    add(Case("schema.refresh.incremental", lambda: schema_cache.refresh(), tsql=True))
+    add(Case("schema.index.build", lambda: SchemaIndex(0, schema_cache.get_full_schema()), tsql=True))
+
+    get_schema = plain(tools.get_database_schema)
+    add(Case("tool.get_database_schema.full", lambda: get_schema(), tsql=True))
+    add(Case("tool.get_database_schema.filtered", lambda: get_schema(table_filter="T012"), tsql=True))
+    add(Case("tool.get_database_schema.column", lambda: get_schema(
+        column_name="T00010Id", include_relationships=False), tsql=True))
+    add(Case("tool.get_database_schema.page", lambda: get_schema(limit=100, offset=1000), tsql=True))
+    related = plain(tools.find_related_tables)
+    add(Case("tool.find_related_tables", lambda: related("T00042"), tsql=True))
+    join_path = plain(tools.find_join_path)
+    add(Case("tool.find_join_path.2", lambda: join_path(["T04999", "T00001"]), tsql=True))
+    add(Case("tool.find_join_path.4", lambda: join_path(
+        ["T04999", "T03001", "T02500", "T00010"]), tsql=True))
+
+    sql = plain(tools.execute_sql_query)
+    add(Case("tool.execute_sql_query.tall", lambda: sql("SELECT * FROM Tall")))
+    add(Case("tool.execute_sql_query.wide.columnar", lambda: sql("SELECT * FROM Wide", format="columnar")))
+    parameterized = plain(tools.execute_parameterized_query)
+    add(Case("tool.execute_parameterized_query", lambda: parameterized(
+        "SELECT Id, Customer FROM Tall WHERE CustomerId = :customer", {"customer": 1001})))
+    batch = plain(tools.execute_query_batch)
+    add(Case("tool.execute_query_batch", lambda: batch(
+        query_template="SELECT Id, Amount FROM Tall WHERE CustomerId = :c",
+        parameter_sets=[{"c": 1000 + i} for i in range(16)])))
+
+    paged, fetch_page, close_page = (
+        plain(tools.execute_paged_query), plain(tools.fetch_query_page), plain(tools.close_paged_query)
+    )
+
+    def page_through():
+        page = json.loads(paged("SELECT * FROM Tall", page_size=1000))
+        for _ in range(4):
+            page = json.loads(fetch_page(page["continuation_token"]))
+        close_page(page["continuation_token"])
+    add(Case("tool.paged_query.5_pages", page_through, tsql=True))
+
+    sample = plain(tools.get_table_sample)
+    add(Case("tool.get_table_sample", lambda: sample("Wide", sample_size=100), tsql=True))
+    profile = plain(tools.profile_table)
+
+    def profile_uncached():
+        schema_cache._profiles.clear()
+        return profile("T00042")
+    add(Case("tool.profile_table.build", profile_uncached, tsql=True))
+    add(Case("tool.profile_table.cached", lambda: profile("T00042"), tsql=True))
+    plan = plain(tools.get_query_execution_plan)
+    add(Case("tool.get_query_execution_plan", lambda: plan("SELECT * FROM Tall WHERE Id > 10"), tsql=True))
+    refresh = plain(tools.refresh_schema_cache)
+    add(Case("tool.refresh_schema_cache", lambda: refresh(), tsql=True))
+    add(Case("tool.get_server_stats", plain(tools.get_server_stats)))
+    add(Case("tool.get_slow_queries", lambda: plain(tools.get_slow_queries)(10, "p95_ms")))
+    add(Case("tool.list_databases", plain(tools.list_databases)))
+    export = plain(tools.export_query_results)
+
+    def export_tall():
+        try:
+            return export("SELECT * FROM Tall")
+        finally:
+            result_spool.clear()
+    add(Case("tool.export_query_results.csv", export_tall))
+
+    loop = asyncio.new_event_loop()
+    add(Case("tool.execute_sql_query.offloaded", lambda: loop.run_until_complete(
+        tools.execute_sql_query("SELECT Id, Customer FROM Tall WHERE Id = 7"))))
+
+    # Write cases go last: they enable writes and grow Tall for the rest of the run.
+    def allow_writes():
+        settings.ALLOW_WRITE_OPERATIONS = True
+    insert = "INSERT INTO Tall (CustomerId, Customer, Amount) VALUES (:c, :name, :amount)"
+    rows = [{"c": 1000 + i, "name": f"customer {i}", "amount": i * 1.5} for i in range(500)]
+    csv = "c,name,amount\n" + "".join(f"{r['c']},{r['name']},{r['amount']}\n" for r in rows)
+    bulk, upload = plain(tools.execute_bulk), plain(tools.upload_csv)
+    add(Case("tool.execute_bulk.500", lambda: bulk(insert, rows, chunk_size=100), setup=allow_writes))
+
+    def upload_and_load():
+        try:
+            resource = json.loads(upload(csv))["csv_resource"]
+            return bulk(insert, csv_resource=resource, chunk_size=100)
+        finally:
+            result_spool.clear()
+    add(Case("tool.upload_csv+execute_bulk.500", upload_and_load, setup=allow_writes))
+    return cases
+
+
+def measure(case: Case, min_time: float, max_iterations: int) -> Result:
+    if case.setup:
+        case.setup()
+    case.fn()  # warm-up: first-call caches, pool connections, imports
+
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_iterations and (len(timings) < 5 or time.perf_counter() < deadline):
+        t0 = time.perf_counter()
+        case.fn()
+        timings.append(time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    case.fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    n = len(timings)
+    return Result(
+        name=case.name,
+        iterations=n,
+        ops_per_sec=n / sum(timings),
+        p50_ms=timings[n // 2] * 1000,
+        p99_ms=timings[min(n - 1, int(n * 0.99))] * 1000,
+        peak_kib=(peak - base) / 1024,
+    )
+
+
+def compare(results: list[Result], path: str, threshold: float) -> list[str]:
+    with open(path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for r in results:
+        old = baseline.get(r.name)
+        if not old:
+            continue
+        r.baseline = old
+        if r.p50_ms > old["p50_ms"] * (1 + threshold):
+            regressions.append(f"{r.name}: p50 {old['p50_ms']:.3f} -> {r.p50_ms:.3f} ms")
+        if r.peak_kib > old["peak_kib"] * (1 + threshold) and r.peak_kib - old["peak_kib"] > 64:
+            regressions.append(f"{r.name}: peak {old['peak_kib']:.0f} -> {r.peak_kib:.0f} KiB")
+    return regressions
+
+
+def report(results: list[Result], skipped: list[str]):
+    print("=" * 104)
+    print(f"  {'case':<40} {'iters':>6} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'peak KiB':>10}  vs base")
+    print("=" * 104)
+    for r in results:
+        delta = ""
+        if r.baseline:
+            delta = f"{100 * (r.p50_ms - r.baseline['p50_ms']) / r.baseline['p50_ms']:+7.1f}%"
+        print(f"  {r.name:<40} {r.iterations:>6} {r.ops_per_sec:>10.1f} {r.p50_ms:>10.3f} "
+              f"{r.p99_ms:>10.3f} {r.peak_kib:>10.1f}  {delta}")
+    if skipped:
+        print(f"\n  skipped (T-SQL only on this backend): {', '.join(skipped)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="fake")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--tables", type=int, default=5000)
+    parser.add_argument("--wide-columns", type=int, default=60)
+    parser.add_argument("--wide-rows", type=int, default=2000)
+    parser.add_argument("--tall-rows", type=int, default=settings.MAX_ROWS)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per case")
+    parser.add_argument("--max-iterations", type=int, default=1000)
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--strict", action="store_true", help="exit 1 on regressions")
+    args = parser.parse_args()
+
+    dataset = Dataset(args.tables, args.wide_columns, args.wide_rows, args.tall_rows)
+    t0 = time.perf_counter()
+    use_engine(BACKENDS[args.backend](dataset))
+    print(f"backend={args.backend} tables={dataset.tables} wide={dataset.wide_rows}x{dataset.wide_columns} "
+          f"tall={dataset.tall_rows}x4 setup={time.perf_counter() - t0:.1f}s python={platform.python_version()}")
+
+    results, skipped = [], []
+    for case in build_cases(dataset):
+        if args.filter not in case.name:
+            continue
+        if case.tsql and args.backend != "fake":
+            skipped.append(case.name)
+            continue
+        results.append(measure(case, args.min_time, args.max_iterations))
+
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    report(results, skipped)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "backend": args.backend,
+                    "dataset": vars(dataset),
+                    "python": platform.python_version(),
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                "results": {
+                    r.name: {k: round(v, 4) if isinstance(v, float) else v
+                             for k, v in vars(r).items() if k not in ("name", "baseline")}
+                    for r in results
+                },
+            }, f, indent=2)
+        print(f"\n  baseline written to {args.save}")
+
+    if regressions:
+        print(f"\n  {len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"    {line}")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
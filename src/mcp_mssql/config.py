@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import List
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,20 +14,84 @@ class Settings(BaseSettings):
     MSSQL_DRIVER: str = Field(default="ODBC Driver 18 for SQL Server")
     MSSQL_ENCRYPT: bool = Field(default=True)
     MSSQL_TRUST_SERVER_CERT: bool = Field(default=False)
+    # "host" or "host:port"; connected with ApplicationIntent=ReadOnly.
+    MSSQL_READ_REPLICAS: List[str] = Field(default=[])
+    # Extra databases by the name tools address them with, e.g.
+    # {"Sales": {}} or {"Sales": {"server": "...", "database": "...", "read_replicas": [...]}};
+    # also port, username, password and route_reads. Unset keys fall back to
+    # the MSSQL_* settings; replicas are inherited when server is unset.
+    MSSQL_DATABASES: Dict[str, Dict[str, Any]] = Field(default={})
+    ROUTE_READS_TO_REPLICAS: bool = Field(default=True)
+    REPLICA_MAX_FAILURES: int = Field(default=3)
+    REPLICA_EJECT_SECONDS: float = Field(default=30.0)
 
     POOL_SIZE: int = Field(default=10)
     POOL_MAX_OVERFLOW: int = Field(default=20)
     POOL_TIMEOUT: int = Field(default=30)
     POOL_RECYCLE: int = Field(default=3600)
+    WARMUP_ENABLED: bool = Field(default=True)
+
+    TOOL_WORKERS: int = Field(default=0)
+    MAX_CONCURRENT_PER_CLIENT: int = Field(default=4)
+    ADMISSION_QUEUE_SIZE: int = Field(default=64)
+    ADMISSION_QUEUE_TIMEOUT: float = Field(default=5.0)
 
     MAX_ROWS: int = Field(default=10000)
     QUERY_TIMEOUT: int = Field(default=120)
+    CONNECT_TIMEOUT: int = Field(default=15)
+    RETRY_ATTEMPTS: int = Field(default=3)
+    CIRCUIT_FAILURE_THRESHOLD: int = Field(default=5)
+    CIRCUIT_RESET_TIMEOUT: float = Field(default=30.0)
+    BATCH_MAX_QUERIES: int = Field(default=50)
+    BATCH_MAX_PARALLEL: int = Field(default=8)
+    BULK_CHUNK_ROWS: int = Field(default=1000)
+    BULK_MAX_CHUNK_ROWS: int = Field(default=10_000)
+    BULK_MAX_ROWS: int = Field(default=1_000_000)
     ALLOW_WRITE_OPERATIONS: bool = Field(default=False)
     ALLOWED_SCHEMAS: List[str] = Field(default=["dbo"])
+    VALIDATION_CACHE_SIZE: int = Field(default=512)
+    CURSOR_IDLE_TIMEOUT: int = Field(default=60)
+    MAX_OPEN_CURSORS: int = Field(default=4)
 
     REDIS_URL: str = Field(default="redis://localhost:6379")
     REDIS_ENABLED: bool = Field(default=False)
     SCHEMA_CACHE_TTL: int = Field(default=3600)
+    SCHEMA_REFRESH_INTERVAL: int = Field(default=0)
+    SCHEMA_L1_REVALIDATE_SECONDS: float = Field(default=2.0)
+    SCHEMA_CACHE_COMPRESS_MIN_BYTES: int = Field(default=64 * 1024)
+
+    RESULT_CACHE_ENABLED: bool = Field(default=False)
+    RESULT_CACHE_MAX_ENTRIES: int = Field(default=1000)
+    RESULT_CACHE_MAX_BYTES: int = Field(default=64 * 1024 * 1024)
+    RESULT_CACHE_TTL: int = Field(default=300)
+
+    SINGLE_FLIGHT_ENABLED: bool = Field(default=True)
+    # How long a process waits on another's in-flight call before running its own.
+    SINGLE_FLIGHT_WAIT_SECONDS: float = Field(default=60.0)
+    SINGLE_FLIGHT_MAX_BYTES: int = Field(default=8 * 1024 * 1024)
+
+    PLAN_CACHE_SIZE: int = Field(default=256)
+    PLAN_CACHE_TTL: int = Field(default=600)
+
+    PROFILE_SAMPLE_ROWS: int = Field(default=10000)
+    PROFILE_TOP_VALUES: int = Field(default=5)
+    PROFILE_HISTOGRAM_BUCKETS: int = Field(default=10)
+    PROFILE_STALE_FRACTION: float = Field(default=0.1)
+
+    SPOOL_DIR: str = Field(default="")
+    SPOOL_MAX_BYTES: int = Field(default=2 * 1024 * 1024 * 1024)
+    SPOOL_CHUNK_BYTES: int = Field(default=1024 * 1024)
+    EXPORT_MAX_ROWS: int = Field(default=5_000_000)
+    EXPORT_BATCH_ROWS: int = Field(default=5000)
+
+    METRICS_ENABLED: bool = Field(default=True)
+
+    WORKLOAD_ENABLED: bool = Field(default=True)
+    WORKLOAD_MAX_FINGERPRINTS: int = Field(default=2000)
+    WORKLOAD_RECENT_SIZE: int = Field(default=1000)
+    # SQLite file the history is flushed to and reloaded from; empty keeps it in memory only.
+    WORKLOAD_DB_PATH: str = Field(default="")
+    WORKLOAD_FLUSH_SECONDS: int = Field(default=60)
 
     LOG_LEVEL: str = Field(default="INFO")
 
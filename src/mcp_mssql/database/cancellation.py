@@ -0,0 +1,147 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+import structlog
+
+from mcp_mssql.config import settings
+
+log = structlog.get_logger(__name__)
+
+
+class QueryTimeout(RuntimeError):
+    pass
+
+
+class QueryCancelled(RuntimeError):
+    pass
+
+
+class QueryScope:
+    # One tool call (or one batch item). Cursors executed while the scope is
+    # current get its statement timeout and are cancelled with it.
+    def __init__(self, timeout: int, parent: "QueryScope | None" = None):
+        self.timeout = timeout
+        self.parent = parent
+        self.cancelled = False
+        self._cursors: set = set()
+        self._children: set["QueryScope"] = set()
+        self._lock = threading.Lock()
+        if parent is not None:
+            with parent._lock:
+                parent._children.add(self)
+            self.cancelled = parent.cancelled
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            cursors, children = list(self._cursors), list(self._children)
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception as e:
+                log.warning("query.cancel.failed", error=str(e))
+        for child in children:
+            child.cancel()
+
+    def register(self, cursor):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled("Query cancelled")
+            self._cursors.add(cursor)
+
+    def close(self):
+        with self._lock:
+            self._cursors.clear()
+        if self.parent is not None:
+            with self.parent._lock:
+                self.parent._children.discard(self)
+
+
+_current: ContextVar[QueryScope | None] = ContextVar("mssql_query_scope", default=None)
+_counters = {"timed_out": 0, "cancelled": 0}
+_counters_lock = threading.Lock()
+
+
+def bind(scope: QueryScope):
+    _current.set(scope)
+
+
+def current() -> QueryScope | None:
+    return _current.get()
+
+
+def _count(name: str):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def stats() -> dict:
+    with _counters_lock:
+        return dict(_counters)
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    orig = getattr(exc, "orig", None) or exc
+    args = getattr(orig, "args", ())
+    return bool(args) and args[0] == "HYT00"
+
+
+@contextmanager
+def statement_scope(timeout: int | None = None):
+    parent = _current.get()
+    default = parent.timeout if parent is not None else settings.QUERY_TIMEOUT
+    scope = QueryScope(timeout or default, parent)
+    token = _current.set(scope)
+    try:
+        if scope.cancelled:
+            raise QueryCancelled("Query cancelled")
+        yield scope
+    except (QueryCancelled, QueryTimeout):
+        if scope.cancelled:
+            _count("cancelled")
+        raise
+    except Exception as e:
+        if scope.cancelled:
+            _count("cancelled")
+            log.info("query.cancelled")
+            raise QueryCancelled("Query cancelled by the client") from e
+        if _is_timeout(e):
+            _count("timed_out")
+            log.warning("query.timed_out", timeout=scope.timeout)
+            raise QueryTimeout(f"Query exceeded its timeout of {scope.timeout}s") from e
+        raise
+    finally:
+        _current.reset(token)
+        scope.close()
+
+
+def _before_execute(conn, clauseelement, multiparams, params, execution_options):
+    # pyodbc copies the connection's timeout into each cursor it creates, so
+    # it is set here, before SQLAlchemy creates the statement's cursor.
+    scope = _current.get()
+    conn.connection.dbapi_connection.timeout = scope.timeout if scope is not None else settings.QUERY_TIMEOUT
+
+
+def _reset_timeout(dbapi_connection, connection_record):
+    if dbapi_connection is not None:
+        dbapi_connection.timeout = settings.QUERY_TIMEOUT
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    scope = _current.get()
+    if scope is not None:
+        scope.register(cursor)
+
+
+def install(engine):
+    # Imported here so the tool layer can load without SQLAlchemy.
+    from sqlalchemy import event
+
+    listeners = [("before_cursor_execute", _before_cursor_execute)]
+    if engine.dialect.driver == "pyodbc":
+        listeners += [("before_execute", _before_execute), ("checkin", _reset_timeout)]
+    for name, fn in listeners:
+        if not event.contains(engine, name, fn):
+            event.listen(engine, name, fn)
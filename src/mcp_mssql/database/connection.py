@@ -1,35 +1,103 @@
 from sqlalchemy import create_engine, event
 from sqlalchemy.pool import QueuePool
-from sqlalchemy.orm import sessionmaker
 import structlog
 from mcp_mssql.config import settings
+from mcp_mssql.database.cancellation import install as install_statement_timeouts
+from mcp_mssql import metrics
 
 log = structlog.get_logger(__name__)
 
-def build_connection_url() -> str:
+
+def mark_session_dirty(conn, dirty: bool = True):
+    # Flag session state (SET options, USE, temp tables) that must not leak
+    # to the next borrower of this pooled connection.
+    if dirty:
+        conn.info["session_dirty"] = True
+    else:
+        conn.info.pop("session_dirty", None)
+
+
+def _reset_dirty_session(dbapi_conn, record):
+    # There is no client-side sp_reset_connection, so a dirty session is
+    # closed on checkin; the pool reconnects it lazily on the next checkout.
+    if record is not None and record.info.pop("session_dirty", False):
+        record.invalidate()
+        log.info("db.connection.session_reset")
+
+
+def install_session_reset(engine):
+    if not event.contains(engine, "checkin", _reset_dirty_session):
+        event.listen(engine, "checkin", _reset_dirty_session)
+
+
+def build_connection_url(
+    server: str | None = None,
+    port: int | None = None,
+    database: str | None = None,
+    username: str | None = None,
+    password: str | None = None,
+    read_only: bool = False,
+) -> str:
     driver = settings.MSSQL_DRIVER.replace(" ", "+")
     encrypt = "yes" if settings.MSSQL_ENCRYPT else "no"
     trust = "yes" if settings.MSSQL_TRUST_SERVER_CERT else "no"
-    return (
-        f"mssql+pyodbc://{settings.MSSQL_USERNAME}:{settings.MSSQL_PASSWORD}"
-        f"@{settings.MSSQL_SERVER},{settings.MSSQL_PORT}/{settings.MSSQL_DATABASE}"
+    url = (
+        f"mssql+pyodbc://{username or settings.MSSQL_USERNAME}:{password or settings.MSSQL_PASSWORD}"
+        f"@{server or settings.MSSQL_SERVER},{port or settings.MSSQL_PORT}/{database or settings.MSSQL_DATABASE}"
         f"?driver={driver}&Encrypt={encrypt}&TrustServerCertificate={trust}"
     )
+    if read_only:
+        url += "&ApplicationIntent=ReadOnly"
+    return url
+
+
+def build_engine(url: str, pool: str = "primary"):
+    engine = create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=settings.POOL_SIZE,
+        max_overflow=settings.POOL_MAX_OVERFLOW,
+        pool_timeout=settings.POOL_TIMEOUT,
+        pool_recycle=settings.POOL_RECYCLE,
+        pool_pre_ping=True,
+        echo=False,
+        connect_args={"timeout": settings.CONNECT_TIMEOUT},
+        # Only executemany (execute_bulk) uses it: parameters go in one array-bound round trip.
+        fast_executemany=True,
+    )
+
+    install_statement_timeouts(engine)
+    install_session_reset(engine)
+    metrics.instrument_pool(engine, pool)
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_conn, _):
+        log.info("db.connection.established", pool=pool)
+
+    return engine
+
+
+_session_factory = None
+
+
+def get_engine():
+    # The default database's primary; see registry for routing and replicas.
+    from mcp_mssql.database.registry import get_registry
+    return get_registry().get().primary.engine
+
+
+def get_session_factory():
+    global _session_factory
+    if _session_factory is None:
+        from sqlalchemy.orm import sessionmaker
+        _session_factory = sessionmaker(bind=get_engine(), autocommit=False, autoflush=False)
+    return _session_factory
+
 
-engine = create_engine(
-    build_connection_url(),
-    poolclass=QueuePool,
-    pool_size=settings.POOL_SIZE,
-    max_overflow=settings.POOL_MAX_OVERFLOW,
-    pool_timeout=settings.POOL_TIMEOUT,
-    pool_recycle=settings.POOL_RECYCLE,
-    pool_pre_ping=True,
-    echo=False,
-    connect_args={"timeout": settings.QUERY_TIMEOUT},
-)
-
-@event.listens_for(engine, "connect")
-def on_connect(dbapi_conn, _):
-    log.info("db.connection.established")
-
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
\ No newline at end of file
+def __getattr__(name: str):
+    # `connection.engine` and `connection.SessionLocal` predate the accessors.
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,279 @@
+import base64
+import json
+import secrets
+import threading
+import time
+from contextlib import ExitStack
+import sqlglot.expressions as exp
+from sqlalchemy import text
+import structlog
+
+from mcp_mssql.database.registry import get_registry
+from mcp_mssql.database.validator import get_validator
+from mcp_mssql.config import settings
+
+log = structlog.get_logger(__name__)
+
+
+def encode_token(state: dict) -> str:
+    raw = json.dumps(state, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        return json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid continuation token")
+
+
+def _name_columns(select: exp.Select):
+    # A derived table needs every column named and unique: alias
+    # expressions like COUNT(*) and repeated names like a.id, b.id.
+    seen = set()
+    for i, projection in enumerate(select.expressions):
+        if projection.is_star:
+            continue
+        name = projection.alias_or_name if isinstance(projection, (exp.Alias, exp.Column)) else ""
+        if not name or name.lower() in seen:
+            name = f"_col{i + 1}"
+            inner = projection.this if isinstance(projection, exp.Alias) else projection
+            projection.replace(exp.alias_(inner.copy(), name, quoted=True))
+        seen.add(name.lower())
+
+
+def paginate(stmt: exp.Query, offset: int, page_size: int) -> str:
+    no_order = exp.Paren(this=exp.select(exp.null()))
+
+    if isinstance(stmt, exp.Select) and not stmt.args.get("limit") and not stmt.args.get("offset"):
+        paged = stmt.copy()
+        if not paged.args.get("order"):
+            paged = paged.order_by(no_order)
+        return paged.offset(offset).limit(page_size).sql(dialect="tsql")
+
+    # TOP / OFFSET / set operations: wrap as a derived table, hoisting the CTEs
+    # and (for set operations) the ORDER BY onto the outer query.
+    inner = stmt.copy()
+    ctes = inner.find(exp.With)
+    ctes_key = ctes.arg_key if ctes is not None else None
+    if ctes is not None and ctes.parent is inner:
+        ctes.pop()
+    else:
+        ctes = None
+    order = None
+    if not isinstance(inner, exp.Select):
+        # sqlglot attaches a set operation's ORDER BY to its last branch
+        last = inner
+        while not isinstance(last, exp.Select) and last.args.get("expression") is not None:
+            last = last.expression
+        order = inner.args.get("order") or (last.args.get("order") if not last.args.get("limit") else None)
+        if order is not None:
+            order.pop()
+    # A set operation takes its column names from the first branch.
+    first = inner
+    while not isinstance(first, exp.Select) and isinstance(first.this, exp.Expression):
+        first = first.this
+    if isinstance(first, exp.Select):
+        _name_columns(first)
+
+    paged = exp.select("*").from_(inner.subquery("_page"))
+    if order is not None:
+        paged.set("order", order)
+    else:
+        paged = paged.order_by(no_order)
+    paged = paged.offset(offset).limit(page_size)
+    if ctes is not None:
+        paged.set(ctes_key, ctes)
+    return paged.sql(dialect="tsql")
+
+
+class _HeldCursor:
+    # `checkout` holds the routed connection; closing it returns the
+    # connection and the member's outstanding-request slot.
+    def __init__(self, checkout: ExitStack, result, columns: list[str]):
+        self.checkout = checkout
+        self.result = result
+        self.columns = columns
+        self.pending: list = []
+        self.offset = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def close(self):
+        try:
+            self.result.close()
+        finally:
+            self.checkout.close()
+
+
+class CursorStore:
+    def __init__(
+        self,
+        idle_timeout: int = settings.CURSOR_IDLE_TIMEOUT,
+        max_open: int = settings.MAX_OPEN_CURSORS,
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_open = max_open
+        self._cursors: dict[str, _HeldCursor] = {}
+        self._lock = threading.Lock()
+        self._reaper: threading.Thread | None = None
+        self._opened = 0
+        self._reaped = 0
+        self._reexecuted = 0
+
+    def open(
+        self, query: str, params: dict | None = None, page_size: int = 500, database: str | None = None
+    ) -> dict:
+        page_size = max(1, min(page_size, settings.MAX_ROWS))
+        parsed = get_validator().check(query)
+        if not parsed.is_query:
+            raise ValueError("Paged queries must be SELECT statements")
+        target = get_registry().get(database)
+
+        state = {"q": query, "p": params or {}, "o": 0, "s": page_size}
+        if database:
+            state["d"] = target.name
+
+        t0 = time.perf_counter()
+        with self._lock:
+            can_hold = len(self._cursors) < self.max_open
+        if not can_hold:
+            return self._reexecute(state, t0)
+
+        checkout = ExitStack()
+        try:
+            conn = checkout.enter_context(target.connect(parsed.is_read_only))
+            result = conn.execute(text(query), params or {})
+            held = _HeldCursor(checkout, result, list(result.keys()))
+        except BaseException as e:
+            checkout.__exit__(type(e), e, e.__traceback__)
+            raise
+
+        cursor_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._cursors[cursor_id] = held
+            self._opened += 1
+        self._ensure_reaper()
+        log.info("cursor.opened", cursor_id=cursor_id, page_size=page_size)
+
+        state["c"] = cursor_id
+        with held.lock:
+            return self._fetch_held(cursor_id, held, state, t0)
+
+    def fetch(self, token: str) -> dict:
+        state = decode_token(token)
+        t0 = time.perf_counter()
+
+        cursor_id = state.get("c")
+        with self._lock:
+            held = self._cursors.get(cursor_id) if cursor_id else None
+        if held is not None:
+            with held.lock:
+                if self._cursors.get(cursor_id) is held and held.offset == state["o"]:
+                    return self._fetch_held(cursor_id, held, state, t0)
+
+        return self._reexecute(state, t0)
+
+    def close(self, token: str) -> bool:
+        cursor_id = decode_token(token).get("c")
+        with self._lock:
+            held = self._cursors.pop(cursor_id, None) if cursor_id else None
+        if held is None:
+            return False
+        with held.lock:
+            held.close()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": len(self._cursors),
+                "max_open": self.max_open,
+                "opened": self._opened,
+                "reaped": self._reaped,
+                "reexecuted": self._reexecuted,
+            }
+
+    def _fetch_held(self, cursor_id: str, held: _HeldCursor, state: dict, t0: float) -> dict:
+        page_size = state["s"]
+        want = page_size + 1 - len(held.pending)
+        batch = held.pending + (held.result.fetchmany(want) if want > 0 else [])
+        page, held.pending = batch[:page_size], batch[page_size:]
+        held.offset += len(page)
+        has_more = bool(held.pending)
+        held.last_used = time.monotonic()
+
+        if not has_more:
+            with self._lock:
+                self._cursors.pop(cursor_id, None)
+            held.close()
+            log.info("cursor.exhausted", cursor_id=cursor_id)
+
+        rows = [dict(zip(held.columns, row)) for row in page]
+        return self._page(held.columns, rows, state, has_more, t0)
+
+    def _reexecute(self, state: dict, t0: float) -> dict:
+        parsed = get_validator().check(state["q"])
+        if not parsed.is_query:
+            raise ValueError("Paged queries must be SELECT statements")
+        paged_sql = paginate(parsed.statement, state["o"], state["s"] + 1)
+        with get_registry().get(state.get("d")).connect(parsed.is_read_only) as conn:
+            result = conn.execute(text(paged_sql), state["p"])
+            columns = list(result.keys())
+            batch = result.fetchall()
+
+        with self._lock:
+            self._reexecuted += 1
+        state.pop("c", None)
+        has_more = len(batch) > state["s"]
+        rows = [dict(zip(columns, row)) for row in batch[:state["s"]]]
+        return self._page(columns, rows, state, has_more, t0)
+
+    def _page(self, columns: list[str], rows: list[dict], state: dict, has_more: bool, t0: float) -> dict:
+        offset = state["o"]
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+        log.info("query.page", offset=offset, rows=len(rows), elapsed_ms=elapsed_ms)
+        next_token = None
+        if has_more:
+            next_token = encode_token({**state, "o": offset + len(rows)})
+        return {
+            "columns": columns,
+            "rows": rows,
+            "row_count": len(rows),
+            "offset": offset,
+            "has_more": has_more,
+            "continuation_token": next_token,
+            "execution_time_ms": elapsed_ms,
+        }
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="cursor-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1, self.idle_timeout // 4)
+        while True:
+            time.sleep(interval)
+            self.reap_idle()
+
+    def reap_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [cid for cid, held in self._cursors.items() if held.last_used < cutoff]
+            victims = [self._cursors.pop(cid) for cid in expired]
+            self._reaped += len(victims)
+        for held in victims:
+            with held.lock:
+                try:
+                    held.close()
+                except Exception as e:
+                    log.warning("cursor.close.failed", error=str(e))
+        if victims:
+            log.info("cursor.reaped", count=len(victims))
+        return len(victims)
+
+cursor_store = CursorStore()
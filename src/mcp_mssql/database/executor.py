@@ -1,55 +1,521 @@
+import csv
+import itertools
+import math
 import time
-import json
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import sqlglot.expressions as exp
 from sqlalchemy import text
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
 import structlog
 
-from mcp_mssql.database.connection import engine
-from mcp_mssql.database.validator import validator
+from mcp_mssql.database import connection
+from mcp_mssql.database.validator import ParsedQuery, get_validator
+from mcp_mssql.database.registry import EngineRegistry, Target, get_registry
+from mcp_mssql.database.resilience import CONNECTION, CircuitBreaker, classify, is_retryable
+from mcp_mssql.database import cancellation
+from mcp_mssql.database import plan_analyzer
+from mcp_mssql.database.plan_analyzer import plan_cache
+from mcp_mssql.database.result_cache import result_cache, is_cacheable
+from mcp_mssql.database.schema_cache import get_redis
+from mcp_mssql.database.single_flight import SingleFlight
+from mcp_mssql.database.workload import workload_history
+from mcp_mssql.database.spool import MIME_TYPES, result_spool
 from mcp_mssql.config import settings
+from mcp_mssql import metrics
+from mcp_mssql.serialization import RESULT_FORMATS, to_columnar
 
 log = structlog.get_logger(__name__)
 
+def _log_retry(retry_state):
+    log.warning(
+        "query.retry",
+        attempt=retry_state.attempt_number,
+        error=str(retry_state.outcome.exception()),
+    )
+
+
+_BULK_STATEMENTS = (exp.Insert, exp.Update, exp.Merge)
+
+
+def _csv_rows(path: str):
+    # Empty fields are NULLs, as written by CSV exports.
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {k: (v if v != "" else None) for k, v in row.items()}
+
+
+def _bulk_error(e: Exception) -> str:
+    # SQLAlchemy's message repeats the SQL and the bound rows; keep the driver's.
+    orig = getattr(e, "orig", None)
+    return str(orig if orig is not None else e)[:500]
+
+
+def _chunks(rows, size: int):
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
 class QueryExecutor:
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10)
-    )
-    def execute(self, query: str, params: dict | None = None) -> dict:
-        ok, msg = validator.validate(query)
-        if not ok:
-            raise ValueError(f"Validation failed: {msg}")
+    def __init__(self, engine=None, breaker: CircuitBreaker | None = None, registry: EngineRegistry | None = None):
+        self._registry = registry
+        self.flight = SingleFlight("query", get_redis)
+        if engine is not None:
+            cancellation.install(engine)
+            connection.install_session_reset(engine)
+            self._registry = EngineRegistry.single(engine, breaker)
+
+    @property
+    def registry(self) -> EngineRegistry:
+        return self._registry or get_registry()
+
+    @property
+    def engine(self):
+        return self.registry.get().primary.engine
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.registry.get().primary.breaker
+
+    def execute(
+        self,
+        query: str,
+        params: dict | None = None,
+        format: str = "rows",
+        timeout: int | None = None,
+        database: str | None = None,
+    ) -> dict:
+        if format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown result format '{format}', expected one of {RESULT_FORMATS}")
+
+        with metrics.phase("validate"):
+            parsed = get_validator().check(query)
+        target = self.registry.get(database)
 
         t0 = time.perf_counter()
-        with engine.connect() as conn:
-            conn.execute(text(f"SET ROWCOUNT {settings.MAX_ROWS}"))
-            result = conn.execute(text(query), params or {})
-            columns = list(result.keys())
-            rows = [dict(zip(columns, row)) for row in result.fetchall()]
+        try:
+            response = self._respond(parsed, target, query, params, format, timeout)
+        except Exception:
+            workload_history.record(parsed.fingerprint, target.name, (time.perf_counter() - t0) * 1000, error=True)
+            raise
+        workload_history.record(
+            parsed.fingerprint,
+            target.name,
+            (time.perf_counter() - t0) * 1000,
+            response["row_count"],
+            executed=not (response.get("cached") or response.get("coalesced")),
+        )
+        return response
+
+    def _respond(
+        self,
+        parsed: ParsedQuery,
+        target: Target,
+        query: str,
+        params: dict | None,
+        format: str,
+        timeout: int | None,
+    ) -> dict:
+        cache_key = None
+        if result_cache.enabled and is_cacheable(parsed):
+            cache_key = result_cache.make_key(parsed, params, format, target.name)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                log.info("query.cache_hit", rows=cached["row_count"])
+                return {**cached, "cached": True}
+
+        if is_cacheable(parsed):
+            # Identical reads already in flight, here or in another process,
+            # are shared between callers with the same timeout. The scope
+            # bounds how long this caller waits on someone else's call.
+            with cancellation.statement_scope(timeout) as scope:
+                flight_key = cache_key or result_cache.make_key(parsed, params, format, target.name)
+                response, shared = self.flight.do(
+                    f"{flight_key}:{scope.timeout}",
+                    lambda: self._execute(parsed, target, query, params, format, timeout),
+                )
+            if shared:
+                log.info("query.coalesced", rows=response["row_count"])
+                return {**response, "coalesced": True}
+        else:
+            response = self._execute(parsed, target, query, params, format, timeout)
+
+        if result_cache.enabled:
+            if cache_key is not None:
+                result_cache.put(cache_key, response, parsed.tables)
+            else:
+                result_cache.invalidate_statement(parsed)
+
+        return response
+
+    def _execute(
+        self,
+        parsed: ParsedQuery,
+        target: Target,
+        query: str,
+        params: dict | None,
+        format: str,
+        timeout: int | None,
+    ) -> dict:
+        # Ask for one row more than we return so truncation is detected exactly.
+        limit = settings.MAX_ROWS
+        sql = query
+        if parsed.is_query and target.dialect == "mssql":
+            sql = parsed.limited_sql(limit + 1) or query
 
+        t0 = time.perf_counter()
+        with cancellation.statement_scope(timeout):
+            columns, rows, affected = self._run(
+                target, sql, params, limit + 1, parsed.is_read_only, parsed.changes_session, parsed.is_write
+            )
         elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+        truncated = len(rows) > limit
+        if truncated:
+            del rows[limit:]
         log.info("query.executed", rows=len(rows), elapsed_ms=elapsed_ms)
 
-        return {
-            "columns": columns,
-            "rows": rows,
+        response = {"columns": columns}
+        with metrics.phase("shape"):
+            if format == "columnar":
+                response["format"] = "columnar"
+                response["data"] = to_columnar(columns, rows)
+            else:
+                response["rows"] = [dict(zip(columns, row)) for row in rows]
+        response.update({
             "row_count": len(rows),
             "execution_time_ms": elapsed_ms,
-            "truncated": len(rows) == settings.MAX_ROWS,
+            "truncated": truncated,
+        })
+        if affected is not None:
+            response["rows_affected"] = affected
+        return response
+
+    def _run(
+        self,
+        target: Target,
+        sql: str,
+        params: dict | None,
+        max_rows: int,
+        read_only: bool = False,
+        changes_session: bool = False,
+        write: bool = False,
+    ) -> tuple[list[str], list, int | None]:
+        # Returns columns, rows and, for a write without a result set, the
+        # rows it affected. Only permitted writes are committed; anything else
+        # is rolled back when the connection returns to the pool, whatever it
+        # returned.
+        # Each attempt picks its member afresh, so a retry after a replica
+        # connection failure can land on a healthy one. Once a write has been
+        # sent, a lost connection leaves its outcome unknown and running it
+        # again could apply it twice, so only errors the server rolled back
+        # itself (deadlock victim, snapshot conflict) are retried.
+        sent = False
+
+        def retryable(e: BaseException) -> bool:
+            return is_retryable(e) and (read_only or not sent or classify(e) != CONNECTION)
+
+        for attempt in Retrying(
+            retry=retry_if_exception(retryable),
+            stop=stop_after_attempt(settings.RETRY_ATTEMPTS),
+            wait=wait_random_exponential(multiplier=0.5, max=10),
+            before_sleep=_log_retry,
+            reraise=True,
+        ):
+            with attempt, target.connect(read_only) as conn:
+                if changes_session:
+                    connection.mark_session_dirty(conn)
+                sent = True
+                commit = write and settings.ALLOW_WRITE_OPERATIONS
+                with metrics.phase("execute"):
+                    result = conn.execute(text(sql), params or {})
+                columns, rows, affected = [], [], None
+                if not result.returns_rows:
+                    affected = result.rowcount if write else None
+                else:
+                    with metrics.phase("fetch"):
+                        columns, rows = list(result.keys()), result.fetchmany(max_rows)
+                        if commit:
+                            # OUTPUT rows beyond max_rows are read and dropped:
+                            # closing early could stop the write part way.
+                            for _ in result:
+                                pass
+                        # Otherwise closing early discards whatever the server
+                        # still has queued beyond max_rows.
+                        result.close()
+                if commit:
+                    conn.commit()
+                return columns, rows, affected
+
+    def export(
+        self,
+        query: str,
+        params: dict | None = None,
+        format: str = "csv",
+        preview_rows: int = 10,
+        timeout: int | None = None,
+        database: str | None = None,
+    ) -> dict:
+        # Streams the cursor into a spool file batch by batch; only the preview
+        # is kept in memory. Not retried: a partial export is simply discarded.
+        parsed = get_validator().check(query)
+        if not parsed.is_query:
+            raise ValueError("Exports must be SELECT statements")
+        target = self.registry.get(database)
+
+        limit = settings.EXPORT_MAX_ROWS
+        sql = query
+        if target.dialect == "mssql":
+            sql = parsed.limited_sql(limit + 1) or query
+
+        t0 = time.perf_counter()
+        truncated = False
+        with cancellation.statement_scope(timeout), target.connect(parsed.is_read_only) as conn:
+            with metrics.phase("execute"):
+                result = conn.execute(text(sql), params or {})
+            columns = list(result.keys())
+            with metrics.phase("fetch"), result_spool.writer(format, columns, result.cursor.description) as out:
+                batch = result.fetchmany(settings.EXPORT_BATCH_ROWS)
+                preview = [dict(zip(columns, row)) for row in batch[:max(0, preview_rows)]]
+                while batch:
+                    if out.rows + len(batch) > limit:
+                        del batch[limit - out.rows:]
+                        truncated = True
+                    out.write(batch)
+                    if truncated:
+                        break
+                    batch = result.fetchmany(settings.EXPORT_BATCH_ROWS)
+                result.close()
+
+        entry = out.entry
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+        workload_history.record(parsed.fingerprint, target.name, elapsed_ms, entry.rows, bytes=entry.size)
+        log.info("query.exported", rows=entry.rows, bytes=entry.size, format=format, elapsed_ms=elapsed_ms)
+        chunk = result_spool.chunk_bytes
+        return {
+            "export_id": entry.export_id,
+            "format": format,
+            "mime_type": MIME_TYPES[format],
+            "schema": out.schema,
+            "row_count": entry.rows,
+            "truncated": truncated,
+            "size_bytes": entry.size,
+            "chunk_bytes": chunk,
+            "chunks": math.ceil(entry.size / chunk),
+            "resource_uri": f"spool://{entry.export_id}/0/{chunk}",
+            "resource_uri_template": f"spool://{entry.export_id}/{{offset}}/{{length}}",
+            "preview": preview,
+            "execution_time_ms": elapsed_ms,
+        }
+
+    def execute_batch(
+        self,
+        items: list[tuple[str, dict | None]],
+        max_parallel: int = 4,
+        timeout: float = 60,
+        format: str = "rows",
+        database: str | None = None,
+    ) -> dict:
+        if not items:
+            raise ValueError("Batch is empty")
+        database = self.registry.get(database).name
+        if len(items) > settings.BATCH_MAX_QUERIES:
+            raise ValueError(f"Batch exceeds BATCH_MAX_QUERIES ({settings.BATCH_MAX_QUERIES})")
+
+        results: list[dict | None] = [None] * len(items)
+        runnable = []
+        for i, (query, params) in enumerate(items):
+            try:
+                parsed = get_validator().check(query)
+                if not parsed.is_query or parsed.is_write:
+                    raise ValueError("Batch queries must be read-only SELECT statements")
+                runnable.append(i)
+            except ValueError as e:
+                results[i] = {"error": str(e)}
+
+        t0 = time.perf_counter()
+        deadline = t0 + timeout
+        parallel = max(1, min(max_parallel, settings.BATCH_MAX_PARALLEL))
+        pending: dict = {}
+        scopes: dict[int, cancellation.QueryScope] = {}
+        queue = list(reversed(runnable))
+        while queue or pending:
+            while queue and len(pending) < parallel and time.perf_counter() < deadline:
+                i = queue.pop()
+                query, params = items[i]
+                # Each item's statement timeout is capped by what is left of the deadline.
+                remaining = max(1, math.ceil(deadline - time.perf_counter()))
+                scopes[i] = cancellation.QueryScope(remaining, cancellation.current())
+                ctx = contextvars.copy_context()
+                ctx.run(cancellation.bind, scopes[i])
+                pending[_batch_pool.submit(ctx.run, self.execute, query, params, format, None, database)] = i
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not pending:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = {"error": str(e)}
+                scopes.pop(i).close()
+
+        for future, i in pending.items():
+            future.cancel()
+            scopes[i].cancel()
+            scopes[i].close()
+            results[i] = {"error": f"Batch deadline of {timeout}s exceeded"}
+        for i in queue:
+            results[i] = {"error": f"Not started: batch deadline of {timeout}s exceeded"}
+
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+        failed = sum(1 for r in results if "error" in r)
+        log.info("query.batch", queries=len(items), failed=failed, parallel=parallel, elapsed_ms=elapsed_ms)
+        return {
+            "results": [{"index": i, **r} for i, r in enumerate(results)],
+            "succeeded": len(items) - failed,
+            "failed": failed,
+            "execution_time_ms": elapsed_ms,
         }
 
-    def get_execution_plan(self, query: str) -> dict:
-        ok, msg = validator.validate(query)
-        if not ok:
-            raise ValueError(f"Validation failed: {msg}")
+    def execute_bulk(
+        self,
+        query: str,
+        parameter_sets: list[dict] | None = None,
+        csv_resource: str = "",
+        chunk_size: int = 0,
+        stop_on_error: bool = False,
+        timeout: int | None = None,
+        database: str | None = None,
+    ) -> dict:
+        # One validation and one connection for the whole load. Each chunk is
+        # one executemany (fast_executemany on pyodbc) in its own transaction,
+        # so a failing chunk rolls back alone and the rest carry on.
+        parsed = get_validator().check(query)
+        if not isinstance(parsed.statement, _BULK_STATEMENTS):
+            raise ValueError("Bulk statements must be a single INSERT, UPDATE or MERGE")
+        names = {p.name for p in parsed.statement.find_all(exp.Placeholder) if p.name}
+        if not names:
+            raise ValueError("Bulk statements need :name parameters")
+        if bool(parameter_sets) == bool(csv_resource):
+            raise ValueError("Pass either parameter_sets or csv_resource")
+        if parameter_sets and len(parameter_sets) > settings.BULK_MAX_ROWS:
+            raise ValueError(f"Bulk load exceeds BULK_MAX_ROWS ({settings.BULK_MAX_ROWS})")
+        target = self.registry.get(database)
+
+        if csv_resource:
+            export_id = csv_resource.removeprefix("spool://").split("/")[0]
+            rows = itertools.islice(_csv_rows(result_spool.path(export_id, "csv")), settings.BULK_MAX_ROWS + 1)
+        else:
+            rows = parameter_sets
+        chunk_size = max(1, min(chunk_size or settings.BULK_CHUNK_ROWS, settings.BULK_MAX_CHUNK_ROWS))
+        chunks = _chunks(rows, chunk_size)
+        first = next(chunks, [])
+        missing = names - first[0].keys() if first else names
+        if missing:
+            raise ValueError(f"Parameter sets are missing {sorted(missing)}")
+
+        t0 = time.perf_counter()
+        reports, submitted, failed = [], 0, 0
+        truncated = stopped = False
+        with cancellation.statement_scope(timeout) as scope, target.connect() as conn:
+            for index, chunk in enumerate(itertools.chain([first], chunks)):
+                if submitted + len(chunk) > settings.BULK_MAX_ROWS:
+                    del chunk[settings.BULK_MAX_ROWS - submitted:]
+                    truncated = True
+                    if not chunk:
+                        break
+                c0 = time.perf_counter()
+                report = {"index": index, "first_row": submitted, "rows": len(chunk)}
+                incomplete = next((i for i, row in enumerate(chunk) if not names <= row.keys()), None)
+                if incomplete is not None:
+                    # Not sent: one short row would fail the executemany anyway.
+                    failed += len(chunk)
+                    missing = sorted(names - chunk[incomplete].keys())
+                    report["error"] = f"Row {submitted + incomplete} is missing parameters {missing}"
+                    log.warning("query.bulk.chunk_failed", index=index, rows=len(chunk), error=report["error"])
+                    stopped = stop_on_error
+                else:
+                    try:
+                        with conn.begin():
+                            conn.execute(text(query), chunk)
+                    except Exception as e:
+                        if scope.cancelled:
+                            raise
+                        failed += len(chunk)
+                        report["error"] = _bulk_error(e)
+                        log.warning("query.bulk.chunk_failed", index=index, rows=len(chunk), error=report["error"])
+                        stopped = stop_on_error or classify(e) == CONNECTION
+                report["elapsed_ms"] = round((time.perf_counter() - c0) * 1000, 2)
+                reports.append(report)
+                submitted += len(chunk)
+                if stopped or truncated:
+                    break
+
+        if result_cache.enabled:
+            result_cache.invalidate_statement(parsed)
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+        workload_history.record(parsed.fingerprint, target.name, elapsed_ms, submitted - failed, error=failed > 0)
+        log.info("query.bulk", rows=submitted, failed=failed, chunks=len(reports), elapsed_ms=elapsed_ms)
+        return {
+            "rows_submitted": submitted,
+            "rows_succeeded": submitted - failed,
+            "rows_failed": failed,
+            "chunks_failed": sum(1 for r in reports if "error" in r),
+            "stopped_early": stopped,
+            "truncated": truncated,
+            "rows_per_second": round(submitted / (elapsed_ms / 1000)) if elapsed_ms else None,
+            "execution_time_ms": elapsed_ms,
+            "chunks": reports,
+        }
+
+    def get_execution_plan(
+        self, query: str, include_xml: bool = False, top: int = 5, database: str | None = None
+    ) -> dict:
+        parsed = get_validator().check(query)
+        target = self.registry.get(database)
+        key = f"{target.name}\x00{top}\x00{parsed.normalized}"
+
+        if not include_xml:
+            cached = plan_cache.get(key)
+            if cached is not None:
+                return {**cached, "cached": True}
+
+        t0 = time.perf_counter()
+        documents = self._showplan(target, query)
+        statements = [s for doc in documents for s in plan_analyzer.digest(doc, top)]
+        response = {
+            "statements": statements,
+            "estimated_cost": round(sum(s["estimated_cost"] for s in statements), 4),
+            "plan_bytes": sum(len(doc) for doc in documents),
+            "analysis_ms": round((time.perf_counter() - t0) * 1000, 2),
+        }
+        plan_cache.put(key, response)
+        if include_xml:
+            response = {**response, "plan_xml": documents[0] if len(documents) == 1 else documents}
+        return response
 
-        with engine.connect() as conn:
+    def _showplan(self, target: Target, query: str) -> list[str]:
+        # One XML document per batch row and per result set; read them all
+        # straight from the DBAPI cursor so nextset() is still available.
+        # Plans come from the primary: a secondary's statistics may lag.
+        with cancellation.statement_scope(), target.connect() as conn:
+            connection.mark_session_dirty(conn)
             conn.execute(text("SET SHOWPLAN_XML ON"))
-            plan_result = conn.execute(text(query))
-            plan_xml = plan_result.fetchone()[0]
-            conn.execute(text("SET SHOWPLAN_XML OFF"))
+            try:
+                result = conn.execute(text(query))
+                cursor = result.cursor
+                documents = [row[0] for row in cursor.fetchall()]
+                while cursor.nextset():
+                    documents.extend(row[0] for row in cursor.fetchall())
+                result.close()
+            finally:
+                conn.execute(text("SET SHOWPLAN_XML OFF"))
+            connection.mark_session_dirty(conn, False)
+        return documents
 
-        return {"plan_xml": plan_xml}
+_batch_pool = ThreadPoolExecutor(max_workers=settings.BATCH_MAX_PARALLEL, thread_name_prefix="mcp-batch")
 
 executor = QueryExecutor()
\ No newline at end of file
@@ -0,0 +1,163 @@
+from collections import deque
+
+
+def _quote(key: str) -> str:
+    return ".".join(f"[{part}]" for part in key.split(".", 1))
+
+
+class ForeignKeyGraph:
+    # Undirected adjacency list over FK constraints, built once per schema
+    # version. Composite keys are one edge carrying every column pair.
+    def __init__(self, version: int, tables: dict):
+        self.version = version
+        self._keys = {key.lower(): key for key in tables}
+        self._short: dict[str, list[str]] = {}
+        for key in tables:
+            self._short.setdefault(key.split(".", 1)[-1].lower(), []).append(key)
+
+        constraints: dict[tuple[str, str], dict] = {}
+        for child, table in tables.items():
+            for fk in table["foreign_keys"]:
+                parent = self._keys.get(
+                    f"{fk.get('references_schema', 'dbo')}.{fk['references_table']}".lower()
+                )
+                if parent is None:
+                    continue
+                edge = constraints.setdefault((child, fk["fk_name"]), {
+                    "fk_name": fk["fk_name"], "child": child, "parent": parent, "columns": [],
+                })
+                edge["columns"].append((fk["column"], fk["references_column"]))
+
+        self._adjacent: dict[str, list[dict]] = {key: [] for key in tables}
+        for edge in constraints.values():
+            self._adjacent[edge["child"]].append(edge)
+            if edge["parent"] != edge["child"]:
+                self._adjacent[edge["parent"]].append(edge)
+
+    def resolve(self, name: str) -> str:
+        name = name.replace("[", "").replace("]", "").strip()
+        key = self._keys.get(name.lower())
+        if key:
+            return key
+        matches = self._short.get(name.lower(), [])
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            raise ValueError(f"Table '{name}' is ambiguous: {', '.join(sorted(matches))}")
+        raise ValueError(f"Unknown table '{name}'")
+
+    def related(self, table: str) -> list[dict]:
+        key = self.resolve(table)
+        return [
+            {
+                "child_table": edge["child"],
+                "child_column": child_col,
+                "parent_table": edge["parent"],
+                "parent_column": parent_col,
+                "fk_name": edge["fk_name"],
+            }
+            for edge in self._adjacent[key]
+            for child_col, parent_col in edge["columns"]
+        ]
+
+    def join_paths(self, tables: list[str], max_paths: int = 3) -> list[dict]:
+        keys = list(dict.fromkeys(self.resolve(t) for t in tables))
+        if len(keys) < 2:
+            raise ValueError("At least two distinct tables are required")
+        if len(keys) == 2:
+            return [self._describe(keys[0], path) for path in self._shortest(keys[0], keys[1], max_paths)]
+        return [self._describe(keys[0], self._steiner(keys))]
+
+    def _shortest(self, source: str, target: str, max_paths: int) -> list[list[tuple[dict, str]]]:
+        depth = {source: 0}
+        parents: dict[str, list[tuple[dict, str]]] = {source: []}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                break
+            for edge in self._adjacent[node]:
+                nxt = edge["parent"] if edge["child"] == node else edge["child"]
+                if nxt not in depth:
+                    depth[nxt] = depth[node] + 1
+                    parents[nxt] = []
+                    queue.append(nxt)
+                if depth[nxt] == depth[node] + 1:
+                    parents[nxt].append((edge, node))
+        if target not in depth:
+            raise ValueError(f"No foreign-key path between {source} and {target}")
+
+        paths: list[list[tuple[dict, str]]] = []
+
+        def walk(node: str, suffix: list[tuple[dict, str]]):
+            if len(paths) >= max_paths:
+                return
+            if node == source:
+                paths.append(suffix)
+                return
+            for edge, prev in parents[node]:
+                walk(prev, [(edge, node)] + suffix)
+
+        walk(target, [])
+        return paths
+
+    def _steiner(self, keys: list[str]) -> list[tuple[dict, str]]:
+        # Greedy Steiner-tree approximation: repeatedly attach the terminal
+        # closest to the current tree via its shortest FK path.
+        tree = {keys[0]}
+        remaining = set(keys[1:])
+        joins: list[tuple[dict, str]] = []
+        while remaining:
+            back: dict[str, tuple[dict, str] | None] = {node: None for node in tree}
+            queue = deque(tree)
+            found = None
+            while queue and found is None:
+                node = queue.popleft()
+                for edge in self._adjacent[node]:
+                    nxt = edge["parent"] if edge["child"] == node else edge["child"]
+                    if nxt in back:
+                        continue
+                    back[nxt] = (edge, node)
+                    if nxt in remaining:
+                        found = nxt
+                        break
+                    queue.append(nxt)
+            if found is None:
+                raise ValueError(f"No foreign-key path connects {', '.join(sorted(remaining))}")
+
+            branch = []
+            node = found
+            while back[node] is not None:
+                edge, prev = back[node]
+                branch.append((edge, node))
+                node = prev
+            for edge, node in reversed(branch):
+                joins.append((edge, node))
+                tree.add(node)
+                remaining.discard(node)
+        return joins
+
+    def _describe(self, root: str, joins: list[tuple[dict, str]]) -> dict:
+        alias = {root: "t0"}
+        lines = [f"FROM {_quote(root)} AS t0"]
+        steps = []
+        for edge, joined in joins:
+            alias[joined] = f"t{len(alias)}"
+            child, parent = alias[edge["child"]], alias[edge["parent"]]
+            on = " AND ".join(
+                f"{child}.[{child_col}] = {parent}.[{parent_col}]"
+                for child_col, parent_col in edge["columns"]
+            )
+            lines.append(f"JOIN {_quote(joined)} AS {alias[joined]} ON {on}")
+            steps.append({
+                "fk_name": edge["fk_name"],
+                "child_table": edge["child"],
+                "parent_table": edge["parent"],
+                "on": on,
+            })
+        return {
+            "tables": list(alias),
+            "hops": len(steps),
+            "joins": steps,
+            "sql": "\n".join(lines),
+        }
@@ -0,0 +1,265 @@
+import io
+import threading
+import time
+from collections import OrderedDict
+from xml.etree.ElementTree import iterparse
+
+from mcp_mssql.config import settings
+
+_SCANS = {"Table Scan", "Clustered Index Scan", "Index Scan", "Columnstore Index Scan"}
+_SEEKS = {"Index Seek", "Clustered Index Seek"}
+_LOOKUPS = {"Key Lookup", "RID Lookup"}
+_SPILLS = {"SpillToTempDb", "SortSpillDetails", "HashSpillDetails", "ExchangeSpillDetails"}
+_OTHER_WARNINGS = {"NoJoinPredicate", "ColumnsWithNoStatistics", "MemoryGrantWarning", "UnmatchedIndexes"}
+# Warnings that showplan writes as attributes of <Warnings> rather than as elements.
+_WARNING_FLAGS = ("NoJoinPredicate", "UnmatchedIndexes")
+_TRUE = {"1", "true"}
+
+_START_TAGS = {
+    "QueryPlan", "MemoryGrantInfo", "RelOp", "Object", "MissingIndexGroup", "MissingIndex",
+    "ColumnGroup", "Column", "PlanAffectingConvert", "ScalarOperator", "IndexScan", "Warnings",
+} | _SPILLS | _OTHER_WARNINGS
+_END_TAGS = {"RelOp", "MissingIndexGroup", "ColumnGroup"}
+
+_MAX_TEXT = 500
+_MAX_CONVERSIONS = 10
+_MAX_SCANS = 20
+_MAX_SPILLS = 20
+
+
+def _tag(elem) -> str:
+    return elem.tag.rpartition("}")[2]
+
+
+def _float(value: str | None) -> float:
+    try:
+        return float(value) if value is not None else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _object_name(attrs: dict) -> str:
+    parts = [attrs.get(k, "").strip("[]") for k in ("Schema", "Table")]
+    name = ".".join(p for p in parts if p)
+    index = attrs.get("Index", "").strip("[]")
+    return f"{name} ({index})" if index else name
+
+
+def _index_suggestion(missing: dict) -> str:
+    keys = missing["equality"] + missing["inequality"]
+    table = missing["table"]
+    name = f"IX_{table.split('.')[-1]}_{'_'.join(keys)}"[:128]
+    sql = f"CREATE INDEX [{name}] ON {'.'.join(f'[{p}]' for p in table.split('.'))} "
+    sql += f"({', '.join(f'[{c}]' for c in keys)})"
+    if missing["include"]:
+        sql += f" INCLUDE ({', '.join(f'[{c}]' for c in missing['include'])})"
+    return sql
+
+
+class _Statement:
+    def __init__(self, attrs: dict):
+        self.text = " ".join(attrs.get("StatementText", "").split())[:_MAX_TEXT]
+        self.type = attrs.get("StatementType", "")
+        self.cost = _float(attrs.get("StatementSubTreeCost"))
+        self.rows = _float(attrs.get("StatementEstRows"))
+        self.dop = None
+        self.memory_grant_kb = None
+        self.operators: list[dict] = []
+        self.counts: dict[str, int] = {}
+        self.scans: list[dict] = []
+        self.seeks = 0
+        self.lookups = 0
+        self.missing_indexes: list[dict] = []
+        self.conversions: list[str] = []
+        self.spills: list[dict] = []
+        self.warnings: set[str] = set()
+
+    def summary(self, top: int) -> dict:
+        ranked = sorted(self.operators, key=lambda op: op["cost"], reverse=True)[:top]
+        for op in ranked:
+            op["cost_pct"] = round(100 * op["cost"] / self.cost, 1) if self.cost else 0.0
+            op["cost"] = round(op["cost"], 4)
+        out = {
+            "statement": self.text,
+            "type": self.type,
+            "estimated_cost": round(self.cost, 4),
+            "estimated_rows": self.rows,
+            "operators": len(self.operators),
+            "operator_counts": self.counts,
+            "top_operators": ranked,
+            "scans": sorted(self.scans, key=lambda s: s["estimated_rows"], reverse=True)[:_MAX_SCANS],
+            "seeks": self.seeks,
+            "lookups": self.lookups,
+            "missing_indexes": self.missing_indexes,
+            "implicit_conversions": self.conversions,
+            "spills": self.spills[:_MAX_SPILLS],
+            "spill_count": len(self.spills),
+            "warnings": sorted(self.warnings),
+        }
+        if self.dop is not None:
+            out["degree_of_parallelism"] = self.dop
+        if self.memory_grant_kb is not None:
+            out["memory_grant_kb"] = self.memory_grant_kb
+        return out
+
+
+def digest(plan_xml: str | bytes, top: int = 5) -> list[dict]:
+    # Single streaming pass. RelOps nest, so a stack tracks each operator's
+    # subtree cost to derive its own cost once its children are closed.
+    if isinstance(plan_xml, str):
+        # The server may declare utf-16 for what the driver hands back as str.
+        if plan_xml.startswith("<?xml"):
+            plan_xml = plan_xml[plan_xml.find("?>") + 2:]
+        plan_xml = plan_xml.encode()
+    source = io.BytesIO(plan_xml)
+    statements: list[_Statement] = []
+    stmt: _Statement | None = None
+    relops: list[list] = []
+    missing: dict | None = None
+    group: list[str] | None = None
+
+    tags: dict[str, str] = {}
+    for event, elem in iterparse(source, events=("start", "end")):
+        tag = tags.get(elem.tag)
+        if tag is None:
+            tag = tags[elem.tag] = _tag(elem)
+        is_stmt = tag.startswith("Stmt")
+        if event == "start":
+            if not is_stmt and tag not in _START_TAGS:
+                continue
+            attrs = elem.attrib
+            if is_stmt and "StatementText" in attrs:
+                stmt = _Statement(attrs)
+                statements.append(stmt)
+            elif stmt is None:
+                continue
+            elif tag == "QueryPlan":
+                if "DegreeOfParallelism" in attrs:
+                    stmt.dop = int(attrs["DegreeOfParallelism"])
+            elif tag == "MemoryGrantInfo":
+                stmt.memory_grant_kb = int(_float(attrs.get("GrantedMemory")))
+            elif tag == "RelOp":
+                op = attrs.get("PhysicalOp", "")
+                node = {
+                    "node_id": int(attrs.get("NodeId", -1)),
+                    "operator": op,
+                    "logical": attrs.get("LogicalOp", ""),
+                    "estimated_rows": _float(attrs.get("EstimateRows")),
+                    "cost": _float(attrs.get("EstimatedTotalSubtreeCost")),
+                }
+                if relops:
+                    relops[-1][1] += node["cost"]
+                relops.append([node, 0.0])
+                stmt.counts[op] = stmt.counts.get(op, 0) + 1
+                if op in _SEEKS:
+                    stmt.seeks += 1
+                elif op in _LOOKUPS:
+                    stmt.lookups += 1
+            elif tag == "IndexScan" and relops and attrs.get("Lookup") in _TRUE:
+                # Key lookups are written as a Clustered Index Seek with Lookup="1".
+                node = relops[-1][0]
+                if node["operator"] in _LOOKUPS:
+                    continue
+                if node["operator"] in _SEEKS:
+                    stmt.seeks -= 1
+                stmt.counts[node["operator"]] -= 1
+                if not stmt.counts[node["operator"]]:
+                    del stmt.counts[node["operator"]]
+                node["operator"] = "Key Lookup"
+                stmt.counts["Key Lookup"] = stmt.counts.get("Key Lookup", 0) + 1
+                stmt.lookups += 1
+            elif tag == "Warnings":
+                stmt.warnings.update(flag for flag in _WARNING_FLAGS if attrs.get(flag) in _TRUE)
+            elif tag == "Object" and relops and "object" not in relops[-1][0]:
+                relops[-1][0]["object"] = _object_name(attrs)
+            elif tag == "MissingIndexGroup":
+                missing = {"impact": _float(attrs.get("Impact"))}
+            elif tag == "MissingIndex" and missing is not None:
+                missing["table"] = _object_name(attrs)
+                missing["equality"], missing["inequality"], missing["include"] = [], [], []
+            elif tag == "ColumnGroup" and missing is not None:
+                group = missing.get(attrs.get("Usage", "").lower())
+            elif tag == "Column" and group is not None:
+                group.append(attrs.get("Name", "").strip("[]"))
+            elif tag == "PlanAffectingConvert":
+                issue = f"{attrs.get('ConvertIssue', '')}: {attrs.get('Expression', '')}"
+                if issue not in stmt.conversions and len(stmt.conversions) < _MAX_CONVERSIONS:
+                    stmt.conversions.append(issue)
+            elif tag == "ScalarOperator":
+                scalar = attrs.get("ScalarString", "")
+                if "CONVERT_IMPLICIT" in scalar and len(stmt.conversions) < _MAX_CONVERSIONS:
+                    scalar = scalar[:200]
+                    if scalar not in stmt.conversions:
+                        stmt.conversions.append(scalar)
+            elif tag in _SPILLS:
+                spill = {"kind": tag}
+                if relops:
+                    spill["node_id"] = relops[-1][0]["node_id"]
+                    spill["operator"] = relops[-1][0]["operator"]
+                spill.update({k: attrs[k] for k in ("SpillLevel", "SpilledThreadCount") if k in attrs})
+                stmt.spills.append(spill)
+            elif tag in _OTHER_WARNINGS:
+                stmt.warnings.add(tag)
+            continue
+
+        # end events
+        if not is_stmt and tag not in _END_TAGS:
+            continue
+        if tag == "RelOp" and relops:
+            node, children = relops.pop()
+            node["cost"] = max(node["cost"] - children, 0.0)
+            if node["operator"] in _SCANS:
+                stmt.scans.append({
+                    "operator": node["operator"],
+                    "object": node.get("object", ""),
+                    "estimated_rows": node["estimated_rows"],
+                })
+            stmt.operators.append(node)
+            elem.clear()
+        elif tag == "MissingIndexGroup" and missing is not None:
+            if "table" in missing:
+                missing["suggestion"] = _index_suggestion(missing)
+                stmt.missing_indexes.append(missing)
+            missing = group = None
+        elif tag == "ColumnGroup":
+            group = None
+        elif tag.startswith("Stmt") and stmt is not None and elem.get("StatementText") is not None:
+            elem.clear()
+
+    return [s.summary(top) for s in statements]
+
+
+class PlanDigestCache:
+    # Digests keyed by the validator's normalized statement. Plans follow
+    # statistics and indexes, so entries also expire after a TTL.
+    def __init__(self, max_entries: int = settings.PLAN_CACHE_SIZE, ttl: int = settings.PLAN_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+plan_cache = PlanDigestCache()
@@ -0,0 +1,220 @@
+import math
+from collections import Counter
+from sqlalchemy import bindparam, text
+import structlog
+
+from mcp_mssql.config import settings
+
+log = structlog.get_logger(__name__)
+
+# Catalog-only; cheap enough to run on every profile request to decide
+# whether a cached profile is still current.
+_SIGNATURE_SQL = """
+    SELECT t.object_id, t.modify_date,
+        (SELECT SUM(p.rows) FROM sys.partitions p
+         WHERE p.object_id = t.object_id AND p.index_id IN (0, 1)) AS row_count
+    FROM sys.tables t
+    JOIN sys.schemas s ON s.schema_id = t.schema_id
+    WHERE s.name = :schema AND t.name = :table
+"""
+
+_STATS_SQL = """
+    SELECT s.stats_id, c.name AS column_name, p.last_updated, p.rows, p.rows_sampled,
+        p.modification_counter
+    FROM sys.stats s
+    JOIN sys.stats_columns sc
+        ON sc.object_id = s.object_id AND sc.stats_id = s.stats_id AND sc.stats_column_id = 1
+    JOIN sys.columns c ON c.object_id = sc.object_id AND c.column_id = sc.column_id
+    CROSS APPLY sys.dm_db_stats_properties(s.object_id, s.stats_id) p
+    WHERE s.object_id = :object_id
+"""
+
+# range_high_key is sql_variant, which pyodbc cannot fetch.
+_HISTOGRAM_SQL = """
+    SELECT h.stats_id, h.step_number, CAST(h.range_high_key AS nvarchar(4000)) AS high_key,
+        h.range_rows, h.equal_rows, h.distinct_range_rows
+    FROM sys.stats s
+    CROSS APPLY sys.dm_db_stats_histogram(s.object_id, s.stats_id) h
+    WHERE s.object_id = :object_id AND s.stats_id IN :ids
+    ORDER BY h.stats_id, h.step_number
+"""
+
+# Types that cannot be compared or grouped, or are too large to sample.
+_UNSAMPLED = {"text", "ntext", "image", "xml", "geography", "geometry", "hierarchyid", "sql_variant"}
+
+_MAX_VALUE_CHARS = 100
+
+
+def _quote(name: str) -> str:
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def _clip(value):
+    if isinstance(value, str) and len(value) > _MAX_VALUE_CHARS:
+        return value[:_MAX_VALUE_CHARS] + "..."
+    return value
+
+
+def signature(conn, schema: str, table: str) -> dict | None:
+    row = conn.execute(text(_SIGNATURE_SQL), {"schema": schema, "table": table}).first()
+    if row is None:
+        return None
+    sig = {"object_id": row.object_id, "modify_date": row.modify_date.isoformat(), "rows": int(row.row_count or 0)}
+    try:
+        stats = conn.execute(text(_STATS_SQL), {"object_id": row.object_id}).all()
+    except Exception as e:
+        # Needs SELECT on the statistics columns; profile from samples only.
+        log.warning("profile.stats.unavailable", table=f"{schema}.{table}", error=str(e))
+        stats = []
+    sig["stats"] = sorted(
+        [s.stats_id, s.column_name, s.last_updated.isoformat() if s.last_updated else None,
+         int(s.rows or 0), int(s.rows_sampled or 0), int(s.modification_counter or 0)]
+        for s in stats
+    )
+    return sig
+
+
+def is_current(old: dict, new: dict, tolerance: float = settings.PROFILE_STALE_FRACTION) -> bool:
+    # Histogram-backed columns only change when their statistics are
+    # rebuilt; sampled columns go stale as rows are modified.
+    if (old["object_id"], old["modify_date"]) != (new["object_id"], new["modify_date"]):
+        return False
+    if [s[:3] for s in old["stats"]] != [s[:3] for s in new["stats"]]:
+        return False
+    drift = max((n[5] - o[5] for o, n in zip(old["stats"], new["stats"])), default=0)
+    drift = max(drift, abs(new["rows"] - old["rows"]))
+    return drift <= tolerance * max(old["rows"], 1)
+
+
+def _merge_buckets(steps: list[tuple], buckets: int) -> list[dict]:
+    # steps: (high_key, range_rows, equal_rows, distinct_range_rows), NULL step excluded.
+    total = sum(s[1] + s[2] for s in steps)
+    target = total / max(1, buckets)
+    out, rows, distinct = [], 0.0, 0.0
+    for i, (high, range_rows, equal_rows, distinct_rows) in enumerate(steps):
+        rows += range_rows + equal_rows
+        distinct += distinct_rows + 1
+        if rows >= target or i == len(steps) - 1:
+            out.append({"upper": _clip(high), "rows": round(rows), "distinct": round(distinct)})
+            rows = distinct = 0.0
+    return out
+
+
+def from_histogram(steps: list, top: int, buckets: int) -> dict:
+    nulls = sum(s.equal_rows for s in steps if s.high_key is None)
+    values = [
+        (s.high_key, float(s.range_rows), float(s.equal_rows), float(s.distinct_range_rows))
+        for s in steps if s.high_key is not None
+    ]
+    total = nulls + sum(v[1] + v[2] for v in values)
+    frequent = sorted(values, key=lambda v: v[2], reverse=True)[:top]
+    return {
+        "source": "statistics",
+        "null_fraction": round(nulls / total, 4) if total else 0.0,
+        "distinct_estimate": round(sum(v[3] for v in values) + len(values)),
+        "min": _clip(values[0][0]) if values else None,
+        "max": _clip(values[-1][0]) if values else None,
+        "top_values": [
+            {"value": _clip(v[0]), "count": round(v[2]), "fraction": round(v[2] / total, 4)}
+            for v in frequent if v[2] > 1
+        ],
+        "histogram": _merge_buckets(values, buckets),
+    }
+
+
+def _estimate_distinct(counts: Counter, sampled: int, total: int) -> int:
+    # Guaranteed-Error Estimator (Charikar et al.): values seen once are
+    # scaled by sqrt(N/n), values seen more than once are counted as-is.
+    if sampled >= total or not sampled:
+        return len(counts)
+    singletons = sum(1 for c in counts.values() if c == 1)
+    return round(math.sqrt(total / sampled) * singletons + (len(counts) - singletons))
+
+
+def from_sample(values: list, total: int, top: int, buckets: int) -> dict:
+    sampled = len(values)
+    present = [v for v in values if v is not None]
+    counts = Counter(present)
+    scale = total / sampled if sampled else 0.0
+    out = {
+        "source": "sample",
+        "null_fraction": round(1 - len(present) / sampled, 4) if sampled else 0.0,
+        "distinct_estimate": _estimate_distinct(counts, sampled, total),
+        "min": None,
+        "max": None,
+        "top_values": [
+            {"value": _clip(v), "count": round(c * scale), "fraction": round(c / sampled, 4)}
+            for v, c in counts.most_common(top) if c > 1
+        ],
+        "histogram": [],
+    }
+    try:
+        ordered = sorted(counts.items())
+    except TypeError:
+        return out
+    if ordered:
+        out["min"], out["max"] = _clip(ordered[0][0]), _clip(ordered[-1][0])
+        out["histogram"] = _merge_buckets([(v, 0.0, c * scale, 0.0) for v, c in ordered], buckets)
+    return out
+
+
+def _sample_sql(schema: str, table: str, columns: list[str], rows: int, sample_rows: int) -> str:
+    select = ", ".join(_quote(c) for c in columns)
+    source = f"{_quote(schema)}.{_quote(table)}"
+    if rows <= sample_rows:
+        return f"SELECT {select} FROM {source}"
+    # TABLESAMPLE picks whole pages, so the sample costs a fraction of a scan.
+    percent = min(100.0, 100.0 * sample_rows / rows * 1.5)
+    return f"SELECT TOP ({sample_rows}) {select} FROM {source} TABLESAMPLE SYSTEM ({percent:.4f} PERCENT)"
+
+
+def build(
+    conn,
+    schema: str,
+    table: str,
+    columns: list[dict],
+    sig: dict,
+    top: int = settings.PROFILE_TOP_VALUES,
+    buckets: int = settings.PROFILE_HISTOGRAM_BUCKETS,
+    sample_rows: int = settings.PROFILE_SAMPLE_ROWS,
+) -> dict:
+    # Prefer, per column, the statistics object sampled most thoroughly.
+    best: dict[str, list] = {}
+    for stat in sig["stats"]:
+        current = best.get(stat[1])
+        if current is None or (stat[4], stat[2] or "") > (current[4], current[2] or ""):
+            best[stat[1]] = stat
+
+    profiles: dict[str, dict] = {}
+    if best:
+        ids = [stat[0] for stat in best.values()]
+        steps: dict[int, list] = {}
+        try:
+            histogram = text(_HISTOGRAM_SQL).bindparams(bindparam("ids", expanding=True))
+            for r in conn.execute(histogram, {"object_id": sig["object_id"], "ids": ids}):
+                steps.setdefault(r.stats_id, []).append(r)
+        except Exception as e:
+            log.warning("profile.histogram.unavailable", table=f"{schema}.{table}", error=str(e))
+        for name, stat in best.items():
+            if stat[0] in steps:
+                profiles[name] = from_histogram(steps[stat[0]], top, buckets)
+                profiles[name]["stats_updated"] = stat[2]
+
+    rows = sig["rows"]
+    sampled = [c["name"] for c in columns if c["name"] not in profiles and c["type"] not in _UNSAMPLED]
+    sampled_rows = 0
+    if sampled and rows:
+        result = conn.execute(text(_sample_sql(schema, table, sampled, rows, sample_rows))).all()
+        sampled_rows = len(result)
+        for i, name in enumerate(sampled):
+            profiles[name] = from_sample([r[i] for r in result], rows, top, buckets)
+
+    return {
+        "table": f"{schema}.{table}",
+        "row_count": rows,
+        "sampled_rows": sampled_rows,
+        "columns": [
+            {"name": c["name"], "type": c["type"], **profiles.get(c["name"], {"source": "none"})}
+            for c in columns
+        ],
+    }
@@ -0,0 +1,200 @@
+import threading
+from contextlib import contextmanager
+import structlog
+
+from mcp_mssql.config import settings
+from mcp_mssql.database.resilience import CONNECTION, CircuitBreaker, classify
+from mcp_mssql import metrics
+
+log = structlog.get_logger(__name__)
+
+
+class Member:
+    # One engine, and so one pool, inside a target: its primary or a replica.
+    def __init__(self, name: str, engine, role: str = "primary", breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.engine = engine
+        self.role = role
+        self.breaker = breaker or CircuitBreaker(name=name)
+        self.outstanding = 0
+        self.served = 0
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "role": self.role,
+            "outstanding": self.outstanding,
+            "served": self.served,
+            "breaker": self.breaker.stats(),
+        }
+
+
+class Target:
+    # A named database: writes go to the primary, validated reads to the
+    # replica with the fewest requests in flight. A replica whose breaker
+    # has opened is ejected until its probe succeeds.
+    def __init__(
+        self,
+        name: str,
+        primary: Member,
+        replicas: list[Member] | None = None,
+        route_reads: bool = settings.ROUTE_READS_TO_REPLICAS,
+    ):
+        self.name = name
+        self.primary = primary
+        self.replicas = replicas or []
+        self.route_reads = route_reads
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._fallbacks = 0
+
+    @property
+    def dialect(self) -> str:
+        return self.primary.engine.dialect.name
+
+    @property
+    def members(self) -> list[Member]:
+        return [self.primary, *self.replicas]
+
+    def choose(self, read_only: bool = False) -> Member:
+        if not (read_only and self.route_reads and self.replicas):
+            return self.primary
+        healthy = [m for m in self.replicas if m.breaker.available()]
+        if not healthy:
+            return self.primary
+        with self._lock:
+            # Rotate the starting point so ties do not always land on the first replica.
+            self._turn = (self._turn + 1) % len(healthy)
+            ordered = healthy[self._turn:] + healthy[:self._turn]
+            return min(ordered, key=lambda m: m.outstanding)
+
+    @contextmanager
+    def connect(self, read_only: bool = False):
+        member = self._admit(read_only)
+        with self._lock:
+            member.outstanding += 1
+            member.served += 1
+        try:
+            with metrics.checkout():
+                conn = member.engine.connect()
+            with conn:
+                yield conn
+        except BaseException as e:
+            member.breaker.record(classify(e) == CONNECTION)
+            raise
+        else:
+            member.breaker.record(False)
+        finally:
+            with self._lock:
+                member.outstanding -= 1
+
+    def _admit(self, read_only: bool) -> Member:
+        member = self.choose(read_only)
+        if member is not self.primary:
+            if member.breaker.allow():
+                return member
+            # Another call took the replica's half-open probe.
+            with self._lock:
+                self._fallbacks += 1
+        self.primary.breaker.admit()
+        return self.primary
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "dialect": self.dialect,
+            "route_reads": self.route_reads,
+            "replica_fallbacks": self._fallbacks,
+            "members": [m.stats() for m in self.members],
+        }
+
+
+def _split_host(address: str) -> tuple[str, int | None]:
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host, int(port)
+    return address, None
+
+
+def _build_target(name: str, config: dict, inherit_replicas: bool) -> Target:
+    from mcp_mssql.database.connection import build_connection_url, build_engine
+
+    options = {
+        "server": config.get("server"),
+        "port": config.get("port"),
+        "database": config.get("database", name),
+        "username": config.get("username"),
+        "password": config.get("password"),
+    }
+    # Replicas of the configured server are assumed to carry its other
+    # databases too; a database on another server lists its own.
+    default_replicas = settings.MSSQL_READ_REPLICAS if inherit_replicas and not options["server"] else []
+    primary = Member(f"{name}:primary", build_engine(build_connection_url(**options), f"{name}:primary"))
+    replicas = []
+    for i, address in enumerate(config.get("read_replicas", default_replicas)):
+        host, port = _split_host(address)
+        member_name = f"{name}:replica{i}"
+        url = build_connection_url(**{**options, "server": host, "port": port or options["port"]}, read_only=True)
+        breaker = CircuitBreaker(settings.REPLICA_MAX_FAILURES, settings.REPLICA_EJECT_SECONDS, name=member_name)
+        replicas.append(Member(member_name, build_engine(url, member_name), "replica", breaker))
+    return Target(name, primary, replicas, config.get("route_reads", settings.ROUTE_READS_TO_REPLICAS))
+
+
+class EngineRegistry:
+    def __init__(self, targets: list[Target], default: str | None = None):
+        if not targets:
+            raise ValueError("EngineRegistry needs at least one database")
+        self.targets = {t.name: t for t in targets}
+        self.default = default or targets[0].name
+        self._names = {name.lower(): name for name in self.targets}
+
+    @classmethod
+    def from_settings(cls) -> "EngineRegistry":
+        targets = [_build_target(settings.MSSQL_DATABASE, {}, True)]
+        for name, config in settings.MSSQL_DATABASES.items():
+            if name.lower() != settings.MSSQL_DATABASE.lower():
+                targets.append(_build_target(name, config or {}, True))
+        log.info(
+            "db.registry.built",
+            databases=[t.name for t in targets],
+            replicas=sum(len(t.replicas) for t in targets),
+        )
+        return cls(targets, settings.MSSQL_DATABASE)
+
+    @classmethod
+    def single(cls, engine, breaker: CircuitBreaker | None = None, name: str = "default") -> "EngineRegistry":
+        return cls([Target(name, Member(f"{name}:primary", engine, breaker=breaker))])
+
+    def get(self, name: str | None = None) -> Target:
+        if not name:
+            return self.targets[self.default]
+        key = self._names.get(name.lower())
+        if key is None:
+            raise ValueError(f"Unknown database '{name}', expected one of {self.names()}")
+        return self.targets[key]
+
+    def is_default(self, name: str | None) -> bool:
+        return self.get(name).name == self.default
+
+    def names(self) -> list[str]:
+        return list(self.targets)
+
+    def members(self) -> list[Member]:
+        return [m for t in self.targets.values() for m in t.members]
+
+    def stats(self) -> dict:
+        return {"default": self.default, "databases": [t.stats() for t in self.targets.values()]}
+
+
+_registry: EngineRegistry | None = None
+_lock = threading.Lock()
+
+
+def get_registry() -> EngineRegistry:
+    # Engines are created on first use, not at import.
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = EngineRegistry.from_settings()
+    return _registry
@@ -0,0 +1,126 @@
+import re
+import threading
+import time
+from sqlalchemy.exc import DBAPIError
+import structlog
+
+from mcp_mssql.config import settings
+
+log = structlog.get_logger(__name__)
+
+CONNECTION = "connection"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# SQLSTATEs reported by the ODBC driver when the link itself failed.
+_CONNECTION_SQLSTATES = {"08S01", "08001", "08003", "08004", "08007", "HYT01"}
+
+# SQL Server error numbers: connection loss / failover / service busy.
+_CONNECTION_ERRORS = {
+    64, 233, 4060, 4221, 976, 983, 10053, 10054, 10060, 10928, 10929,
+    40143, 40197, 40501, 40613, 49918, 49919, 49920,
+}
+# Safe to re-run on a healthy connection: deadlock victim, snapshot conflict.
+_TRANSIENT_ERRORS = {1205, 3960}
+
+_ERROR_NUMBER = re.compile(r"\((\d{2,5})\)")
+
+
+def classify(exc: BaseException) -> str:
+    if isinstance(exc, DBAPIError):
+        if exc.connection_invalidated:
+            return CONNECTION
+        exc = exc.orig if exc.orig is not None else exc
+    args = getattr(exc, "args", ())
+    sqlstate = args[0] if args and isinstance(args[0], str) else ""
+    if sqlstate in _CONNECTION_SQLSTATES:
+        return CONNECTION
+    if sqlstate == "40001":
+        return TRANSIENT
+    numbers = {int(n) for n in _ERROR_NUMBER.findall(" ".join(str(a) for a in args))}
+    if numbers & _CONNECTION_ERRORS:
+        return CONNECTION
+    if numbers & _TRANSIENT_ERRORS:
+        return TRANSIENT
+    return FATAL
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return classify(exc) != FATAL
+
+
+class CircuitOpen(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = settings.CIRCUIT_RESET_TIMEOUT,
+        name: str = "primary",
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._rejected = 0
+        self._trips = 0
+
+    def available(self) -> bool:
+        # Whether allow() could admit a call right now, without claiming the probe.
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.reset_timeout
+            return not self._probing
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "rejected": self._rejected,
+            }
+
+    def admit(self):
+        if not self.allow():
+            with self._lock:
+                self._rejected += 1
+            raise CircuitOpen("Database unavailable: circuit breaker is open, failing fast")
+
+    def allow(self) -> bool:
+        # Admits a call; once half-open, exactly one probe gets through.
+        # Every admitted call must be followed by record().
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, connection_failure: bool):
+        with self._lock:
+            self._probing = False
+            if not connection_failure:
+                if self.state != self.CLOSED:
+                    log.info("circuit.closed", breaker=self.name)
+                self.state, self._failures = self.CLOSED, 0
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._trips += 1
+                    log.warning("circuit.opened", breaker=self.name, failures=self._failures)
+                self.state, self._opened_at = self.OPEN, time.monotonic()
@@ -0,0 +1,151 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+import sqlglot.expressions as exp
+import structlog
+
+from mcp_mssql.database.validator import ParsedQuery
+from mcp_mssql.config import settings
+from mcp_mssql.serialization import dumps
+from mcp_mssql import metrics
+
+log = structlog.get_logger(__name__)
+
+_VOLATILE = (exp.CurrentTimestamp, exp.CurrentDate, exp.CurrentTime, exp.Rand)
+_VOLATILE_NAMES = {"NEWID", "SYSDATETIME", "SYSUTCDATETIME", "SYSDATETIMEOFFSET", "GETUTCDATE"}
+_DML = (exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.TruncateTable)
+
+
+def is_cacheable(parsed: ParsedQuery) -> bool:
+    if not parsed.is_query:
+        return False
+    for node in parsed.statement.find_all(exp.Func):
+        if isinstance(node, _VOLATILE):
+            return False
+        if isinstance(node, exp.Anonymous) and str(node.this).upper() in _VOLATILE_NAMES:
+            return False
+    return True
+
+
+class _Entry:
+    __slots__ = ("value", "tables", "size", "expires_at")
+
+    def __init__(self, value: dict, tables: frozenset[str], size: int, expires_at: float):
+        self.value = value
+        self.tables = tables
+        self.size = size
+        self.expires_at = expires_at
+
+
+class ResultCache:
+    def __init__(
+        self,
+        enabled: bool = settings.RESULT_CACHE_ENABLED,
+        max_entries: int = settings.RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = settings.RESULT_CACHE_MAX_BYTES,
+        ttl: int = settings.RESULT_CACHE_TTL,
+    ):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._by_table: dict[str, set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def make_key(parsed: ParsedQuery, params: dict | None, format: str = "rows", database: str = "") -> str:
+        params_key = json.dumps(params or {}, sort_keys=True, default=str)
+        return "\x00".join((database, format, parsed.normalized, params_key))
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                metrics.cache_lookup("result", False)
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._misses += 1
+                metrics.cache_lookup("result", False)
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            metrics.cache_lookup("result", True)
+            return entry.value
+
+    def put(self, key: str, value: dict, tables: frozenset[str]):
+        size = len(dumps(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, tables, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate_tables(self, tables: frozenset[str]):
+        with self._lock:
+            keys = set()
+            for table in tables:
+                keys |= self._by_table.get(table, set())
+            for key in keys:
+                self._remove(key)
+            self._invalidations += len(keys)
+        if keys:
+            log.info("result_cache.invalidated", tables=sorted(tables), entries=len(keys))
+
+    def invalidate_statement(self, parsed: ParsedQuery):
+        if isinstance(parsed.statement, _DML):
+            self.invalidate_tables(parsed.tables)
+        else:
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+result_cache = ResultCache()
@@ -1,7 +1,15 @@
-import json
-from sqlalchemy import text
-from mcp_mssql.database.connection import engine
+import threading
+import time
+import zlib
+from sqlalchemy import bindparam, text
+from mcp_mssql.database.registry import get_registry
+from mcp_mssql.database.schema_index import SchemaIndex
+from mcp_mssql.database.fk_graph import ForeignKeyGraph
+from mcp_mssql.database import profiler
+from mcp_mssql.database.single_flight import SingleFlight
 from mcp_mssql.config import settings
+from mcp_mssql.serialization import dumps, loads
+from mcp_mssql import metrics
 import structlog
 
 log = structlog.get_logger(__name__)
@@ -9,114 +17,436 @@ log = structlog.get_logger(__name__)
 _local_cache: dict = {}
 
 _redis = None
-if settings.REDIS_ENABLED:
-    try:
-        import redis
-        _redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
-    except Exception as e:
-        log.warning("redis.init.failed", error=str(e))
+_redis_ready = False
+_redis_lock = threading.Lock()
+
+
+def get_redis():
+    # The client is created on first use, not at import; None when disabled.
+    global _redis, _redis_ready
+    if not _redis_ready:
+        with _redis_lock:
+            if not _redis_ready:
+                if settings.REDIS_ENABLED:
+                    try:
+                        import redis
+                        _redis = redis.from_url(settings.REDIS_URL)
+                    except Exception as e:
+                        log.warning("redis.init.failed", error=str(e))
+                _redis_ready = True
+    return _redis
+
+
+def _encode(state: dict) -> bytes:
+    raw = dumps(state).encode()
+    if len(raw) >= settings.SCHEMA_CACHE_COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def _decode(payload: bytes) -> dict:
+    if payload[:1] == b"z":
+        return loads(zlib.decompress(payload[1:]))
+    return loads(payload[1:])
+
+_TABLES_SQL = """
+    SELECT s.name AS table_schema, t.name AS table_name, t.object_id, t.modify_date
+    FROM sys.tables t
+    JOIN sys.schemas s ON s.schema_id = t.schema_id
+    WHERE t.is_ms_shipped = 0
+"""
+
+_COLUMNS_SQL = """
+    SELECT
+        t.object_id, s.name AS table_schema, t.name AS table_name,
+        c.name AS column_name, TYPE_NAME(c.system_type_id) AS data_type,
+        c.is_nullable,
+        CASE WHEN pk.column_id IS NOT NULL THEN 1 ELSE 0 END AS is_pk
+    FROM sys.tables t
+    JOIN sys.schemas s ON s.schema_id = t.schema_id
+    JOIN sys.columns c ON c.object_id = t.object_id
+    LEFT JOIN (
+        SELECT ic.object_id, ic.column_id
+        FROM sys.indexes i
+        JOIN sys.index_columns ic
+            ON ic.object_id = i.object_id
+            AND ic.index_id = i.index_id
+        WHERE i.is_primary_key = 1
+    ) pk ON pk.object_id = c.object_id
+         AND pk.column_id = c.column_id
+    WHERE t.is_ms_shipped = 0 {filter}
+    ORDER BY s.name, t.name, c.column_id
+"""
+
+_FOREIGN_KEYS_SQL = """
+    SELECT
+        fk.name                     AS fk_name,
+        SCHEMA_NAME(tp.schema_id)   AS parent_schema,
+        tp.name                     AS parent_table,
+        cp.name                     AS parent_column,
+        SCHEMA_NAME(tr.schema_id)   AS ref_schema,
+        tr.name                     AS ref_table,
+        cr.name                     AS ref_column
+    FROM sys.foreign_keys fk
+    JOIN sys.foreign_key_columns fkc
+        ON fk.object_id = fkc.constraint_object_id
+    JOIN sys.tables tp ON fkc.parent_object_id    = tp.object_id
+    JOIN sys.columns cp ON fkc.parent_object_id   = cp.object_id
+        AND fkc.parent_column_id    = cp.column_id
+    JOIN sys.tables tr ON fkc.referenced_object_id  = tr.object_id
+    JOIN sys.columns cr ON fkc.referenced_object_id = cr.object_id
+        AND fkc.referenced_column_id = cr.column_id
+    WHERE 1 = 1 {filter}
+    ORDER BY fk.name, fkc.constraint_column_id
+"""
+
+_OBJECT_FILTER = "AND {column} IN :ids"
+
+# SQL Server allows 2100 parameters per statement; past this many changed
+# tables, load them all and keep the ones asked for.
+_MAX_BOUND_IDS = 2000
+
 
 class SchemaCache:
-    _KEY = "mssql:schema:full"
+    def __init__(self, database: str | None = None):
+        # None is the default database, which keeps the unprefixed keys.
+        self.database = database
+        prefix = f"mssql:schema:{database}:" if database else "mssql:schema:"
+        self._KEY = prefix + "state"
+        self._VERSION_KEY = prefix + "version"
+        self._CHANNEL = prefix + "invalidate"
+        self._PROFILE_KEY = prefix + "profile:{}"
+        self._refresh_lock = threading.Lock()
+        self._refresher: threading.Thread | None = None
+        self._refresher_lock = threading.Lock()
+        self._last_version = 0
+        self._built: dict[type, SchemaIndex | ForeignKeyGraph] = {}
+        self._built_lock = threading.Lock()
+        self._l1: dict | None = None
+        self._l1_checked = 0.0
+        self._listener: threading.Thread | None = None
+        self._listener_lock = threading.Lock()
+        self._profiles: dict[str, dict] = {}
+        self.flight = SingleFlight(f"schema:{database}" if database else "schema", get_redis)
 
     def get_full_schema(self) -> dict:
-        if _redis:
+        return self._state()["tables"]
+
+    def get_index(self) -> SchemaIndex:
+        return self._derived(SchemaIndex)
+
+    def get_fk_graph(self) -> ForeignKeyGraph:
+        return self._derived(ForeignKeyGraph)
+
+    def get_profile(self, table_name: str) -> dict:
+        # Column statistics per table, kept until the table's statistics or
+        # row-modification counters say the data has moved.
+        key = self.get_fk_graph().resolve(table_name)
+        schema, table = key.split(".", 1)
+        # Sampling is a scan: let it run on a replica when there is one.
+        with self._connect(read_only=True) as conn:
+            sig = profiler.signature(conn, schema, table)
+            if sig is None:
+                raise ValueError(f"Unknown table '{key}'")
+            cached = self._load_profile(key)
+            if cached is not None and profiler.is_current(cached["signature"], sig):
+                metrics.cache_lookup("profile", True)
+                return {**cached["profile"], "cached": True}
+            metrics.cache_lookup("profile", False)
+            t0 = time.perf_counter()
+            profile = profiler.build(conn, schema, table, self.get_full_schema()[key]["columns"], sig)
+        profile["profile_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        log.info("schema.profile.built", table=key, sampled_rows=profile["sampled_rows"], elapsed_ms=profile["profile_ms"])
+        self._store_profile(key, {"signature": sig, "profile": profile})
+        return profile
+
+    def _load_profile(self, key: str) -> dict | None:
+        client = get_redis()
+        if client:
             try:
-                cached = _redis.get(self._KEY)
-                if cached:
-                    return json.loads(cached)
+                payload = client.get(self._PROFILE_KEY.format(key))
+                if payload is not None:
+                    return _decode(payload)
             except Exception as e:
                 log.warning("redis.get.failed", error=str(e))
+        return self._profiles.get(key)
 
-        if self._KEY in _local_cache:
-            return _local_cache[self._KEY]
+    def _store_profile(self, key: str, entry: dict):
+        self._profiles[key] = entry
+        client = get_redis()
+        if client:
+            try:
+                client.setex(self._PROFILE_KEY.format(key), settings.SCHEMA_CACHE_TTL, _encode(entry))
+            except Exception as e:
+                log.warning("redis.set.failed", error=str(e))
 
-        schema = self._introspect()
-        self._store(schema)
-        return schema
+    def _derived(self, cls):
+        # Structures derived from the schema are rebuilt once per version.
+        state = self._state()
+        built = self._built.get(cls)
+        if built is None or built.version != state["version"]:
+            with self._built_lock:
+                built = self._built.get(cls)
+                if built is None or built.version != state["version"]:
+                    built = cls(state["version"], state["tables"])
+                    self._built[cls] = built
+                    log.info("schema.derived.built", kind=cls.__name__, version=state["version"])
+        return built
+
+    def _state(self) -> dict:
+        # Started on first use, so it runs whether or not warm-up does.
+        self.start_background_refresh()
+        state = self._load()
+        if state is None:
+            # A cold cache is introspected once, however many sessions (in
+            # this process or others sharing Redis) ask for it at the same time.
+            state, _ = self.flight.do(f"{self._KEY}@{self._last_version}", self._cold_load, load=self._load)
+        return state
+
+    def _cold_load(self) -> dict:
+        self.refresh()
+        return self._load() or {"version": 0, "tables": {}}
+
+    def refresh(self, full: bool = False) -> dict:
+        with self._refresh_lock:
+            state = self._load()
+            if state is None or full:
+                previous = state["version"] if state else 0
+                state = self._introspect(max(previous, self._last_version) + 1)
+                self._store(state)
+                return {"mode": "full", "tables": len(state["tables"]), "version": state["version"]}
+
+            state, changed, dropped = self._merge(state)
+            if changed or dropped:
+                self._store(state)
+            else:
+                self._touch(state)
+            return {
+                "mode": "incremental",
+                "changed": changed,
+                "dropped": dropped,
+                "tables": len(state["tables"]),
+                "version": state["version"],
+            }
+
+    def start_background_refresh(self, interval: int = settings.SCHEMA_REFRESH_INTERVAL):
+        if interval <= 0 or self._refresher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    log.warning("schema.refresh.failed", error=str(e))
 
-    def _store(self, schema: dict):
-        if _redis:
+        with self._refresher_lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=loop, name="schema-refresher", daemon=True)
+            self._refresher.start()
+        log.info("schema.refresher.started", database=self.database, interval=interval)
+
+    def _load(self) -> dict | None:
+        client = get_redis()
+        if not client:
+            return _local_cache.get(self._KEY)
+
+        self._ensure_listener()
+        l1 = self._l1
+        now = time.monotonic()
+        if l1 is not None and now - self._l1_checked < settings.SCHEMA_L1_REVALIDATE_SECONDS:
+            metrics.cache_lookup("schema_l1", True)
+            return l1
+
+        try:
+            version = client.get(self._VERSION_KEY)
+            if version is None:
+                self._l1 = None
+                return _local_cache.get(self._KEY)
+            if l1 is not None and int(version) == l1["version"]:
+                self._l1_checked = now
+                metrics.cache_lookup("schema_l1", True)
+                return l1
+            metrics.cache_lookup("schema_l1", False)
+            payload = client.get(self._KEY)
+            if payload is None:
+                self._l1 = None
+                return _local_cache.get(self._KEY)
+            state = _decode(payload)
+            self._l1, self._l1_checked = state, now
+            log.info("schema.l1.loaded", version=state["version"], bytes=len(payload))
+            return state
+        except Exception as e:
+            log.warning("redis.get.failed", error=str(e))
+            return l1 or _local_cache.get(self._KEY)
+
+    def _store(self, state: dict):
+        self._last_version = state["version"]
+        client = get_redis()
+        if client:
+            # Set L1 before publishing: our own listener may see the new
+            # version before execute() returns and would drop an older L1.
+            self._l1, self._l1_checked = state, time.monotonic()
             try:
-                _redis.setex(self._KEY, settings.SCHEMA_CACHE_TTL, json.dumps(schema))
+                pipe = client.pipeline()
+                pipe.setex(self._KEY, settings.SCHEMA_CACHE_TTL, _encode(state))
+                pipe.setex(self._VERSION_KEY, settings.SCHEMA_CACHE_TTL, state["version"])
+                pipe.publish(self._CHANNEL, state["version"])
+                pipe.execute()
                 return
             except Exception:
                 pass
-        _local_cache[self._KEY] = schema
+        _local_cache[self._KEY] = state
+
+    def _touch(self, state: dict):
+        # Nothing changed: keep the stored copy for another TTL rather than
+        # let it expire into a full introspection, and put it back if it has.
+        client = get_redis()
+        if not client:
+            return
+        try:
+            pipe = client.pipeline()
+            pipe.expire(self._KEY, settings.SCHEMA_CACHE_TTL)
+            pipe.expire(self._VERSION_KEY, settings.SCHEMA_CACHE_TTL)
+            if all(pipe.execute()):
+                return
+        except Exception as e:
+            log.warning("redis.expire.failed", error=str(e))
+            return
+        self._store(state)
 
-    def invalidate(self):
-        if _redis:
+    def _ensure_listener(self):
+        if self._listener is not None:
+            return
+        with self._listener_lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="schema-invalidation", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        # Other replicas publish the version they stored; drop our L1 if it
+        # is older. A late message for a version we already hold, our own
+        # publish included, leaves it alone.
+        while True:
             try:
-                _redis.delete(self._KEY)
-            except Exception:
-                pass
-        _local_cache.pop(self._KEY, None)
-
-    def _introspect(self) -> dict:
-        log.info("schema.introspection.start")
-        with engine.connect() as conn:
-            rows = conn.execute(text("""
-                SELECT
-                    t.TABLE_SCHEMA, t.TABLE_NAME,
-                    c.COLUMN_NAME, c.DATA_TYPE,
-                    c.CHARACTER_MAXIMUM_LENGTH, c.IS_NULLABLE,
-                    CASE WHEN pk.COLUMN_NAME IS NOT NULL THEN 'YES' ELSE 'NO' END AS IS_PK
-                FROM INFORMATION_SCHEMA.TABLES t
-                JOIN INFORMATION_SCHEMA.COLUMNS c
-                    ON t.TABLE_NAME = c.TABLE_NAME
-                    AND t.TABLE_SCHEMA = c.TABLE_SCHEMA
-                LEFT JOIN (
-                    SELECT ku.TABLE_SCHEMA, ku.TABLE_NAME, ku.COLUMN_NAME
-                    FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
-                    JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE ku
-                        ON tc.CONSTRAINT_NAME = ku.CONSTRAINT_NAME
-                    WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
-                ) pk ON pk.TABLE_NAME = t.TABLE_NAME
-                     AND pk.COLUMN_NAME = c.COLUMN_NAME
-                WHERE t.TABLE_TYPE = 'BASE TABLE'
-                ORDER BY t.TABLE_SCHEMA, t.TABLE_NAME, c.ORDINAL_POSITION
-            """))
-
-            schema: dict = {}
-            for r in rows:
-                key = f"{r.TABLE_SCHEMA}.{r.TABLE_NAME}"
-                if key not in schema:
-                    schema[key] = {"columns": [], "foreign_keys": []}
-                schema[key]["columns"].append({
-                    "name": r.COLUMN_NAME,
-                    "type": r.DATA_TYPE,
-                    "nullable": r.IS_NULLABLE == "YES",
-                    "primary_key": r.IS_PK == "YES",
-                })
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._CHANNEL)
+                for message in pubsub.listen():
+                    l1 = self._l1
+                    if l1 is not None and int(message["data"]) > l1["version"]:
+                        self._l1 = None
+                        log.info("schema.l1.invalidated", version=int(message["data"]))
+            except Exception as e:
+                log.warning("redis.pubsub.failed", error=str(e))
+                self._l1 = None
+                time.sleep(1)
+
+    def _introspect(self, version: int = 1) -> dict:
+        log.info("schema.introspection.start", database=self.database)
+        with self._connect() as conn:
+            versions = self._table_versions(conn)
+            tables = self._load_tables(conn, None)
+        log.info("schema.introspection.done", tables=len(tables))
+        return {"version": version, "tables": tables, "versions": versions}
 
-            fks = conn.execute(text("""
-                SELECT
-                    fk.name             AS fk_name,
-                    tp.name             AS parent_table,
-                    cp.name             AS parent_column,
-                    tr.name             AS ref_table,
-                    cr.name             AS ref_column
-                FROM sys.foreign_keys fk
-                JOIN sys.foreign_key_columns fkc
-                    ON fk.object_id = fkc.constraint_object_id
-                JOIN sys.tables tp ON fkc.parent_object_id    = tp.object_id
-                JOIN sys.columns cp ON fkc.parent_object_id   = cp.object_id
-                    AND fkc.parent_column_id    = cp.column_id
-                JOIN sys.tables tr ON fkc.referenced_object_id  = tr.object_id
-                JOIN sys.columns cr ON fkc.referenced_object_id = cr.object_id
-                    AND fkc.referenced_column_id = cr.column_id
-            """))
-            for r in fks:
-                key = f"dbo.{r.parent_table}"
-                if key in schema:
-                    schema[key]["foreign_keys"].append({
-                        "fk_name": r.fk_name,
-                        "column": r.parent_column,
-                        "references_table": r.ref_table,
-                        "references_column": r.ref_column,
-                    })
-
-        log.info("schema.introspection.done", tables=len(schema))
+    def _merge(self, state: dict) -> tuple[dict, int, int]:
+        tables, versions = dict(state["tables"]), dict(state["versions"])
+        with self._connect() as conn:
+            current = self._table_versions(conn)
+            dropped = [key for key in versions if key not in current]
+            stale = {key for key, version in current.items() if versions.get(key) != version}
+
+            # FKs are stored by name, so tables pointing at a renamed or
+            # dropped table need their foreign keys reloaded too.
+            gone = set(dropped)
+            stale |= {
+                key for key, table in tables.items()
+                if key in current and any(
+                    f"{fk['references_schema']}.{fk['references_table']}" in gone
+                    for fk in table["foreign_keys"]
+                )
+            }
+
+            if not stale and not dropped:
+                return state, 0, 0
+
+            log.info("schema.refresh.incremental", changed=len(stale), dropped=len(dropped))
+            for key in dropped:
+                tables.pop(key, None)
+                versions.pop(key, None)
+            if stale:
+                object_ids = [current[key][0] for key in stale]
+                for key in stale:
+                    tables.pop(key, None)
+                tables.update(self._load_tables(conn, object_ids))
+                versions.update({key: current[key] for key in stale})
+        merged = {"version": state["version"] + 1, "tables": tables, "versions": versions}
+        return merged, len(stale), len(dropped)
+
+    def _connect(self, read_only: bool = False):
+        return get_registry().get(self.database).connect(read_only)
+
+    def _table_versions(self, conn) -> dict:
+        return {
+            f"{r.table_schema}.{r.table_name}": [r.object_id, r.modify_date.isoformat()]
+            for r in conn.execute(text(_TABLES_SQL))
+        }
+
+    def _load_tables(self, conn, object_ids: list[int] | None) -> dict:
+        params = {}
+        column_filter = fk_filter = ""
+        wanted = set(object_ids) if object_ids is not None else None
+        if object_ids is not None and len(object_ids) <= _MAX_BOUND_IDS:
+            params["ids"] = list(object_ids)
+            column_filter = _OBJECT_FILTER.format(column="t.object_id")
+            fk_filter = _OBJECT_FILTER.format(column="fk.parent_object_id")
+        columns_sql = text(_COLUMNS_SQL.format(filter=column_filter))
+        fk_sql = text(_FOREIGN_KEYS_SQL.format(filter=fk_filter))
+        if params:
+            columns_sql = columns_sql.bindparams(bindparam("ids", expanding=True))
+            fk_sql = fk_sql.bindparams(bindparam("ids", expanding=True))
+
+        schema: dict = {}
+        for r in conn.execute(columns_sql, params):
+            if wanted is not None and r.object_id not in wanted:
+                continue
+            key = f"{r.table_schema}.{r.table_name}"
+            if key not in schema:
+                schema[key] = {"columns": [], "foreign_keys": []}
+            schema[key]["columns"].append({
+                "name": r.column_name,
+                "type": r.data_type,
+                "nullable": bool(r.is_nullable),
+                "primary_key": bool(r.is_pk),
+            })
+
+        for r in conn.execute(fk_sql, params):
+            key = f"{r.parent_schema}.{r.parent_table}"
+            if key in schema:
+                schema[key]["foreign_keys"].append({
+                    "fk_name": r.fk_name,
+                    "column": r.parent_column,
+                    "references_schema": r.ref_schema,
+                    "references_table": r.ref_table,
+                    "references_column": r.ref_column,
+                })
         return schema
 
-schema_cache = SchemaCache()
\ No newline at end of file
+schema_cache = SchemaCache()
+
+_caches: dict[str, SchemaCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_schema_cache(database: str | None = None) -> SchemaCache:
+    # One cache per registered database, each with its own keys and refresher.
+    registry = get_registry()
+    if not database or registry.is_default(database):
+        return schema_cache
+    name = registry.get(database).name
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = SchemaCache(name)
+        return _caches[name]
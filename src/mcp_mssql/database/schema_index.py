@@ -0,0 +1,68 @@
+import json
+from mcp_mssql.serialization import dumps
+
+
+def _trigrams(value: str) -> set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class SchemaIndex:
+    # Built once per schema version: pre-encoded JSON per table plus inverted
+    # indexes, so filtered schema requests never touch the full schema dict.
+    def __init__(self, version: int, tables: dict):
+        self.version = version
+        self.keys = sorted(tables)
+        self._lower = {key: key.lower() for key in self.keys}
+        self._key_json = {key: json.dumps(key) for key in self.keys}
+        self._full = {key: dumps(tables[key]) for key in self.keys}
+        self._columns_only = {key: dumps({"columns": tables[key]["columns"]}) for key in self.keys}
+
+        self._by_trigram: dict[str, set[str]] = {}
+        self._by_column: dict[str, set[str]] = {}
+        self._by_type: dict[str, set[str]] = {}
+        for key in self.keys:
+            for gram in _trigrams(self._lower[key]):
+                self._by_trigram.setdefault(gram, set()).add(key)
+            for column in tables[key]["columns"]:
+                self._by_column.setdefault(column["name"].lower(), set()).add(key)
+                self._by_type.setdefault(str(column["type"]).lower(), set()).add(key)
+
+    def search(self, table_filter: str = "", column: str = "", data_type: str = "") -> list[str]:
+        candidates: set[str] | None = None
+        if column:
+            candidates = set(self._by_column.get(column.lower(), ()))
+        if data_type:
+            matches = self._by_type.get(data_type.lower(), set())
+            candidates = matches & candidates if candidates is not None else set(matches)
+        if table_filter:
+            candidates = self._match_table(table_filter.lower(), candidates)
+        if candidates is None:
+            return self.keys
+        return sorted(candidates)
+
+    def render(
+        self,
+        table_filter: str = "",
+        column: str = "",
+        data_type: str = "",
+        include_relationships: bool = True,
+        limit: int = 0,
+        offset: int = 0,
+    ) -> str:
+        keys = self.search(table_filter, column, data_type)
+        page = keys[offset:offset + limit] if limit > 0 else keys[offset:]
+        fragments = self._full if include_relationships else self._columns_only
+        body = "{" + ",".join(f"{self._key_json[k]}:{fragments[k]}" for k in page) + "}"
+        if not limit and not offset:
+            return body
+        return f'{{"total":{len(keys)},"offset":{offset},"limit":{limit},"tables":{body}}}'
+
+    def _match_table(self, needle: str, candidates: set[str] | None) -> set[str]:
+        if len(needle) >= 3:
+            for gram in _trigrams(needle):
+                posting = self._by_trigram.get(gram)
+                if not posting:
+                    return set()
+                candidates = posting & candidates if candidates is not None else set(posting)
+        pool = candidates if candidates is not None else self.keys
+        return {key for key in pool if needle in self._lower[key]}
@@ -0,0 +1,233 @@
+import hashlib
+import secrets
+import threading
+import time
+from typing import Any, Callable
+import structlog
+
+from mcp_mssql.config import settings
+from mcp_mssql.database import cancellation
+from mcp_mssql.database.cancellation import QueryCancelled, QueryTimeout
+from mcp_mssql.serialization import dumps, loads
+from mcp_mssql import metrics
+
+log = structlog.get_logger(__name__)
+
+# Delete the lock only if this process still holds it.
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+# Release the lock unless another process registered to wait for the result;
+# returns 1 when the result should be published first.
+_FINISH = (
+    "if redis.call('get', KEYS[1]) ~= ARGV[1] then return 0 end "
+    "if redis.call('exists', KEYS[2]) == 1 then return 1 end "
+    "redis.call('del', KEYS[1]) return 0"
+)
+# A leader's cancellation or timeout belongs to its caller, not to the call.
+_CALLER_ERRORS = (QueryCancelled, QueryTimeout)
+_POLL_SECONDS = 0.05
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one execution. Within a
+    # process, followers wait on the leader's call, and run it again
+    # themselves if the leader was cancelled or timed out. With Redis, the
+    # leading process also holds a lock on the key; other processes register
+    # as waiting and poll for the result it then publishes under its lock
+    # token (or, given `load`, for the result the call stores itself)
+    # instead of running the call again.
+    def __init__(
+        self,
+        group: str,
+        redis: Callable[[], Any] | None = None,
+        enabled: bool = settings.SINGLE_FLIGHT_ENABLED,
+        wait_seconds: float = settings.SINGLE_FLIGHT_WAIT_SECONDS,
+        max_bytes: int = settings.SINGLE_FLIGHT_MAX_BYTES,
+    ):
+        self.group = group
+        self.enabled = enabled
+        self.wait_seconds = wait_seconds
+        self.max_bytes = max_bytes
+        self._redis = redis
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._followers = 0
+        self._remote = 0
+        self._timeouts = 0
+
+    def do(self, key: str, fn: Callable[[], Any], load: Callable[[], Any] | None = None) -> tuple[Any, bool]:
+        # Returns (result, shared); shared is False for the call that ran fn.
+        if not self.enabled:
+            return fn(), False
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self._leaders += 1
+                else:
+                    self._followers += 1
+            if leader:
+                break
+            metrics.single_flight(self.group, "follower")
+            self._wait(call)
+            if call.error is None:
+                return call.value, True
+            if not isinstance(call.error, _CALLER_ERRORS):
+                raise call.error
+
+        try:
+            call.value, shared = self._across_processes(key, fn, load)
+            return call.value, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _wait(self, call: _Call):
+        # Followers stop waiting on their own cancellation or timeout.
+        scope = cancellation.current()
+        if scope is None:
+            call.done.wait()
+            return
+        deadline = time.monotonic() + scope.timeout
+        while not call.done.wait(_POLL_SECONDS):
+            _check(scope, deadline)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._calls),
+                "leaders": self._leaders,
+                "followers": self._followers,
+                "shared_from_other_processes": self._remote,
+                "wait_timeouts": self._timeouts,
+            }
+
+    def _across_processes(self, key: str, fn: Callable[[], Any], load: Callable[[], Any] | None) -> tuple[Any, bool]:
+        client = self._redis() if self._redis is not None else None
+        if client is None:
+            metrics.single_flight(self.group, "leader")
+            return fn(), False
+
+        lock_key = f"mssql:flight:{self.group}:{hashlib.sha256(key.encode()).hexdigest()}"
+        try:
+            token, value = self._acquire_or_wait(client, lock_key, load)
+        except _CALLER_ERRORS:
+            raise
+        except Exception as e:
+            log.warning("single_flight.redis.failed", group=self.group, error=str(e))
+            token, value = None, None
+        if value is not None:
+            with self._lock:
+                self._remote += 1
+            metrics.single_flight(self.group, "remote")
+            return value, True
+
+        metrics.single_flight(self.group, "leader")
+        if token is None:
+            return fn(), False
+        released = False
+        try:
+            value = fn()
+            if load is None:
+                # The result is only encoded and stored when another process
+                # registered to wait for it; otherwise finishing releases the lock.
+                waiting = self._finish(client, lock_key, token)
+                released = waiting is False
+                if waiting:
+                    self._publish(client, f"{lock_key}:{token}", value)
+            return value, False
+        finally:
+            if not released:
+                try:
+                    client.eval(_RELEASE, 1, lock_key, token)
+                except Exception as e:
+                    log.warning("single_flight.release.failed", group=self.group, error=str(e))
+
+    def _finish(self, client, lock_key: str, token: str) -> bool | None:
+        try:
+            return bool(client.eval(_FINISH, 2, lock_key, f"{lock_key}:{token}:waiting", token))
+        except Exception as e:
+            log.warning("single_flight.release.failed", group=self.group, error=str(e))
+            return None
+
+    def _acquire_or_wait(self, client, lock_key: str, load) -> tuple[str | None, Any]:
+        # (token, None) when this process should run the call, (None, value)
+        # when another process's result arrived, (None, None) on timeout.
+        token = secrets.token_hex(8)
+        scope = cancellation.current()
+        deadline = time.monotonic() + self.wait_seconds
+        caller_deadline = time.monotonic() + scope.timeout if scope is not None else None
+        leader, delay = None, 0.01
+        while time.monotonic() < deadline:
+            _check(scope, caller_deadline)
+            if leader is None:
+                if client.set(lock_key, token, nx=True, px=int(self.wait_seconds * 1000)):
+                    return token, None
+                leader = client.get(lock_key)
+                if leader is not None and load is None:
+                    self._register(client, f"{lock_key}:{leader.decode()}:waiting")
+                continue
+            value = self._shared(client, lock_key, leader, load)
+            if value is not None:
+                return None, value
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            if client.get(lock_key) != leader:
+                # The leader finished or gave up; its result may have landed
+                # just before the lock was released.
+                value = self._shared(client, lock_key, leader, load)
+                if value is not None:
+                    return None, value
+                leader = None
+        with self._lock:
+            self._timeouts += 1
+        log.warning("single_flight.wait.timeout", group=self.group, waited_s=self.wait_seconds)
+        return None, None
+
+    def _register(self, client, waiting_key: str):
+        # Tells the leader to publish its result; expires with the lock.
+        pipe = client.pipeline()
+        pipe.incr(waiting_key)
+        pipe.pexpire(waiting_key, int(self.wait_seconds * 1000))
+        pipe.execute()
+
+    def _shared(self, client, lock_key: str, leader: bytes, load):
+        if load is not None:
+            return load()
+        payload = client.get(f"{lock_key}:{leader.decode()}")
+        return loads(payload) if payload is not None else None
+
+    def _publish(self, client, result_key: str, value):
+        payload = dumps(value).encode()
+        if len(payload) > self.max_bytes:
+            # Followers see the lock go away without a result and run it themselves.
+            return
+        try:
+            client.set(result_key, payload, px=int(self.wait_seconds * 1000))
+        except Exception as e:
+            log.warning("single_flight.publish.failed", group=self.group, error=str(e))
+
+
+def _check(scope: "cancellation.QueryScope | None", deadline: float | None):
+    if scope is None:
+        return
+    if scope.cancelled:
+        raise QueryCancelled("Query cancelled")
+    if time.monotonic() >= deadline:
+        raise QueryTimeout(f"Query exceeded its timeout of {scope.timeout}s")
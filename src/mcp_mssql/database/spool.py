@@ -0,0 +1,382 @@
+import atexit
+import csv
+import io
+import mmap
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as dtime
+from decimal import Decimal
+from uuid import UUID
+import structlog
+
+from mcp_mssql.config import settings
+from mcp_mssql.serialization import to_plain
+
+log = structlog.get_logger(__name__)
+
+EXPORT_FORMATS = ("csv", "arrow")
+
+MIME_TYPES = {"csv": "text/csv", "arrow": "application/vnd.apache.arrow.file"}
+
+
+class _CsvWriter:
+    def __init__(self, path: str, columns: list[str], description):
+        self._file = open(path, "wb")
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer)
+        self._columns = columns
+        self._description = description or [None] * len(columns)
+        self.schema = None
+        self._csv.writerow(columns)
+
+    def write(self, rows: list):
+        if self.schema is None:
+            self.schema = [
+                {"name": c, "type": _type_name(d, rows, i)}
+                for i, (c, d) in enumerate(zip(self._columns, self._description))
+            ]
+        # Encode a batch at a time; the file only ever sees bytes.
+        writerow = self._csv.writerow
+        for row in rows:
+            writerow(to_plain(row))
+        self._file.write(self._buffer.getvalue().encode())
+        self._buffer.seek(0)
+        self._buffer.truncate()
+
+    def finish(self) -> int:
+        self.write([])
+        return self._file.tell()
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+def _type_name(description, rows: list, i: int) -> str:
+    type_code = description[1] if description else None
+    if not isinstance(type_code, type):
+        type_code = type(next((row[i] for row in rows if row[i] is not None), None))
+    return type_code.__name__
+
+
+_pyarrow = None
+_ARROW_TYPES: dict = {}
+
+
+def _arrow():
+    # pyarrow is imported when an Arrow export is first asked for, not when
+    # the tools load: it is slow to import and would hold up the handshake.
+    global _pyarrow
+    if _pyarrow is None:
+        import pyarrow
+        import pyarrow.ipc
+
+        # pyodbc reports the Python class of each column as its type_code.
+        _ARROW_TYPES.update({
+            int: pyarrow.int64(),
+            float: pyarrow.float64(),
+            bool: pyarrow.bool_(),
+            str: pyarrow.string(),
+            datetime: pyarrow.timestamp("us"),
+            date: pyarrow.date32(),
+            dtime: pyarrow.time64("us"),
+            bytes: pyarrow.binary(),
+            bytearray: pyarrow.binary(),
+            UUID: pyarrow.string(),
+        })
+        _pyarrow = pyarrow
+    return _pyarrow
+
+
+def _arrow_type(description, values: list):
+    pyarrow = _arrow()
+    type_code = description[1] if description else None
+    if type_code is Decimal and description[4] and description[4] <= 38:
+        return pyarrow.decimal128(description[4], description[5] or 0)
+    if type_code in _ARROW_TYPES:
+        return _ARROW_TYPES[type_code]
+    # No usable type_code (e.g. sqlite3): infer from the first batch.
+    inferred = pyarrow.array([v for v in values if v is not None][:1000]).type
+    return pyarrow.string() if pyarrow.types.is_null(inferred) else inferred
+
+
+def _arrow_column(values: list, arrow_type):
+    pyarrow = _arrow()
+    if pyarrow.types.is_string(arrow_type):
+        values = [v if v is None or type(v) is str else str(v) for v in values]
+    return pyarrow.array(values, type=arrow_type)
+
+
+class _ArrowWriter:
+    def __init__(self, path: str, columns: list[str], description):
+        self._path = path
+        self._columns = columns
+        self._description = description or [None] * len(columns)
+        self._sink = None
+        self._writer = None
+        self._schema = None
+        self.schema = None
+
+    def write(self, rows: list):
+        pyarrow = _arrow()
+        data = [list(col) for col in zip(*rows)] if rows else [[] for _ in self._columns]
+        if self._writer is None:
+            self._schema = pyarrow.schema([
+                (name, _arrow_type(d, values))
+                for name, d, values in zip(self._columns, self._description, data)
+            ])
+            self.schema = [{"name": f.name, "type": str(f.type)} for f in self._schema]
+            self._sink = pyarrow.OSFile(self._path, "wb")
+            self._writer = pyarrow.ipc.new_file(self._sink, self._schema)
+        if rows:
+            arrays = [_arrow_column(values, f.type) for values, f in zip(data, self._schema)]
+            self._writer.write_batch(pyarrow.record_batch(arrays, schema=self._schema))
+
+    def finish(self) -> int:
+        if self._writer is None:
+            self.write([])
+        self._writer.close()
+        return self._sink.tell()
+
+    def tell(self) -> int:
+        return self._sink.tell() if self._sink is not None else 0
+
+    def close(self):
+        if self._sink is not None:
+            self._sink.close()
+
+
+class _Export:
+    __slots__ = ("export_id", "path", "format", "size", "rows", "created_at", "last_used")
+
+    def __init__(self, export_id: str, path: str, format: str, size: int, rows: int):
+        self.export_id = export_id
+        self.path = path
+        self.format = format
+        self.size = size
+        self.rows = rows
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+
+
+class SpoolFull(Exception):
+    pass
+
+
+class ResultSpool:
+    # Exported result files on local disk, evicted least recently used first
+    # once the directory would grow past max_bytes. Reads go through mmap so
+    # only the requested range is ever copied into the heap.
+    def __init__(
+        self,
+        directory: str = settings.SPOOL_DIR,
+        max_bytes: int = settings.SPOOL_MAX_BYTES,
+        chunk_bytes: int = settings.SPOOL_CHUNK_BYTES,
+    ):
+        self.base_directory = directory or tempfile.gettempdir()
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self._directory: str | None = None
+        self._exports: OrderedDict[str, _Export] = OrderedDict()
+        self._bytes = 0
+        self._writing: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._evicted = 0
+        self._rejected = 0
+
+    def writer(self, format: str, columns: list[str], description) -> "SpoolWriter":
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{format}', expected one of {EXPORT_FORMATS}")
+        if format == "arrow":
+            try:
+                _arrow()
+            except ImportError:
+                raise ValueError("format='arrow' requires pyarrow; use format='csv'") from None
+        export_id = secrets.token_urlsafe(12)
+        path = os.path.join(self._ensure_directory(), f"{export_id}.{format}")
+        impl = _ArrowWriter if format == "arrow" else _CsvWriter
+        return SpoolWriter(self, export_id, path, format, impl(path, columns, description))
+
+    def upload(self, data: bytes, export_id: str | None = None) -> _Export:
+        # Client-supplied CSV, sent in one piece or several appended in order.
+        size = 0
+        if export_id is None:
+            export_id = secrets.token_urlsafe(12)
+            path = os.path.join(self._ensure_directory(), f"{export_id}.csv")
+        else:
+            with self._lock:
+                entry = self._exports.get(export_id)
+                if entry is None or entry.format != "csv":
+                    raise ValueError(f"Unknown or expired CSV upload '{export_id}'")
+                # Out of the LRU while it grows, so the reservation cannot evict it.
+                del self._exports[export_id]
+                self._bytes -= entry.size
+            path, size = entry.path, entry.size
+        try:
+            self._reserve(export_id, size + len(data))
+            with open(path, "ab") as f:
+                f.write(data)
+        except BaseException:
+            self._abort(export_id, path)
+            raise
+        return self._commit(export_id, path, "csv", size + len(data), 0)
+
+    def path(self, export_id: str, format: str | None = None) -> str:
+        # For reading a whole file in place; an unlink during the read leaves
+        # an open handle valid.
+        with self._lock:
+            entry = self._exports.get(export_id)
+            if entry is None or (format is not None and entry.format != format):
+                kind = f"{format} export" if format else "export"
+                raise ValueError(f"Unknown or expired {kind} '{export_id}'")
+            self._exports.move_to_end(export_id)
+            entry.last_used = time.monotonic()
+            return entry.path
+
+    def read(self, export_id: str, offset: int = 0, length: int = 0) -> bytes:
+        with self._lock:
+            entry = self._exports.get(export_id)
+            if entry is None:
+                raise ValueError(f"Unknown or expired export '{export_id}'")
+            self._exports.move_to_end(export_id)
+            entry.last_used = time.monotonic()
+        length = min(length or self.chunk_bytes, self.chunk_bytes)
+        if offset < 0 or offset >= entry.size:
+            return b""
+        try:
+            with open(entry.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[offset:offset + length]
+        except FileNotFoundError:
+            raise ValueError(f"Unknown or expired export '{export_id}'")
+
+    def remove(self, export_id: str) -> bool:
+        with self._lock:
+            entry = self._exports.pop(export_id, None)
+            if entry is not None:
+                self._bytes -= entry.size
+        if entry is None:
+            return False
+        self._unlink(entry.path)
+        return True
+
+    def clear(self):
+        with self._lock:
+            victims = list(self._exports.values())
+            self._exports.clear()
+            self._bytes = 0
+        for entry in victims:
+            self._unlink(entry.path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "exports": len(self._exports),
+                "bytes": self._bytes,
+                "writing_bytes": sum(self._writing.values()),
+                "max_bytes": self.max_bytes,
+                "created": self._created,
+                "evicted": self._evicted,
+                "rejected": self._rejected,
+            }
+
+    def _reserve(self, export_id: str, size: int):
+        # Called as a write grows: make room by evicting finished exports,
+        # and fail the write once nothing is left to evict.
+        victims = []
+        with self._lock:
+            self._writing[export_id] = size
+            in_flight = sum(self._writing.values())
+            while self._exports and self._bytes + in_flight > self.max_bytes:
+                _, entry = self._exports.popitem(last=False)
+                self._bytes -= entry.size
+                self._evicted += 1
+                victims.append(entry)
+            full = self._bytes + in_flight > self.max_bytes
+            if full:
+                self._rejected += 1
+        for entry in victims:
+            log.info("spool.evicted", export_id=entry.export_id, bytes=entry.size)
+            self._unlink(entry.path)
+        if full:
+            raise SpoolFull(f"Export exceeds the spool limit of {self.max_bytes} bytes (SPOOL_MAX_BYTES)")
+
+    def _commit(self, export_id: str, path: str, format: str, size: int, rows: int) -> _Export:
+        entry = _Export(export_id, path, format, size, rows)
+        with self._lock:
+            self._writing.pop(export_id, None)
+            self._exports[export_id] = entry
+            self._bytes += size
+            self._created += 1
+        log.info("spool.created", export_id=export_id, format=format, rows=rows, bytes=size)
+        return entry
+
+    def _abort(self, export_id: str, path: str):
+        with self._lock:
+            self._writing.pop(export_id, None)
+        self._unlink(path)
+
+    def _ensure_directory(self) -> str:
+        # One private directory per process, removed on exit.
+        with self._lock:
+            if self._directory is None:
+                os.makedirs(self.base_directory, exist_ok=True)
+                self._directory = tempfile.mkdtemp(prefix="mcp-mssql-spool-", dir=self.base_directory)
+                atexit.register(shutil.rmtree, self._directory, True)
+            return self._directory
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning("spool.remove.failed", path=path, error=str(e))
+
+
+class SpoolWriter:
+    def __init__(self, spool: ResultSpool, export_id: str, path: str, format: str, impl):
+        self.spool = spool
+        self.export_id = export_id
+        self.path = path
+        self.format = format
+        self.rows = 0
+        self._impl = impl
+        self.entry: _Export | None = None
+
+    @property
+    def schema(self) -> list[dict]:
+        return self._impl.schema
+
+    def write(self, rows: list):
+        self._impl.write(rows)
+        self.rows += len(rows)
+        self.spool._reserve(self.export_id, self._impl.tell())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        committed = False
+        try:
+            if exc_type is None:
+                size = self._impl.finish()
+                self._impl.close()
+                self.spool._reserve(self.export_id, size)
+                self.entry = self.spool._commit(self.export_id, self.path, self.format, size, self.rows)
+                committed = True
+        finally:
+            if not committed:
+                self._impl.close()
+                self.spool._abort(self.export_id, self.path)
+        return False
+
+result_spool = ResultSpool()
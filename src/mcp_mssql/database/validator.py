@@ -1,7 +1,120 @@
 import re
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cached_property
 import sqlglot
 import sqlglot.expressions as exp
 from mcp_mssql.config import settings
+from mcp_mssql import metrics
+
+
+def table_key(table: exp.Table) -> str:
+    return f"{table.db or 'dbo'}.{table.name}".lower()
+
+
+def limit_rows(statement: exp.Expression, limit: int) -> exp.Expression | None:
+    # Bound a plain SELECT with TOP (or its FETCH clause) to `limit` rows.
+    # Returns the statement itself when it is already bounded tighter, and
+    # None when it cannot be rewritten safely (set operations, TOP PERCENT,
+    # WITH TIES, variable TOP, SELECT INTO).
+    if not isinstance(statement, exp.Select) or statement.args.get("into") is not None:
+        return None
+    # sqlglot keeps both TOP and OFFSET ... FETCH under "limit".
+    clause = statement.args.get("limit")
+    key = "count" if isinstance(clause, exp.Fetch) else "expression"
+    if clause is None:
+        if statement.args.get("offset") is not None:
+            return None
+        bounded = statement.copy()
+        bounded.set("limit", exp.Limit(expression=exp.Literal.number(limit)))
+        return bounded
+
+    options = clause.args.get("limit_options")
+    if options is not None and (options.args.get("percent") or options.args.get("with_ties")):
+        return None
+    count = clause.args.get(key)
+    if not (isinstance(count, exp.Literal) and count.is_int):
+        return None
+    if int(count.name) <= limit:
+        return statement
+    bounded = statement.copy()
+    bounded.args["limit"].set(key, exp.Literal.number(limit))
+    return bounded
+
+
+class ParsedQuery:
+    # Shared between callers through the validator's LRU: treat `statement`
+    # as read-only and copy() it before rewriting.
+    def __init__(self, query: str, statement: exp.Expression, is_write: bool):
+        self.query = query
+        self.statement = statement
+        self.is_write = is_write
+        self._limited: dict[int, str | None] = {}
+
+    @property
+    def is_query(self) -> bool:
+        return isinstance(self.statement, exp.Query)
+
+    @cached_property
+    def tables(self) -> frozenset[str]:
+        ctes = {cte.alias_or_name.lower() for cte in self.statement.find_all(exp.CTE)}
+        return frozenset(
+            table_key(t) for t in self.statement.find_all(exp.Table)
+            if t.name and not (not t.db and t.name.lower() in ctes)
+        )
+
+    @cached_property
+    def normalized(self) -> str:
+        return self.statement.sql(dialect="tsql", normalize=True)
+
+    @cached_property
+    def fingerprint(self) -> str:
+        # Literals and parameters become ?, and IN lists collapse to one,
+        # so calls differing only in values share a fingerprint.
+        def parameterize(node):
+            if isinstance(node, (exp.Literal, exp.National, exp.Placeholder)):
+                return exp.Placeholder()
+            return node
+
+        def collapse(node):
+            if isinstance(node, exp.In) and len(node.expressions) > 1 and all(
+                isinstance(e, exp.Placeholder) for e in node.expressions
+            ):
+                node.set("expressions", [exp.Placeholder()])
+            return node
+
+        return self.statement.transform(parameterize).transform(collapse, copy=False).sql(
+            dialect="tsql", normalize=True
+        )
+
+    @cached_property
+    def changes_session(self) -> bool:
+        # SET/USE and temp tables outlive the statement on a pooled connection.
+        if isinstance(self.statement, (exp.Set, exp.Use)):
+            return True
+        return any(
+            isinstance(t.this, exp.Identifier) and (t.this.args.get("temporary") or t.this.args.get("global_"))
+            for t in self.statement.find_all(exp.Table)
+        )
+
+    @cached_property
+    def is_read_only(self) -> bool:
+        # Safe for a readable secondary: no writes, SELECT ... INTO or session state.
+        return (
+            self.is_query and not self.is_write and not self.changes_session
+            and self.statement.find(exp.Into) is None
+        )
+
+    def limited_sql(self, limit: int) -> str | None:
+        # T-SQL for this query bounded to `limit` rows, or None to run it as is.
+        if limit not in self._limited:
+            bounded = limit_rows(self.statement, limit)
+            self._limited[limit] = (
+                bounded.sql(dialect="tsql") if bounded is not None and bounded is not self.statement else None
+            )
+        return self._limited[limit]
+
 
 class QueryValidator:
     _DANGEROUS = [
@@ -13,32 +126,93 @@ class QueryValidator:
         r"\bsp_executesql\b",
         r"/\*.*?\*/",
     ]
+    _DANGEROUS_RE = re.compile(
+        "|".join(f"(?P<p{i}>{p})" for i, p in enumerate(_DANGEROUS)),
+        re.IGNORECASE | re.DOTALL,
+    )
 
+    # Procedures are writes too: the server cannot tell us what one does.
     _WRITE_TYPES = {
         "Insert", "Update", "Delete", "Drop",
-        "Create", "AlterTable", "TruncateTable", "Merge"
+        "Create", "AlterTable", "TruncateTable", "Merge", "Execute"
     }
 
+    def __init__(self, cache_size: int = settings.VALIDATION_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: OrderedDict[bytes, ParsedQuery | str] = OrderedDict()
+        self._lock = threading.Lock()
+
     def validate(self, query: str) -> tuple[bool, str]:
-        for pattern in self._DANGEROUS:
-            if re.search(pattern, query, re.IGNORECASE | re.DOTALL):
-                return False, f"Blocked pattern: {pattern}"
+        try:
+            self.check(query)
+        except ValueError as e:
+            return False, str(e).removeprefix("Validation failed: ")
+        return True, "OK"
+
+    def check(self, query: str) -> ParsedQuery:
+        parsed = self._analyze(query)
+        if isinstance(parsed, str):
+            raise ValueError(f"Validation failed: {parsed}")
+        if not settings.ALLOW_WRITE_OPERATIONS and parsed.is_write:
+            kind = "SELECT INTO" if parsed.is_query else type(parsed.statement).__name__
+            raise ValueError(f"Validation failed: Write operation '{kind}' is disabled")
+        return parsed
+
+    def is_write(self, stmt: exp.Expression) -> bool:
+        stmt_class = type(stmt).__name__
+        if any(w in stmt_class for w in self._WRITE_TYPES):
+            return True
+        # SELECT ... INTO creates and fills a table; a temp table only lives in the session.
+        into = stmt.find(exp.Into)
+        return into is not None and not into.args.get("temporary")
+
+    def _analyze(self, query: str) -> ParsedQuery | str:
+        key = hashlib.blake2b(query.encode(), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                metrics.cache_lookup("validation", True)
+                return cached
+
+        metrics.cache_lookup("validation", False)
+        parsed = self._parse(query)
+
+        with self._lock:
+            self._cache[key] = parsed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return parsed
+
+    def _parse(self, query: str) -> ParsedQuery | str:
+        match = self._DANGEROUS_RE.search(query)
+        if match:
+            return f"Blocked pattern: {self._DANGEROUS[int(match.lastgroup[1:])]}"
 
         try:
             statements = sqlglot.parse(query, dialect="tsql")
         except Exception as e:
-            return False, f"Parse error: {e}"
+            return f"Parse error: {e}"
 
         if len(statements) > 1:
-            return False, "Multiple statements not allowed"
+            return "Multiple statements not allowed"
 
         stmt = statements[0]
+        if stmt is None:
+            return "Empty query"
+        return ParsedQuery(query, stmt, self.is_write(stmt))
 
-        if not settings.ALLOW_WRITE_OPERATIONS:
-            stmt_class = type(stmt).__name__
-            if any(w in stmt_class for w in self._WRITE_TYPES):
-                return False, f"Write operation '{stmt_class}' is disabled"
+_validator: QueryValidator | None = None
+
+
+def get_validator() -> QueryValidator:
+    global _validator
+    if _validator is None:
+        _validator = QueryValidator()
+    return _validator
 
-        return True, "OK"
 
-validator = QueryValidator()
\ No newline at end of file
+def __getattr__(name: str):
+    if name == "validator":
+        return get_validator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,298 @@
+import atexit
+import contextvars
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+import structlog
+
+from mcp_mssql.config import settings
+
+log = structlog.get_logger(__name__)
+
+ORDER_BY = ("total_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms", "calls", "errors", "rows", "bytes")
+
+_MAX_TEXT = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id TEXT PRIMARY KEY, database TEXT, fingerprint TEXT, calls INTEGER, executions INTEGER,
+    errors INTEGER, total_ms REAL, max_ms REAL, rows INTEGER, bytes INTEGER, sketch TEXT,
+    first_seen REAL, last_seen REAL
+);
+CREATE TABLE IF NOT EXISTS executions (at REAL, id TEXT, elapsed_ms REAL, rows INTEGER, error INTEGER);
+"""
+
+
+class LatencySketch:
+    # Log-bucketed histogram in the style of DDSketch: any quantile comes
+    # back within 1% relative error, and a fingerprint's latencies fit in a
+    # few hundred buckets whatever the call count.
+    __slots__ = ("buckets", "count")
+
+    _GAMMA = 1.01 / 0.99
+    _LOG_GAMMA = math.log(_GAMMA)
+    _MIN_MS = 0.001
+
+    def __init__(self, buckets: dict[int, int] | None = None):
+        self.buckets = buckets or {}
+        self.count = sum(self.buckets.values())
+
+    def add(self, ms: float):
+        i = math.ceil(math.log(max(ms, self._MIN_MS)) / self._LOG_GAMMA)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i].
+                return 2 * self._GAMMA ** i / (self._GAMMA + 1)
+        return None
+
+
+class _Fingerprint:
+    __slots__ = (
+        "id", "database", "text", "calls", "executions", "errors", "total_ms", "max_ms",
+        "rows", "bytes", "sketch", "first_seen", "last_seen",
+    )
+
+    def __init__(self, id: str, database: str, text: str):
+        self.id = id
+        self.database = database
+        self.text = text
+        self.calls = self.executions = self.errors = self.rows = self.bytes = 0
+        self.total_ms = self.max_ms = 0.0
+        self.sketch = LatencySketch()
+        self.first_seen = self.last_seen = time.time()
+
+    def summary(self) -> dict:
+        p = self.sketch.quantile
+        return {
+            "id": self.id,
+            "database": self.database,
+            "fingerprint": self.text,
+            "calls": self.calls,
+            "executions": self.executions,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.executions, 2) if self.executions else None,
+            "p50_ms": _round(p(0.5)),
+            "p95_ms": _round(p(0.95)),
+            "p99_ms": _round(p(0.99)),
+            "max_ms": round(self.max_ms, 2),
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "first_seen": _iso(self.first_seen),
+            "last_seen": _iso(self.last_seen),
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 2) if value is not None else None
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+# The entry the current tool call last recorded, so the tool can attribute
+# the size of its serialized response to it.
+_last: contextvars.ContextVar[_Fingerprint | None] = contextvars.ContextVar("workload_last", default=None)
+
+
+class WorkloadHistory:
+    # Per-fingerprint aggregates (least recently seen evicted past
+    # max_fingerprints) plus a ring buffer of the latest executions.
+    # With a db_path, both are flushed to SQLite every flush_seconds and the
+    # aggregates are reloaded from it on first use.
+    def __init__(
+        self,
+        enabled: bool = settings.WORKLOAD_ENABLED,
+        max_fingerprints: int = settings.WORKLOAD_MAX_FINGERPRINTS,
+        recent_size: int = settings.WORKLOAD_RECENT_SIZE,
+        db_path: str = settings.WORKLOAD_DB_PATH,
+        flush_seconds: int = settings.WORKLOAD_FLUSH_SECONDS,
+    ):
+        self.enabled = enabled
+        self.max_fingerprints = max_fingerprints
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self._entries: OrderedDict[str, _Fingerprint] = OrderedDict()
+        self._recent: deque = deque(maxlen=recent_size)
+        self._unflushed = 0
+        self._lock = threading.Lock()
+        self._loaded = not db_path
+        self._flusher: threading.Thread | None = None
+        self._recorded = 0
+        self._evicted = 0
+        self._flushes = 0
+
+    def record(
+        self,
+        fingerprint: str,
+        database: str,
+        elapsed_ms: float,
+        rows: int = 0,
+        executed: bool = True,
+        error: bool = False,
+        bytes: int = 0,
+    ):
+        # executed=False for calls answered from the result cache or by a
+        # coalesced execution; they count as calls but not as latency samples.
+        if not self.enabled:
+            return
+        self._ensure_loaded()
+        key = f"{database}\x00{fingerprint}"
+        fid = hashlib.sha1(key.encode()).hexdigest()[:16]
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(fid)
+            if entry is None:
+                entry = self._entries[fid] = _Fingerprint(fid, database, fingerprint[:_MAX_TEXT])
+                while len(self._entries) > self.max_fingerprints:
+                    self._entries.popitem(last=False)
+                    self._evicted += 1
+            else:
+                self._entries.move_to_end(fid)
+            entry.calls += 1
+            entry.last_seen = now
+            entry.rows += rows
+            entry.bytes += bytes
+            if error:
+                entry.errors += 1
+            if executed:
+                entry.executions += 1
+                entry.total_ms += elapsed_ms
+                entry.max_ms = max(entry.max_ms, elapsed_ms)
+                entry.sketch.add(elapsed_ms)
+                self._recent.append((now, fid, round(elapsed_ms, 2), rows, error))
+                self._unflushed = min(self._unflushed + 1, self._recent.maxlen)
+            self._recorded += 1
+        if not error:
+            _last.set(entry)
+        self._ensure_flusher()
+
+    def add_bytes(self, size: int):
+        entry = _last.get()
+        if entry is None:
+            return
+        _last.set(None)
+        with self._lock:
+            entry.bytes += size
+
+    def top(self, n: int = 10, order_by: str = "total_ms", database: str | None = None) -> dict:
+        if order_by not in ORDER_BY:
+            raise ValueError(f"Unknown order_by '{order_by}', expected one of {ORDER_BY}")
+        self._ensure_loaded()
+        with self._lock:
+            entries = [e.summary() for e in self._entries.values() if database is None or e.database == database]
+            recent = [(r, self._entries.get(r[1])) for r in self._recent]
+        entries.sort(key=lambda e: e[order_by] or 0, reverse=True)
+        recent = [(r, e) for r, e in recent if e is not None and (database is None or e.database == database)]
+        recent.sort(key=lambda item: item[0][2], reverse=True)
+        return {
+            "order_by": order_by,
+            "tracked_fingerprints": len(entries),
+            "fingerprints": entries[:n],
+            "slowest_recent": [
+                {"at": _iso(at), "id": fid, "elapsed_ms": ms, "rows": rows, "error": error, "fingerprint": e.text}
+                for (at, fid, ms, rows, error), e in recent[:n]
+            ],
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._recent.clear()
+            self._unflushed = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "fingerprints": len(self._entries),
+                "recent": len(self._recent),
+                "recorded": self._recorded,
+                "evicted": self._evicted,
+                "flushes": self._flushes,
+                "db_path": self.db_path or None,
+            }
+
+    def flush(self) -> int:
+        if not self.db_path:
+            return 0
+        with self._lock:
+            rows = [
+                (e.id, e.database, e.text, e.calls, e.executions, e.errors, e.total_ms, e.max_ms,
+                 e.rows, e.bytes, json.dumps(e.sketch.buckets), e.first_seen, e.last_seen)
+                for e in self._entries.values()
+            ]
+            recent = list(self._recent)[len(self._recent) - self._unflushed:]
+            self._unflushed = 0
+        with self._connect() as db:
+            db.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)", rows)
+            db.executemany("INSERT INTO executions VALUES (?,?,?,?,?)", recent)
+        with self._lock:
+            self._flushes += 1
+        return len(rows)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=10)
+        db.executescript(_SCHEMA)
+        return db
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with self._connect() as db:
+                    stored = db.execute("SELECT * FROM fingerprints ORDER BY last_seen").fetchall()
+            except sqlite3.Error as e:
+                log.warning("workload.load.failed", path=self.db_path, error=str(e))
+                return
+            for (fid, database, text, calls, executions, errors, total_ms, max_ms,
+                 rows, size, sketch, first_seen, last_seen) in stored[-self.max_fingerprints:]:
+                entry = _Fingerprint(fid, database, text)
+                entry.calls, entry.executions, entry.errors = calls, executions, errors
+                entry.total_ms, entry.max_ms, entry.rows, entry.bytes = total_ms, max_ms, rows, size
+                entry.sketch = LatencySketch({int(i): n for i, n in json.loads(sketch).items()})
+                entry.first_seen, entry.last_seen = first_seen, last_seen
+                self._entries[fid] = entry
+        log.info("workload.loaded", path=self.db_path, fingerprints=len(self._entries))
+
+    def _ensure_flusher(self):
+        if not self.db_path or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name="workload-flusher", daemon=True)
+            self._flusher.start()
+        atexit.register(self._flush_quietly)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(max(1, self.flush_seconds))
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception as e:
+            log.warning("workload.flush.failed", path=self.db_path, error=str(e))
+
+workload_history = WorkloadHistory()
@@ -0,0 +1,244 @@
+import bisect
+import threading
+from contextlib import nullcontext
+from time import perf_counter
+
+from mcp_mssql.config import settings
+
+enabled = settings.METRICS_ENABLED
+
+_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120,
+)
+_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1 << 20, 4 << 20, 16 << 20, 64 << 20)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}")
+        return lines
+
+    def collect(self) -> dict:
+        with self._lock:
+            return dict(self._series)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        if not enabled:
+            return
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self._callbacks: dict[tuple, object] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def track(self, fn, *labels):
+        # Value read at scrape time instead of being pushed on every change.
+        with self._lock:
+            self._callbacks[labels] = fn
+
+    def collect(self) -> dict:
+        with self._lock:
+            series, callbacks = dict(self._series), dict(self._callbacks)
+        for labels, fn in callbacks.items():
+            try:
+                series[labels] = fn()
+            except Exception:
+                pass
+        return series
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = _LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels):
+        if enabled:
+            self._record(labels, value)
+
+    def _record(self, labels: tuple, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> dict:
+        with self._lock:
+            return {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total, count) in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket = _format_labels(self.labels, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram._record(self.labels, perf_counter() - self.start)
+
+
+class _Checkout(_Timer):
+    __slots__ = ()
+
+    def __enter__(self):
+        POOL_WAITERS.inc()
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        POOL_WAITERS.dec()
+        super().__exit__(*exc)
+
+
+_NOOP = nullcontext()
+
+TOOL_SECONDS = Histogram(
+    "mcp_tool_duration_seconds", "Tool call latency including admission queueing.", ("tool",)
+)
+TOOL_REJECTED = Counter("mcp_tool_rejected_total", "Tool calls rejected by admission control.", ("tool",))
+TOOL_PAYLOAD_BYTES = Histogram(
+    "mcp_tool_payload_bytes", "Size of tool responses.", ("tool",), _SIZE_BUCKETS
+)
+PHASE_SECONDS = Histogram(
+    "mcp_query_phase_seconds",
+    "Query path latency by phase: validate, checkout, execute, fetch, shape, serialize.",
+    ("phase",),
+)
+CACHE_LOOKUPS = Counter("mcp_cache_lookups_total", "Cache lookups by cache and outcome.", ("cache", "outcome"))
+POOL_EVENTS = Counter("mcp_pool_events_total", "Connection pool events.", ("pool", "event"))
+POOL_CHECKED_OUT = Gauge("mcp_pool_checked_out", "Connections currently checked out.", ("pool",))
+POOL_OVERFLOW = Gauge("mcp_pool_overflow", "Connections open beyond pool_size.", ("pool",))
+POOL_WAITERS = Gauge("mcp_pool_waiters", "Query threads waiting for a pooled connection.")
+SINGLE_FLIGHT = Counter(
+    "mcp_single_flight_total",
+    "Coalesced calls by group and role: leader ran it, follower or remote shared its result.",
+    ("group", "role"),
+)
+
+
+def phase(name: str):
+    return _Timer(PHASE_SECONDS, (name,)) if enabled else _NOOP
+
+
+def checkout():
+    return _Checkout(PHASE_SECONDS, ("checkout",)) if enabled else _NOOP
+
+
+def tool(name: str):
+    return _Timer(TOOL_SECONDS, (name,)) if enabled else _NOOP
+
+
+def cache_lookup(cache: str, hit: bool):
+    if enabled:
+        CACHE_LOOKUPS.inc(cache, "hit" if hit else "miss")
+
+
+def single_flight(group: str, role: str):
+    if enabled:
+        SINGLE_FLIGHT.inc(group, role)
+
+
+def instrument_pool(engine, name: str = "primary"):
+    from sqlalchemy import event
+
+    if not enabled:
+        return
+    pool = engine.pool
+
+    def on_checkout(*_):
+        POOL_EVENTS.inc(name, "checkout")
+        POOL_CHECKED_OUT.inc(name)
+
+    def on_checkin(*_):
+        POOL_EVENTS.inc(name, "checkin")
+        POOL_CHECKED_OUT.dec(name)
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    event.listen(engine, "connect", lambda *_: POOL_EVENTS.inc(name, "connect"))
+    event.listen(engine, "invalidate", lambda *_: POOL_EVENTS.inc(name, "invalidate"))
+    if hasattr(pool, "overflow"):
+        POOL_OVERFLOW.track(lambda: max(pool.overflow(), 0), name)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def cache_hit_ratios() -> dict:
+    hits: dict[str, dict] = {}
+    for (cache, outcome), n in CACHE_LOOKUPS.collect().items():
+        hits.setdefault(cache, {"hit": 0, "miss": 0})[outcome] += n
+    return {cache: round(c["hit"] / (c["hit"] + c["miss"]), 4) for cache, c in hits.items()}
@@ -0,0 +1,76 @@
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RESULT_FORMATS = ("rows", "columnar")
+
+
+def _hex(value) -> str:
+    return "0x" + bytes(value).hex().upper()
+
+
+def _iso(value) -> str:
+    return value.isoformat()
+
+
+# Converters for the SQL Server types the encoders do not handle natively,
+# looked up by exact type so each value costs one dict probe.
+_CONVERTERS = {
+    Decimal: str,
+    bytes: _hex,
+    bytearray: _hex,
+    memoryview: _hex,
+    UUID: str,
+    timedelta: str,
+}
+if orjson is None:
+    _CONVERTERS.update({datetime: _iso, date: _iso, time: _iso})
+
+
+def _default(value):
+    convert = _CONVERTERS.get(type(value))
+    if convert is not None:
+        return convert(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _hex(value)
+    return str(value)
+
+
+_PLAIN = {str, int, float, bool, type(None)}
+
+
+def to_plain(row) -> list:
+    # For writers without a default hook (csv): everything else goes through _default.
+    return [v if type(v) in _PLAIN else _default(v) for v in row]
+
+
+def to_columnar(columns: list[str], rows: list) -> list[list]:
+    data = [list(col) for col in zip(*rows)] if rows else [[] for _ in columns]
+    for values in data:
+        kind = type(next((v for v in values if v is not None), None))
+        convert = _CONVERTERS.get(kind)
+        if convert is not None:
+            values[:] = [convert(v) if type(v) is kind else v for v in values]
+    return data
+
+
+def dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=_default, separators=(",", ":"))
+
+
+def loads(data: str | bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -30,6 +30,7 @@ configure_logging()
 
 from mcp_mssql.config import settings
 from mcp_mssql.tools.query_tools import mcp
+from mcp_mssql.warmup import WarmupMiddleware
 
 log = structlog.get_logger(__name__)
 
@@ -48,6 +49,9 @@ def main():
         server=settings.MSSQL_SERVER,
     )
 
+    # Engine, pool and schema are built in the background after the handshake.
+    mcp.add_middleware(WarmupMiddleware())
+
     if transport == "stdio":
         # Claude Desktop — spawns process, pipes JSON-RPC via stdin/stdout
         mcp.run(transport="stdio")
@@ -1,84 +1,391 @@
 import json
 from fastmcp import FastMCP
-from mcp_mssql.database.executor import executor
-from mcp_mssql.database.schema_cache import schema_cache
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from mcp_mssql.config import settings
+from mcp_mssql.database.plan_analyzer import plan_cache
+from mcp_mssql.database.spool import result_spool
+from mcp_mssql.database.workload import ORDER_BY, workload_history
+from mcp_mssql.database import cancellation
+from mcp_mssql.serialization import dumps
+from mcp_mssql.tools.worker_pool import offload, worker_pool
+from mcp_mssql import metrics
 
 mcp = FastMCP(
     name="MSSQL Intelligence Server",
     instructions="""
     You have access to a production MS SQL Server database.
     ALWAYS call get_database_schema first before writing any query.
-    Use find_related_tables to discover JOIN paths.
+    Tools take an optional `database`; call list_databases to see which are configured.
+    Use profile_table to learn value distributions (nulls, distinct counts, ranges, top values).
+    Use find_related_tables to discover direct relationships and find_join_path for JOIN paths.
     Use execute_parameterized_query for any user-supplied values.
     """,
 )
 
-@mcp.tool(description="Get full schema: tables, columns, PKs, FK relationships. Call this FIRST.")
-def get_database_schema(table_filter: str = "", include_relationships: bool = True) -> str:
-    schema = schema_cache.get_full_schema()
-    if table_filter:
-        schema = {k: v for k, v in schema.items() if table_filter.lower() in k.lower()}
-    if not include_relationships:
-        schema = {k: {"columns": v["columns"]} for k, v in schema.items()}
-    return json.dumps(schema, indent=2)
 
+# The query layer pulls in SQLAlchemy and sqlglot; it is imported on first
+# use (or by the post-handshake warm-up) so the handshake does not wait on it.
+def _executor():
+    from mcp_mssql.database.executor import executor
+    return executor
 
-@mcp.tool(description="Execute T-SQL. Supports CTEs, window functions, multi-table JOINs, subqueries.")
-def execute_sql_query(query: str, description: str = "") -> str:
+
+def _schema_cache(database: str = ""):
+    from mcp_mssql.database.schema_cache import get_schema_cache
+    return get_schema_cache(database or None)
+
+
+def _registry():
+    from mcp_mssql.database.registry import get_registry
+    return get_registry()
+
+
+def _result_cache():
+    from mcp_mssql.database.result_cache import result_cache
+    return result_cache
+
+
+def _cursor_store():
+    from mcp_mssql.database.cursor_store import cursor_store
+    return cursor_store
+
+
+def _serialize(payload: dict) -> str:
+    with metrics.phase("serialize"):
+        body = dumps(payload)
+    workload_history.add_bytes(len(body))
+    return body
+
+@mcp.tool(description=(
+    "Get full schema: tables, columns, PKs, FK relationships. Call this FIRST. "
+    "Narrow large schemas with table_filter (substring of schema.table), column_name "
+    "(tables having that column, e.g. customer_id) or data_type; page with limit/offset."
+))
+@offload
+def get_database_schema(
+    table_filter: str = "",
+    include_relationships: bool = True,
+    column_name: str = "",
+    data_type: str = "",
+    limit: int = 0,
+    offset: int = 0,
+    database: str = "",
+) -> str:
+    index = _schema_cache(database).get_index()
+    return index.render(table_filter, column_name, data_type, include_relationships, limit, max(offset, 0))
+
+
+@mcp.tool(description=(
+    "Execute T-SQL. Supports CTEs, window functions, multi-table JOINs, subqueries. "
+    "format='columnar' returns column names once and values as per-column arrays."
+))
+@offload
+def execute_sql_query(
+    query: str,
+    description: str = "",
+    format: str = "rows",
+    timeout_seconds: int = 0,
+    database: str = "",
+) -> str:
+    try:
+        return _serialize(_executor().execute(query, format=format, timeout=timeout_seconds or None, database=database or None))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Execute parameterized T-SQL safely. Use :param_name syntax. "
+    "format='columnar' returns column names once and values as per-column arrays. "
+    "timeout_seconds overrides the default statement timeout."
+))
+@offload
+def execute_parameterized_query(
+    query_template: str,
+    parameters: dict,
+    format: str = "rows",
+    timeout_seconds: int = 0,
+    database: str = "",
+) -> str:
     try:
-        return json.dumps(executor.execute(query), default=str)
+        return _serialize(_executor().execute(
+            query_template, parameters, format=format, timeout=timeout_seconds or None, database=database or None
+        ))
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-@mcp.tool(description="Execute parameterized T-SQL safely. Use :param_name syntax.")
-def execute_parameterized_query(query_template: str, parameters: dict) -> str:
+@mcp.tool(description=(
+    "Run several independent read queries concurrently in one call: pass `queries`, or one "
+    "`query_template` with many `parameter_sets`. Returns per-query results and errors; "
+    "queries still running when timeout_seconds elapses are reported as errors."
+))
+@offload
+def execute_query_batch(
+    queries: list[str] | None = None,
+    query_template: str = "",
+    parameter_sets: list[dict] | None = None,
+    max_parallel: int = 4,
+    timeout_seconds: float = 60,
+    format: str = "rows",
+    database: str = "",
+) -> str:
+    items = [(q, None) for q in queries or []]
+    if query_template:
+        items += [(query_template, p) for p in parameter_sets or [{}]]
     try:
-        return json.dumps(executor.execute(query_template, parameters), default=str)
+        return _serialize(_executor().execute_batch(items, max_parallel, timeout_seconds, format, database or None))
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-@mcp.tool(description="Get sample rows from a table to understand data shape.")
-def get_table_sample(table_name: str, schema_name: str = "dbo", sample_size: int = 10) -> str:
+@mcp.tool(description=(
+    "Bulk write (requires writes to be enabled): one INSERT, UPDATE or MERGE template with :name "
+    "parameters, run for every item of parameter_sets or every row of an uploaded CSV "
+    "(csv_resource, a spool:// URI from upload_csv or a csv export; header names match the "
+    "parameters). Rows are sent chunk_size at a time (default: the server's BULK_CHUNK_ROWS), each "
+    "chunk in its own transaction; returns per-chunk progress and errors."
+))
+@offload
+def execute_bulk(
+    query_template: str,
+    parameter_sets: list[dict] | None = None,
+    csv_resource: str = "",
+    chunk_size: int = 0,
+    stop_on_error: bool = False,
+    timeout_seconds: int = 0,
+    database: str = "",
+) -> str:
+    try:
+        return _serialize(_executor().execute_bulk(
+            query_template, parameter_sets, csv_resource, chunk_size, stop_on_error,
+            timeout_seconds or None, database or None,
+        ))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Upload CSV text (header row first) for execute_bulk (requires writes to be enabled). Large files "
+    "can be sent in pieces: pass the returned upload_id to append the next piece, without repeating the header."
+))
+@offload
+def upload_csv(content: str, upload_id: str = "") -> str:
+    try:
+        if not settings.ALLOW_WRITE_OPERATIONS:
+            raise ValueError("Write operations are disabled; uploads only feed execute_bulk")
+        entry = result_spool.upload(content.encode(), upload_id or None)
+        return json.dumps({
+            "upload_id": entry.export_id,
+            "csv_resource": f"spool://{entry.export_id}",
+            "size_bytes": entry.size,
+        })
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Execute a read query page by page. Returns the first page and a continuation_token for fetch_query_page. "
+    "Pages served after the server-side cursor is released re-run the query with OFFSET/FETCH; without an "
+    "ORDER BY on a unique key their order is not deterministic, so rows can repeat or be skipped across pages."
+))
+@offload
+def execute_paged_query(
+    query: str, parameters: dict | None = None, page_size: int = 500, database: str = ""
+) -> str:
+    try:
+        return _serialize(_cursor_store().open(query, parameters, page_size, database or None))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description="Fetch the next page of a paged query using its continuation_token.")
+@offload
+def fetch_query_page(continuation_token: str) -> str:
+    try:
+        return _serialize(_cursor_store().fetch(continuation_token))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description="Release the server-side cursor of a paged query that will not be read to the end.")
+@offload
+def close_paged_query(continuation_token: str) -> str:
+    try:
+        return json.dumps({"closed": _cursor_store().close(continuation_token)})
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Export a large read query (beyond the inline row limit) to a server-side file, format "
+    "'csv' or 'arrow' (Arrow IPC). Returns only the schema, row count, a preview and a "
+    "spool:// resource URI; read the file in byte ranges via spool://{export_id}/{offset}/{length}."
+))
+@offload
+def export_query_results(
+    query: str,
+    parameters: dict | None = None,
+    format: str = "csv",
+    preview_rows: int = 10,
+    timeout_seconds: int = 0,
+    database: str = "",
+) -> str:
+    try:
+        return _serialize(_executor().export(
+            query, parameters, format, min(preview_rows, 100), timeout_seconds or None, database or None
+        ))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Profile a table's columns: null fraction, distinct estimate, min/max, top values and "
+    "histogram buckets. Built from SQL Server statistics where they exist and a TABLESAMPLE "
+    "otherwise; cached until the table's data changes, so repeated calls are cheap."
+))
+@offload
+def profile_table(table_name: str, database: str = "") -> str:
+    try:
+        return _serialize(_schema_cache(database).get_profile(table_name))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description="Get sample rows from a table to see raw values. Prefer profile_table to understand data shape.")
+@offload
+def get_table_sample(table_name: str, schema_name: str = "dbo", sample_size: int = 10, database: str = "") -> str:
     sample_size = min(sample_size, 100)
     query = f"SELECT TOP {sample_size} * FROM [{schema_name}].[{table_name}] WITH (NOLOCK)"
     try:
-        return json.dumps(executor.execute(query), default=str)
+        return _serialize(_executor().execute(query, database=database or None))
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
 @mcp.tool(description="Find all tables related to a given table via foreign keys.")
-def find_related_tables(table_name: str) -> str:
-    query = """
-    SELECT
-        OBJECT_NAME(fkc.parent_object_id)                           AS child_table,
-        COL_NAME(fkc.parent_object_id, fkc.parent_column_id)       AS child_column,
-        OBJECT_NAME(fkc.referenced_object_id)                       AS parent_table,
-        COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id) AS parent_column,
-        fk.name                                                      AS fk_name
-    FROM sys.foreign_key_columns fkc
-    JOIN sys.foreign_keys fk ON fkc.constraint_object_id = fk.object_id
-    WHERE OBJECT_NAME(fkc.parent_object_id)     = :table_name
-       OR OBJECT_NAME(fkc.referenced_object_id) = :table_name
-    """
+@offload
+def find_related_tables(table_name: str, database: str = "") -> str:
+    try:
+        graph = _schema_cache(database).get_fk_graph()
+        rows = graph.related(table_name)
+        return json.dumps({
+            "table": graph.resolve(table_name),
+            "columns": ["child_table", "child_column", "parent_table", "parent_column", "fk_name"],
+            "rows": rows,
+            "row_count": len(rows),
+        })
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Find the shortest foreign-key join path between two tables (up to max_paths alternatives), "
+    "or a join tree connecting three or more tables. Returns ready-to-use FROM/JOIN ... ON clauses."
+))
+@offload
+def find_join_path(tables: list[str], max_paths: int = 3, database: str = "") -> str:
+    try:
+        paths = _schema_cache(database).get_fk_graph().join_paths(tables, max(1, max_paths))
+        return json.dumps({"paths": paths})
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Get the estimated execution plan digest for performance diagnosis: costliest operators, "
+    "scans vs seeks, estimated rows, missing-index suggestions, implicit conversions and spills. "
+    "Set include_xml=True only if the raw SHOWPLAN XML is really needed; it can be very large."
+))
+@offload
+def get_query_execution_plan(
+    query: str, include_xml: bool = False, top_operators: int = 5, database: str = ""
+) -> str:
+    try:
+        return _serialize(_executor().get_execution_plan(query, include_xml, max(1, top_operators), database or None))
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+@mcp.tool(description=(
+    "Find the queries that cost the most: top_n query fingerprints (literals replaced by ?) with "
+    f"call counts, p50/p95/p99 latency, rows and response bytes, ordered by one of {', '.join(ORDER_BY)}. "
+    "Also lists the slowest recent executions."
+))
+@offload
+def get_slow_queries(top_n: int = 10, order_by: str = "total_ms", database: str = "") -> str:
     try:
-        return json.dumps(executor.execute(query, {"table_name": table_name}), default=str)
+        name = _registry().get(database).name if database else None
+        return dumps(workload_history.top(max(1, min(top_n, 100)), order_by, name))
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-@mcp.tool(description="Get XML execution plan for query performance diagnosis.")
-def get_query_execution_plan(query: str) -> str:
+@mcp.tool(description=(
+    "Refresh schema cache after DDL changes. Only tables created, altered or dropped "
+    "since the last snapshot are re-read unless full=True."
+))
+@offload
+def refresh_schema_cache(full: bool = False, database: str = "") -> str:
     try:
-        return json.dumps(executor.get_execution_plan(query))
+        stats = _schema_cache(database).refresh(full=full)
     except Exception as e:
         return json.dumps({"error": str(e)})
+    _result_cache().clear()
+    plan_cache.clear()
+    return json.dumps({"status": "refreshed", **stats})
+
+
+@mcp.tool(description=(
+    "List the configured databases and their read replicas. Pass a name as the `database` "
+    "argument of other tools; the default database is used when it is omitted."
+))
+@offload
+def list_databases() -> str:
+    registry = _registry()
+    return json.dumps({
+        "default": registry.default,
+        "databases": [
+            {"name": t.name, "read_replicas": len(t.replicas)} for t in registry.targets.values()
+        ],
+    })
+
+
+@mcp.tool(description="Get server runtime statistics: result cache, paged-query cursors, worker pool queue depth, circuit breaker state, per-database routing and replica health, coalesced queries and introspections, timed-out and cancelled queries, export spool usage, workload history size, hit ratio per cache.")
+@offload
+def get_server_stats() -> str:
+    return json.dumps({
+        "result_cache": _result_cache().stats(),
+        "cursors": _cursor_store().stats(),
+        "worker_pool": worker_pool.stats(),
+        "circuit_breaker": _executor().breaker.stats(),
+        "databases": _registry().stats(),
+        "single_flight": {"query": _executor().flight.stats(), "schema": _schema_cache().flight.stats()},
+        "queries": cancellation.stats(),
+        "spool": result_spool.stats(),
+        "workload": workload_history.stats(),
+        "cache_hit_ratio": metrics.cache_hit_ratios(),
+    })
+
+
+@mcp.resource(
+    "metrics://prometheus",
+    mime_type="text/plain",
+    description="Tool, query-phase, pool and cache metrics in Prometheus text format.",
+)
+def metrics_resource() -> str:
+    return metrics.render()
+
+
+@mcp.resource(
+    "spool://{export_id}/{offset}/{length}",
+    mime_type="application/octet-stream",
+    description="A byte range of an exported result file; length is capped at the spool chunk size.",
+)
+def export_chunk(export_id: str, offset: int, length: int) -> bytes:
+    return result_spool.read(export_id, int(offset), int(length))
 
 
-@mcp.tool(description="Refresh schema cache after DDL changes.")
-def refresh_schema_cache() -> str:
-    schema_cache.invalidate()
-    schema = schema_cache.get_full_schema()
-    return json.dumps({"status": "refreshed", "tables": len(schema)})
\ No newline at end of file
+@mcp.custom_route("/metrics", methods=["GET"], include_in_schema=False)
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
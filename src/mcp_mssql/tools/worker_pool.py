@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import functools
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastmcp.server.dependencies import get_context
+import structlog
+
+from mcp_mssql.config import settings
+from mcp_mssql.database import cancellation
+from mcp_mssql import metrics
+
+log = structlog.get_logger(__name__)
+
+
+class Saturated(RuntimeError):
+    pass
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        max_workers: int = settings.TOOL_WORKERS or settings.POOL_SIZE + settings.POOL_MAX_OVERFLOW,
+        max_per_client: int = settings.MAX_CONCURRENT_PER_CLIENT,
+        max_queue: int = settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = settings.ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.max_workers = max_workers
+        self.max_per_client = max_per_client
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-tool")
+        self._slots: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+        self._per_client: dict[str, int] = {}
+        self._active = 0
+        self._queued = 0
+        self._peak_queued = 0
+        self._admitted = 0
+        self._rejected = 0
+
+    async def run(self, client: str, fn, *args, **kwargs):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+
+        with self._lock:
+            if self._per_client.get(client, 0) >= self.max_per_client:
+                self._rejected += 1
+                raise Saturated(
+                    f"Too many concurrent requests for this client (limit {self.max_per_client})"
+                )
+            if self._queued + self._active >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise Saturated(f"Server busy: {self._queued} requests already queued")
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._rejected += 1
+                raise Saturated(f"Server busy: no worker free within {self.queue_timeout}s")
+            finally:
+                with self._lock:
+                    self._queued -= 1
+
+            with self._lock:
+                self._active += 1
+                self._admitted += 1
+            scope = cancellation.QueryScope(settings.QUERY_TIMEOUT)
+            ctx = contextvars.copy_context()
+            ctx.run(cancellation.bind, scope)
+            loop = asyncio.get_running_loop()
+            # The slot is held until the thread is done, not until we stop
+            # waiting for it: a cancelled call keeps its worker busy until the
+            # statement notices.
+            future = self._executor.submit(ctx.run, fn, *args, **kwargs)
+            future.add_done_callback(lambda _: self._release(loop))
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # Client cancelled or disconnected: stop the running statement so
+                # the worker and its pooled connection are released promptly.
+                scope.cancel()
+                raise
+        finally:
+            with self._lock:
+                remaining = self._per_client[client] - 1
+                if remaining:
+                    self._per_client[client] = remaining
+                else:
+                    del self._per_client[client]
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        # Runs on the worker thread, or on the loop if the call never started.
+        with self._lock:
+            self._active -= 1
+        try:
+            loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            pass  # the loop is closed; nothing is left waiting for a slot
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "peak_queued": self._peak_queued,
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "clients": len(self._per_client),
+            }
+
+
+def _client_key() -> str:
+    try:
+        ctx = get_context()
+        return ctx.client_id or ctx.session_id
+    except Exception:
+        return "local"
+
+
+def offload(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with metrics.tool(fn.__name__):
+            try:
+                response = await worker_pool.run(_client_key(), fn, *args, **kwargs)
+            except Saturated as e:
+                log.warning("tool.rejected", tool=fn.__name__, reason=str(e))
+                metrics.TOOL_REJECTED.inc(fn.__name__)
+                return json.dumps({"error": str(e), "retryable": True})
+        metrics.TOOL_PAYLOAD_BYTES.observe(len(response), fn.__name__)
+        return response
+    return wrapper
+
+worker_pool = WorkerPool()
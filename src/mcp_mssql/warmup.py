@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastmcp.server.middleware import Middleware
+import structlog
+
+from mcp_mssql.config import settings
+
+log = structlog.get_logger(__name__)
+
+_started = False
+_lock = threading.Lock()
+
+
+def _open_pool(engine, size: int) -> int:
+    # Check out `size` connections at once so the pool really holds that
+    # many, then hand them all back.
+    with ThreadPoolExecutor(max_workers=size, thread_name_prefix="mcp-warmup") as pool:
+        futures = [pool.submit(engine.connect) for _ in range(size)]
+    opened, error = 0, None
+    for future in futures:
+        try:
+            future.result().close()
+            opened += 1
+        except Exception as e:
+            error = e
+    if error is not None:
+        log.warning("server.warmup.connect_failed", failed=size - opened, error=str(error))
+    return opened
+
+
+def warm_up():
+    t0 = time.perf_counter()
+    from mcp_mssql.database.registry import get_registry
+    from mcp_mssql.database.executor import executor  # noqa: F401
+    from mcp_mssql.database.schema_cache import schema_cache
+    from mcp_mssql.database.validator import get_validator
+
+    # The first parse loads sqlglot's T-SQL dialect.
+    get_validator().validate("SELECT 1")
+    opened = sum(_open_pool(m.engine, settings.POOL_SIZE) for m in get_registry().members())
+    try:
+        schema_cache.get_index()
+        schema_cache.get_fk_graph()
+    except Exception as e:
+        log.warning("server.warmup.schema_failed", error=str(e))
+    log.info("server.warmup.done", connections=opened, elapsed_ms=round((time.perf_counter() - t0) * 1000, 2))
+
+
+def start():
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=warm_up, name="mcp-warmup", daemon=True).start()
+
+
+class WarmupMiddleware(Middleware):
+    # The initialize response has been sent by the time call_next returns,
+    # so the handshake never waits for drivers, pools or schema.
+    async def on_initialize(self, context, call_next):
+        result = await call_next(context)
+        if settings.WARMUP_ENABLED:
+            start()
+        return result
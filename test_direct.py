@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import json
+import asyncio
 
 print("=" * 60)
 print("MCP MSSQL - Direct Tool Tests")
@@ -110,23 +111,23 @@ try:
     )
 
     # Schema tool
-    schema_json = get_database_schema(table_filter="")
+    schema_json = asyncio.run(get_database_schema(table_filter=""))
     schema_data = json.loads(schema_json)
     print(f"  ✅ get_database_schema: {len(schema_data)} tables")
 
     # Execute tool
-    result_json = execute_sql_query("SELECT TOP 3 TABLE_NAME FROM INFORMATION_SCHEMA.TABLES")
+    result_json = asyncio.run(execute_sql_query("SELECT TOP 3 TABLE_NAME FROM INFORMATION_SCHEMA.TABLES"))
     result_data = json.loads(result_json)
     print(f"  ✅ execute_sql_query: {result_data['row_count']} rows")
 
     # Sample tool — replace 'Users' with any real table in your DB
     first_table = list(schema_data.keys())[0].split(".")[-1]
-    sample_json = get_table_sample(table_name=first_table, sample_size=3)
+    sample_json = asyncio.run(get_table_sample(table_name=first_table, sample_size=3))
     sample_data = json.loads(sample_json)
     print(f"  ✅ get_table_sample ({first_table}): {sample_data['row_count']} rows")
 
     # Related tables
-    related_json = find_related_tables(table_name=first_table)
+    related_json = asyncio.run(find_related_tables(table_name=first_table))
     related_data = json.loads(related_json)
     print(f"  ✅ find_related_tables ({first_table}): {related_data['row_count']} relationships")
 
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from backends import ensure_driver  # noqa: E402
+
+ensure_driver()
+
+import pytest  # noqa: E402
+
+from mcp_mssql.database import registry  # noqa: E402
+
+
+@pytest.fixture
+def use_engine(monkeypatch):
+    # Point every module that talks to the database at the given engine.
+    def install(engine) -> registry.EngineRegistry:
+        monkeypatch.setattr(registry, "_registry", registry.EngineRegistry.single(engine))
+        return registry._registry
+    return install
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+from collections import Counter
+
+from mcp_mssql.database.single_flight import _FINISH
+
+
+def _bytes(value) -> bytes:
+    return value if isinstance(value, bytes) else str(value).encode()
+
+
+class FakeRedis:
+    # Just enough of redis-py for the schema cache and single-flight: string
+    # keys with expiry, SET NX, counters, pub/sub and the lock scripts.
+    # Counts commands so tests can assert on round trips.
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        self._channels: dict[str, list[queue.Queue]] = {}
+        self._lock = threading.Lock()
+        self.commands: Counter = Counter()
+
+    def get(self, key: str) -> bytes | None:
+        self.commands["get"] += 1
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key: str, value, nx: bool = False, px: int | None = None, ex: int | None = None):
+        self.commands["set"] += 1
+        with self._lock:
+            if nx and self._get(key) is not None:
+                return None
+            ttl = px / 1000 if px else ex
+            self._data[key] = (_bytes(value), time.monotonic() + ttl if ttl else None)
+            return True
+
+    def setex(self, key: str, seconds: int, value):
+        return self.set(key, value, ex=seconds)
+
+    def delete(self, *keys: str) -> int:
+        self.commands["delete"] += 1
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def incr(self, key: str) -> int:
+        self.commands["incr"] += 1
+        with self._lock:
+            value = self._get(key)
+            expires_at = self._data[key][1] if value is not None else None
+            count = int(value or 0) + 1
+            self._data[key] = (_bytes(count), expires_at)
+            return count
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return self.pexpire(key, seconds * 1000)
+
+    def pexpire(self, key: str, ms: int) -> bool:
+        self.commands["pexpire"] += 1
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                return False
+            self._data[key] = (value, time.monotonic() + ms / 1000)
+            return True
+
+    def eval(self, script: str, numkeys: int, *args):
+        # Only SingleFlight's scripts: compare-and-delete the lock, and for
+        # _FINISH keep it instead when the waiting key exists.
+        self.commands["eval"] += 1
+        keys, token = args[:numkeys], _bytes(args[numkeys])
+        with self._lock:
+            if self._get(keys[0]) != token:
+                return 0
+            if script == _FINISH:
+                if self._get(keys[1]) is not None:
+                    return 1
+                del self._data[keys[0]]
+                return 0
+            del self._data[keys[0]]
+            return 1
+
+    def publish(self, channel: str, message) -> int:
+        self.commands["publish"] += 1
+        with self._lock:
+            subscribers = list(self._channels.get(channel, []))
+        for inbox in subscribers:
+            inbox.put({"type": "message", "channel": channel.encode(), "data": _bytes(message)})
+        return len(subscribers)
+
+    def subscribers(self, channel: str) -> int:
+        with self._lock:
+            return len(self._channels.get(channel, []))
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "FakePubSub":
+        return FakePubSub(self)
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def _get(self, key: str) -> bytes | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+
+class FakePubSub:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.inbox: queue.Queue = queue.Queue()
+
+    def subscribe(self, *channels: str):
+        with self.redis._lock:
+            for channel in channels:
+                self.redis._channels.setdefault(channel, []).append(self.inbox)
+
+    def listen(self):
+        while True:
+            yield self.inbox.get()
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.queued: list = []
+
+    def __getattr__(self, name: str):
+        def queue_command(*args, **kwargs):
+            self.queued.append((name, args, kwargs))
+            return self
+        return queue_command
+
+    def execute(self) -> list:
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.queued]
+        self.queued = []
+        return results
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from mcp_mssql.config import settings
+from mcp_mssql.database.executor import QueryExecutor
+from mcp_mssql.database.spool import result_spool
+from mcp_mssql.tools import query_tools
+
+INSERT = "INSERT INTO Orders (Id, Customer, Amount) VALUES (:id, :customer, :amount)"
+
+
+def orders(ids) -> list[dict]:
+    return [{"id": i, "customer": f"secret-{i}", "amount": i * 1.5} for i in ids]
+
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch) -> QueryExecutor:
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", True)
+    engine = create_engine(f"sqlite:///{tmp_path}/bulk.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Orders (Id INTEGER PRIMARY KEY, Customer TEXT, Amount REAL)"))
+    return QueryExecutor(engine=engine)
+
+
+def stored_ids(executor: QueryExecutor) -> list[int]:
+    with executor.engine.connect() as conn:
+        return list(conn.execute(text("SELECT Id FROM Orders ORDER BY Id")).scalars())
+
+
+def test_rows_are_sent_in_chunks(executor):
+    result = executor.execute_bulk(INSERT, orders(range(10)), chunk_size=4)
+    assert [(c["first_row"], c["rows"]) for c in result["chunks"]] == [(0, 4), (4, 4), (8, 2)]
+    assert result["rows_succeeded"] == 10
+    assert stored_ids(executor) == list(range(10))
+
+
+def test_failing_chunk_rolls_back_alone(executor):
+    # Id 5 is repeated inside the second chunk, so its first rows must not stay behind.
+    rows = orders([0, 1, 2, 3, 4, 5, 5, 7, 8, 9])
+    result = executor.execute_bulk(INSERT, rows, chunk_size=4)
+    assert result["rows_failed"] == 4
+    assert [("error" in c) for c in result["chunks"]] == [False, True, False]
+    assert stored_ids(executor) == [0, 1, 2, 3, 8, 9]
+
+    # The driver's message, without the bound rows.
+    error = result["chunks"][1]["error"]
+    assert "UNIQUE constraint failed" in error
+    assert "secret-" not in error and "[parameters" not in error
+
+
+def test_stop_on_error_skips_later_chunks(executor):
+    result = executor.execute_bulk(INSERT, orders([0, 0, 2, 3, 4]), chunk_size=2, stop_on_error=True)
+    assert result["stopped_early"]
+    assert len(result["chunks"]) == 1
+    assert stored_ids(executor) == []
+
+
+def test_every_row_needs_every_parameter(executor):
+    rows = orders(range(6))
+    del rows[4]["amount"]
+    result = executor.execute_bulk(INSERT, rows, chunk_size=3)
+    assert result["chunks"][1]["error"] == "Row 4 is missing parameters ['amount']"
+    assert stored_ids(executor) == [0, 1, 2]
+
+    with pytest.raises(ValueError, match="missing"):
+        executor.execute_bulk(INSERT, [{"id": 1}])
+
+
+def test_chunk_size_defaults_to_the_setting_and_is_clamped(executor, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_CHUNK_ROWS", 3)
+    monkeypatch.setattr(settings, "BULK_MAX_CHUNK_ROWS", 5)
+    assert len(executor.execute_bulk(INSERT, orders(range(9)))["chunks"]) == 3
+    assert len(executor.execute_bulk(INSERT, orders(range(10, 20)), chunk_size=1000)["chunks"]) == 2
+
+
+def test_csv_upload(executor):
+    csv = "id,customer,amount\n1,a,1.5\n2,,\n3,c,4.5\n"
+    resource = f"spool://{result_spool.upload(csv.encode()).export_id}"
+    try:
+        result = executor.execute_bulk(INSERT, csv_resource=resource, chunk_size=2)
+    finally:
+        result_spool.clear()
+    assert result["rows_succeeded"] == 3
+    with executor.engine.connect() as conn:
+        assert conn.execute(text("SELECT Customer, Amount FROM Orders WHERE Id = 2")).one() == (None, None)
+
+
+def test_upload_requires_writes(monkeypatch):
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", False)
+    response = json.loads(asyncio.run(query_tools.upload_csv("id\n1\n")))
+    assert "disabled" in response["error"]
+    assert result_spool.stats()["exports"] == 0
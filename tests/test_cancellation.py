@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+
+from backends import Dataset, fake_dbapi_module, fake_engine
+from mcp_mssql.config import settings
+from mcp_mssql.database import cancellation
+from mcp_mssql.database.cancellation import QueryCancelled, QueryTimeout, statement_scope
+from mcp_mssql.database.executor import QueryExecutor
+
+dbapi = fake_dbapi_module()
+
+
+@pytest.fixture
+def engine():
+    return fake_engine(Dataset(tables=5, wide_rows=10, tall_rows=10), pool_size=1)
+
+
+@pytest.fixture
+def cursor_timeouts(engine) -> list[int]:
+    # The timeout each data cursor was created with, as the driver would apply it.
+    seen = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, *_):
+        if "Tall" in statement:
+            seen.append(cursor.query_timeout)
+    return seen
+
+
+def test_statement_timeout_reaches_the_cursor(engine, cursor_timeouts):
+    executor = QueryExecutor(engine=engine)
+    executor.execute("SELECT Id FROM Tall", timeout=7)
+    executor.execute("SELECT Id FROM Tall WHERE Id = 1")
+    assert cursor_timeouts == [7, settings.QUERY_TIMEOUT]
+
+
+def test_batch_deadline_caps_item_timeouts(engine, cursor_timeouts):
+    executor = QueryExecutor(engine=engine)
+    executor.execute_batch([("SELECT Id FROM Tall", None), ("SELECT Customer FROM Tall", None)], timeout=3)
+    assert len(cursor_timeouts) == 2
+    assert all(1 <= t <= 3 for t in cursor_timeouts)
+
+
+def test_checkin_restores_the_default(engine):
+    QueryExecutor(engine=engine).execute("SELECT Id FROM Tall", timeout=7)
+    with engine.connect() as conn:
+        assert conn.connection.dbapi_connection.timeout == settings.QUERY_TIMEOUT
+
+
+def test_cursors_have_no_timeout_attribute(engine):
+    # Setting one would be silently ignored by pyodbc; the fake refuses it.
+    with engine.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        with pytest.raises(AttributeError):
+            cursor.timeout = 5
+
+
+def test_driver_timeout_becomes_query_timeout():
+    error = DBAPIError("SELECT 1", None, dbapi.OperationalError("HYT00", "[HYT00] Query timeout expired"))
+    with pytest.raises(QueryTimeout):
+        with statement_scope(2):
+            raise error
+    assert cancellation.stats()["timed_out"] >= 1
+
+
+def test_cancel_interrupts_registered_cursors():
+    class Cursor:
+        cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    cursor = Cursor()
+    with pytest.raises(QueryCancelled):
+        with statement_scope(30) as scope:
+            scope.register(cursor)
+            scope.cancel()
+            raise dbapi.OperationalError("HY008", "Operation canceled")
+    assert cursor.cancelled
+
+    # A cancelled parent stops new statements in its children.
+    parent = cancellation.QueryScope(30)
+    parent.cancel()
+    cancellation.bind(parent)
+    try:
+        with pytest.raises(QueryCancelled):
+            with statement_scope():
+                pass
+    finally:
+        cancellation.bind(None)
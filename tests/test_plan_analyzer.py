@@ -0,0 +1,95 @@
+import os
+import time
+
+from mcp_mssql.database.plan_analyzer import PlanDigestCache, digest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "plans")
+
+
+def plan(name: str) -> str:
+    # As pyodbc returns it: a str that still declares utf-16.
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_scan_with_missing_index_and_implicit_conversion():
+    [stmt] = digest(plan("scan_missing_index.xml"))
+    assert stmt["statement"] == "SELECT OrderId, OrderDate, Total FROM dbo.Orders WHERE CustomerCode = @1"
+    assert stmt["type"] == "SELECT"
+    assert stmt["estimated_cost"] == 4.2184
+    assert stmt["scans"] == [
+        {"operator": "Clustered Index Scan", "object": "dbo.Orders (PK_Orders)", "estimated_rows": 12.3457}
+    ]
+    assert stmt["top_operators"][0]["cost_pct"] == 100.0
+
+    [missing] = stmt["missing_indexes"]
+    assert missing["impact"] == 97.4213
+    assert (missing["equality"], missing["inequality"], missing["include"]) == (
+        ["CustomerCode"], [], ["OrderDate", "Total"]
+    )
+    assert missing["suggestion"] == (
+        "CREATE INDEX [IX_Orders_CustomerCode] ON [dbo].[Orders] ([CustomerCode]) INCLUDE ([OrderDate], [Total])"
+    )
+    assert stmt["implicit_conversions"][0].startswith("Seek Plan: CONVERT_IMPLICIT(nvarchar(20)")
+    assert "degree_of_parallelism" not in stmt
+
+
+def test_key_lookup_written_as_clustered_seek():
+    [stmt] = digest(plan("parallel_key_lookup.xml"))
+    assert stmt["seeks"] == 1
+    assert stmt["lookups"] == 1
+    assert stmt["operator_counts"] == {"Parallelism": 1, "Nested Loops": 1, "Index Seek": 1, "Key Lookup": 1}
+    assert stmt["degree_of_parallelism"] == 4
+    assert stmt["memory_grant_kb"] == 1056
+
+    # Own cost is the subtree cost minus the children's.
+    costs = {op["node_id"]: (op["operator"], op["cost"]) for op in stmt["top_operators"]}
+    assert costs == {
+        5: ("Key Lookup", 0.4),
+        0: ("Parallelism", 0.05),
+        1: ("Nested Loops", 0.0467),
+        3: ("Index Seek", 0.0033),
+    }
+    assert [op["node_id"] for op in stmt["top_operators"]] == [5, 0, 1, 3]
+
+
+def test_batch_with_spills_and_warnings():
+    first, second = digest(plan("batch_spills.xml"))
+    assert first["warnings"] == ["ColumnsWithNoStatistics", "NoJoinPredicate"]
+    assert first["spill_count"] == 2
+    assert first["spills"][0] == {
+        "kind": "SpillToTempDb", "node_id": 0, "operator": "Sort", "SpillLevel": "1", "SpilledThreadCount": "1",
+    }
+    assert {s["object"] for s in first["scans"]} == {"dbo.Customers", "dbo.Orders (PK_Orders)"}
+    assert [op["operator"] for op in first["top_operators"]][:2] == ["Sort", "Clustered Index Scan"]
+
+    assert second["statement"].startswith("SELECT CustomerId, COUNT(*)")
+    assert [s["kind"] for s in second["spills"]] == ["SpillToTempDb", "HashSpillDetails"]
+    assert second["spills"][0]["operator"] == "Hash Match"
+    assert second["warnings"] == []
+
+
+def test_top_limits_operators():
+    [stmt] = digest(plan("parallel_key_lookup.xml"), top=2)
+    assert stmt["operators"] == 4
+    assert len(stmt["top_operators"]) == 2
+
+
+def test_utf16_bytes_input():
+    xml = plan("scan_missing_index.xml")
+    assert digest(xml.encode("utf-16")) == digest(xml)
+
+
+def test_plan_cache_expires_and_evicts():
+    cache = PlanDigestCache(max_entries=2, ttl=60)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+
+    cache = PlanDigestCache(max_entries=2, ttl=0.01)
+    cache.put("a", {"n": 1})
+    time.sleep(0.02)
+    assert cache.get("a") is None
@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+from tenacity import wait_none
+
+from mcp_mssql.config import settings
+from mcp_mssql.database import executor as executor_module
+from mcp_mssql.database.executor import QueryExecutor
+from mcp_mssql.database.registry import EngineRegistry, Member, Target, _split_host
+from mcp_mssql.database.resilience import CircuitBreaker
+
+
+def sqlite_member(path, name: str, role: str, breaker: CircuitBreaker | None = None) -> Member:
+    engine = create_engine(f"sqlite:///{path}/{name}.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Who (Name TEXT)"))
+        conn.execute(text("INSERT INTO Who VALUES (:name)"), {"name": name})
+    return Member(name, engine, role, breaker)
+
+
+def down_member(name: str, breaker: CircuitBreaker) -> Member:
+    def connect():
+        raise sqlite3.OperationalError("08001", "[08001] TCP Provider: No connection could be made (10061)")
+    return Member(name, create_engine("sqlite://", creator=connect), "replica", breaker)
+
+
+def who(target: Target, read_only: bool) -> str:
+    with target.connect(read_only) as conn:
+        return conn.execute(text("SELECT Name FROM Who")).scalar()
+
+
+@pytest.fixture
+def target(tmp_path) -> Target:
+    return Target(
+        "Sales",
+        sqlite_member(tmp_path, "primary", "primary"),
+        [sqlite_member(tmp_path, "replica0", "replica"), sqlite_member(tmp_path, "replica1", "replica")],
+        route_reads=True,
+    )
+
+
+def test_reads_spread_over_replicas_and_writes_use_primary(target):
+    reads = [who(target, True) for _ in range(6)]
+    assert sorted(set(reads)) == ["replica0", "replica1"]
+    assert reads.count("replica0") == reads.count("replica1") == 3
+    assert {who(target, False) for _ in range(3)} == {"primary"}
+    assert [m.served for m in target.members] == [3, 3, 3]
+
+
+def test_route_reads_off_keeps_reads_on_primary(target):
+    target.route_reads = False
+    assert {who(target, True) for _ in range(4)} == {"primary"}
+
+
+def test_least_outstanding_replica_is_chosen(target):
+    with target.connect(True) as held:
+        busy = held.execute(text("SELECT Name FROM Who")).scalar()
+        idle = {who(target, True) for _ in range(4)}
+    assert idle == {"replica0", "replica1"} - {busy}
+    assert all(m.outstanding == 0 for m in target.members)
+
+
+def test_failing_replica_is_ejected_and_reads_retry_elsewhere(tmp_path, monkeypatch):
+    monkeypatch.setattr(executor_module, "wait_random_exponential", lambda **_: wait_none())
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60, name="Sales:replica0")
+    target = Target(
+        "Sales",
+        sqlite_member(tmp_path, "primary", "primary"),
+        [down_member("replica0", breaker), sqlite_member(tmp_path, "replica1", "replica")],
+        route_reads=True,
+    )
+    executor = QueryExecutor(registry=EngineRegistry([target]))
+    for _ in range(6):
+        assert executor.execute("SELECT Name FROM Who")["rows"] == [{"Name": "replica1"}]
+    assert breaker.state == CircuitBreaker.OPEN
+    assert target.replicas[0].served == 2
+
+    # Once ejected it is skipped without a connection attempt.
+    assert target.choose(True) is target.replicas[1]
+
+
+def test_reads_fall_back_to_primary_when_every_replica_is_down(tmp_path):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    target = Target("Sales", sqlite_member(tmp_path, "primary", "primary"), [down_member("replica0", breaker)], True)
+    with pytest.raises(Exception):
+        who(target, True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert who(target, True) == "primary"
+
+
+def test_ejected_replica_returns_after_a_successful_probe(tmp_path):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    replica = sqlite_member(tmp_path, "replica0", "replica", breaker)
+    target = Target("Sales", sqlite_member(tmp_path, "primary", "primary"), [replica], True)
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert who(target, True) == "replica0"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_executor_routes_by_statement(target, monkeypatch):
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", True)
+    executor = QueryExecutor(registry=EngineRegistry([target]))
+    assert executor.execute("SELECT Name FROM Who", database="sales")["rows"][0]["Name"].startswith("replica")
+    executor.execute("INSERT INTO Who (Name) VALUES ('written')", database="Sales")
+    with target.primary.engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM Who")).scalar() == 2
+
+
+def test_registry_lookup(target, tmp_path):
+    other = Target("Hr", sqlite_member(tmp_path, "hr", "primary"))
+    registry = EngineRegistry([target, other], default="Sales")
+    assert registry.get() is target
+    assert registry.get("HR") is other
+    assert registry.is_default("sales")
+    assert len(registry.members()) == 4
+    with pytest.raises(ValueError, match="Unknown database 'Nope'"):
+        registry.get("Nope")
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("db2", ("db2", None)),
+    ("db2:14330", ("db2", 14330)),
+    ("db2\\REPORTING", ("db2\\REPORTING", None)),
+])
+def test_split_host(address, expected):
+    assert _split_host(address) == expected
@@ -0,0 +1,158 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import QueuePool
+from tenacity import wait_none
+
+from backends import Dataset, FakeConnection, FakeCursor, FakeDatabase, fake_dbapi_module
+from mcp_mssql.config import settings
+from mcp_mssql.database import executor as executor_module
+from mcp_mssql.database.executor import QueryExecutor
+from mcp_mssql.database.resilience import CONNECTION, FATAL, TRANSIENT, CircuitBreaker, CircuitOpen, classify
+
+dbapi = fake_dbapi_module()
+
+
+def link_failure():
+    return dbapi.OperationalError("08S01", "[08S01] TCP Provider: Communication link failure (10054)")
+
+
+def deadlock():
+    return dbapi.Error("40001", "[40001] Transaction was deadlocked and chosen as the deadlock victim. (1205)")
+
+
+def invalid_object():
+    return dbapi.ProgrammingError("42S02", "[42S02] Invalid object name 'dbo.Nope'. (208)")
+
+
+class Script:
+    # Errors to raise, in order, on connect and on statements against Orders.
+    def __init__(self):
+        self.connect_failures: list = []
+        self.failures: list = []
+        self.executed: list[str] = []
+
+
+class FlakyCursor(FakeCursor):
+    def execute(self, sql: str, params=()):
+        script = self.connection.script
+        if "Orders" in sql:
+            script.executed.append(sql)
+            if script.failures:
+                raise script.failures.pop(0)
+        return super().execute(sql, params)
+
+
+class FlakyConnection(FakeConnection):
+    def __init__(self, database: FakeDatabase, script: Script):
+        super().__init__(database)
+        self.script = script
+
+    def cursor(self):
+        return FlakyCursor(self)
+
+
+@pytest.fixture
+def script() -> Script:
+    return Script()
+
+
+@pytest.fixture
+def make_executor(script, monkeypatch):
+    monkeypatch.setattr(executor_module, "wait_random_exponential", lambda **_: wait_none())
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", True)
+    database = FakeDatabase(Dataset(tables=5, wide_rows=10, tall_rows=10))
+
+    def connect():
+        if script.connect_failures:
+            raise script.connect_failures.pop(0)
+        return FlakyConnection(database, script)
+
+    def build(breaker: CircuitBreaker | None = None) -> QueryExecutor:
+        engine = create_engine("mssql+pyodbc://", module=dbapi, creator=connect, poolclass=QueuePool)
+        return QueryExecutor(engine=engine, breaker=breaker or CircuitBreaker(failure_threshold=10))
+    return build
+
+
+@pytest.mark.parametrize("error, expected", [
+    (link_failure(), CONNECTION),
+    (dbapi.OperationalError("HYT01", "[HYT01] Login timeout expired"), CONNECTION),
+    (dbapi.Error("42000", "[42000] Database 'demo' is not currently available. (40613)"), CONNECTION),
+    (deadlock(), TRANSIENT),
+    (dbapi.Error("HY000", "Snapshot isolation transaction aborted due to update conflict. (3960)"), TRANSIENT),
+    (invalid_object(), FATAL),
+    (dbapi.IntegrityError("23000", "Violation of PRIMARY KEY constraint 'PK_Orders'. (2627)"), FATAL),
+])
+def test_classify(error, expected):
+    assert classify(error) == expected
+    assert classify(DBAPIError(None, None, error)) == expected
+
+
+def test_classify_invalidated_connection():
+    error = DBAPIError(None, None, invalid_object(), connection_invalidated=True)
+    assert classify(error) == CONNECTION
+
+
+def test_read_is_retried_after_link_failure(make_executor, script):
+    executor = make_executor()
+    script.failures = [link_failure()]
+    result = executor.execute("SELECT Id FROM Orders")
+    assert result["row_count"] == 10
+    assert len(script.executed) == 2
+
+
+def test_read_is_retried_after_deadlock(make_executor, script):
+    executor = make_executor()
+    script.failures = [deadlock(), deadlock()]
+    assert executor.execute("SELECT Id FROM Orders")["row_count"] == 10
+    assert len(script.executed) == 3
+
+
+def test_fatal_error_is_not_retried(make_executor, script):
+    executor = make_executor()
+    script.failures = [invalid_object()]
+    with pytest.raises(DBAPIError):
+        executor.execute("SELECT Id FROM Orders")
+    assert len(script.executed) == 1
+
+
+def test_write_is_not_resent_after_link_failure(make_executor, script):
+    executor = make_executor()
+    script.failures = [link_failure()]
+    with pytest.raises(DBAPIError):
+        executor.execute("INSERT INTO Orders (Id) VALUES (1)")
+    assert len(script.executed) == 1
+
+
+@pytest.mark.parametrize("error", [
+    deadlock(),
+    dbapi.Error("HY000", "Snapshot isolation transaction aborted due to update conflict. (3960)"),
+])
+def test_write_is_retried_after_server_rollback(make_executor, script, error):
+    executor = make_executor()
+    script.failures = [error]
+    executor.execute("INSERT INTO Orders (Id) VALUES (1)")
+    assert len(script.executed) == 2
+
+
+def test_write_is_retried_when_connect_fails(make_executor, script):
+    executor = make_executor()
+    script.connect_failures = [link_failure()]
+    result = executor.execute("INSERT INTO Orders (Id) VALUES (1)")
+    assert result["row_count"] == 0
+    assert len(script.executed) == 1
+
+
+def test_breaker_opens_and_fails_fast(make_executor, script, monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_ATTEMPTS", 2)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    executor = make_executor(breaker)
+    script.failures = [link_failure(), link_failure()]
+    with pytest.raises(DBAPIError):
+        executor.execute("SELECT Id FROM Orders")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpen):
+        executor.execute("SELECT Id FROM Orders WHERE Id = 1")
+    assert len(script.executed) == 2
+    assert breaker.stats()["rejected"] == 1
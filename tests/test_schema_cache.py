@@ -0,0 +1,117 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from backends import Dataset, FakeDatabase, fake_engine
+from conftest import wait_for
+from fake_redis import FakeRedis
+from mcp_mssql.config import settings
+from mcp_mssql.database import schema_cache as module
+from mcp_mssql.database.schema_cache import SchemaCache
+
+
+@pytest.fixture
+def redis(monkeypatch) -> FakeRedis:
+    client = FakeRedis()
+    monkeypatch.setattr(module, "_redis", client)
+    monkeypatch.setattr(module, "_redis_ready", True)
+    return client
+
+
+@pytest.fixture
+def database(use_engine) -> FakeDatabase:
+    dataset = Dataset(tables=20)
+    database = FakeDatabase(dataset)
+    use_engine(fake_engine(dataset, database=database))
+    return database
+
+
+def touch(database: FakeDatabase, i: int):
+    schema, name, object_id, _ = database.schema.tables[i]
+    database.schema.tables[i] = (schema, name, object_id, datetime(2025, 1, 1, second=i))
+
+
+def test_l1_serves_reads_without_redis_until_revalidation(redis, database, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_L1_REVALIDATE_SECONDS", 60.0)
+    writer, reader = SchemaCache(), SchemaCache()
+    writer.refresh()
+
+    assert len(reader.get_full_schema()) == 20
+    gets = redis.commands["get"]
+    for _ in range(5):
+        reader.get_full_schema()
+    assert redis.commands["get"] == gets
+
+    # Past the window, a matching version costs one GET and no payload.
+    monkeypatch.setattr(settings, "SCHEMA_L1_REVALIDATE_SECONDS", 0.0)
+    reader.get_full_schema()
+    assert redis.commands["get"] == gets + 1
+
+
+def test_published_version_drops_other_l1(redis, database, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_L1_REVALIDATE_SECONDS", 60.0)
+    writer, reader = SchemaCache(), SchemaCache()
+    assert writer.refresh()["version"] == 1
+    reader.get_full_schema()
+    assert wait_for(lambda: redis.subscribers(reader._CHANNEL) == 2)
+
+    touch(database, 3)
+    assert writer.refresh() == {"mode": "incremental", "changed": 1, "dropped": 0, "tables": 20, "version": 2}
+    assert wait_for(lambda: reader._l1 is None)
+    assert reader._state()["version"] == 2
+
+
+def test_l1_survives_its_own_version(redis, database, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_L1_REVALIDATE_SECONDS", 60.0)
+    cache = SchemaCache()
+    cache.refresh()
+    cache.get_full_schema()
+    assert wait_for(lambda: redis.subscribers(cache._CHANNEL) == 1)
+
+    touch(database, 5)
+    cache.refresh()
+    # Our own publish carries the version already in L1.
+    time.sleep(0.05)
+    assert cache._l1 is not None and cache._l1["version"] == 2
+
+
+def test_changed_tables_are_reloaded_by_id(redis, database):
+    cache = SchemaCache()
+    cache.refresh()
+    key = "{}.{}".format(*database.schema.tables[7][:2])
+    before = cache.get_full_schema()[key]
+
+    touch(database, 7)
+    assert cache.refresh()["changed"] == 1
+    assert cache.get_full_schema()[key] == before
+    assert len(cache.get_full_schema()) == 20
+
+
+def test_unchanged_refresh_keeps_the_stored_state_alive(redis, database, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_CACHE_TTL", 1)
+    cache = SchemaCache()
+    cache.refresh()
+    time.sleep(0.6)
+    assert cache.refresh()["changed"] == 0
+    time.sleep(0.6)
+    assert redis.get(cache._KEY) is not None and redis.get(cache._VERSION_KEY) == b"1"
+
+
+def test_unchanged_refresh_restores_expired_keys_from_l1(redis, database, monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_L1_REVALIDATE_SECONDS", 60.0)
+    cache = SchemaCache()
+    cache.refresh()
+    redis.delete(cache._KEY, cache._VERSION_KEY)
+    assert cache.refresh() == {"mode": "incremental", "changed": 0, "dropped": 0, "tables": 20, "version": 1}
+    assert redis.get(cache._VERSION_KEY) == b"1"
+    assert len(SchemaCache().get_full_schema()) == 20
+
+
+def test_falls_back_to_process_cache_without_redis(database, monkeypatch):
+    monkeypatch.setattr(module, "_redis", None)
+    monkeypatch.setattr(module, "_redis_ready", True)
+    monkeypatch.setattr(module, "_local_cache", {})
+    cache = SchemaCache()
+    assert cache.refresh()["mode"] == "full"
+    assert len(cache.get_full_schema()) == 20
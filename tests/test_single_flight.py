@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+
+from backends import Dataset, fake_engine
+from conftest import wait_for
+from fake_redis import FakeRedis
+from mcp_mssql.database import cancellation
+from mcp_mssql.database.cancellation import QueryCancelled, QueryScope, QueryTimeout
+from mcp_mssql.database.executor import QueryExecutor
+from mcp_mssql.database.single_flight import SingleFlight
+
+
+class Gate:
+    # A call that blocks until released, counting how often it ran.
+    def __init__(self, value="result", error: BaseException | None = None):
+        self.value = value
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def __call__(self):
+        self.runs += 1
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return self.value
+
+
+def follow(flight: SingleFlight, key: str, fn, scope: QueryScope | None = None) -> dict:
+    outcome = {}
+
+    def run():
+        cancellation.bind(scope)
+        try:
+            outcome["result"] = flight.do(key, fn)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    outcome["thread"] = thread
+    return outcome
+
+
+def test_followers_share_the_leader_result():
+    flight = SingleFlight("test")
+    gate = Gate()
+    leader = follow(flight, "k", gate)
+    assert gate.started.wait(2)
+    followers = [follow(flight, "k", gate) for _ in range(3)]
+    assert wait_for(lambda: flight.stats()["followers"] == 3)
+    gate.release.set()
+    for outcome in [leader, *followers]:
+        outcome["thread"].join(2)
+    assert leader["result"] == ("result", False)
+    assert all(f["result"] == ("result", True) for f in followers)
+    assert gate.runs == 1
+
+
+def test_followers_share_the_leader_failure():
+    flight = SingleFlight("test")
+    gate = Gate(error=ValueError("Invalid object name"))
+    leader = follow(flight, "k", gate)
+    assert gate.started.wait(2)
+    follower = follow(flight, "k", gate)
+    assert wait_for(lambda: flight.stats()["followers"] == 1)
+    gate.release.set()
+    leader["thread"].join(2)
+    follower["thread"].join(2)
+    assert isinstance(leader["error"], ValueError)
+    assert follower["error"] is leader["error"]
+    assert gate.runs == 1
+
+
+@pytest.mark.parametrize("error", [QueryCancelled("Query cancelled"), QueryTimeout("Query exceeded its timeout")])
+def test_follower_runs_again_when_the_leader_is_cancelled(error):
+    flight = SingleFlight("test")
+    gate = Gate(error=error)
+    leader = follow(flight, "k", gate)
+    assert gate.started.wait(2)
+    follower = follow(flight, "k", gate)
+    assert wait_for(lambda: flight.stats()["followers"] == 1)
+    gate.release.set()
+    leader["thread"].join(2)
+    follower["thread"].join(2)
+    assert leader["error"] is error
+    assert follower["result"] == ("result", False)
+    assert gate.runs == 2
+
+
+def test_follower_honours_its_own_cancellation():
+    flight = SingleFlight("test")
+    gate = Gate()
+    leader = follow(flight, "k", gate)
+    assert gate.started.wait(2)
+    scope = QueryScope(30)
+    follower = follow(flight, "k", gate, scope)
+    assert wait_for(lambda: flight.stats()["followers"] == 1)
+    scope.cancel()
+    follower["thread"].join(2)
+    assert isinstance(follower["error"], QueryCancelled)
+
+    gate.release.set()
+    leader["thread"].join(2)
+    assert leader["result"] == ("result", False)
+
+
+def test_follower_honours_its_own_timeout():
+    flight = SingleFlight("test")
+    gate = Gate()
+    leader = follow(flight, "k", gate)
+    assert gate.started.wait(2)
+    follower = follow(flight, "k", gate, QueryScope(0.1))
+    follower["thread"].join(2)
+    assert isinstance(follower["error"], QueryTimeout)
+    gate.release.set()
+    leader["thread"].join(2)
+
+
+def test_leader_without_waiters_does_not_publish():
+    redis = FakeRedis()
+    flight = SingleFlight("test", lambda: redis)
+    assert flight.do("k", lambda: {"rows": [1] * 100}) == ({"rows": [1] * 100}, False)
+    # Acquire and a release that checks for waiters: no result encoded or stored.
+    assert redis.commands == {"set": 1, "eval": 1}
+    assert not redis._data
+
+
+def test_result_is_published_to_a_waiting_process():
+    redis = FakeRedis()
+    first, second = SingleFlight("test", lambda: redis), SingleFlight("test", lambda: redis)
+    gate = Gate(value={"rows": [1, 2]})
+    leader = follow(first, "k", gate)
+    assert gate.started.wait(2)
+    follower = follow(second, "k", lambda: pytest.fail("the waiting process ran the call"))
+    assert wait_for(lambda: redis.commands["incr"] == 1)
+    gate.release.set()
+    leader["thread"].join(2)
+    follower["thread"].join(3)
+    assert leader["result"] == ({"rows": [1, 2]}, False)
+    assert follower["result"] == ({"rows": [1, 2]}, True)
+    assert second.stats()["shared_from_other_processes"] == 1
+
+
+def test_executor_coalesces_per_timeout():
+    executor = QueryExecutor(engine=fake_engine(Dataset(tables=2, wide_rows=5, tall_rows=5)))
+    keys = []
+    do = executor.flight.do
+    executor.flight.do = lambda key, fn, load=None: keys.append(key) or do(key, fn, load)
+    executor.execute("SELECT Id FROM Tall", timeout=5)
+    executor.execute("SELECT Id FROM Tall", timeout=30)
+    executor.execute("SELECT Id FROM Tall", timeout=5)
+    assert len(set(keys)) == 2
+    assert keys[0] == keys[2]
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+import pytest
+
+from mcp_mssql.tools.worker_pool import Saturated, WorkerPool
+
+
+def test_cancelled_call_keeps_its_worker_until_it_finishes():
+    pool = WorkerPool(max_workers=1, max_per_client=10, max_queue=10, queue_timeout=0.2)
+    release = threading.Event()
+
+    def stuck():
+        # Ignores cancellation, like a driver call that cannot be interrupted.
+        assert release.wait(5)
+
+    async def scenario():
+        cancelled = asyncio.create_task(pool.run("a", stuck))
+        await asyncio.sleep(0.05)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert pool.stats()["active"] == 1
+        with pytest.raises(Saturated, match="no worker free"):
+            await pool.run("a", lambda: "admitted")
+
+        release.set()
+        for _ in range(100):
+            if pool.stats()["active"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.run("a", lambda: "admitted") == "admitted"
+
+    asyncio.run(scenario())
+    assert pool.stats()["active"] == 0
@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from mcp_mssql.config import settings
+from mcp_mssql.database.executor import QueryExecutor
+from mcp_mssql.database.validator import get_validator
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/writes.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Orders (Id INTEGER PRIMARY KEY, Customer TEXT)"))
+        conn.execute(text("INSERT INTO Orders VALUES (1, 'a'), (2, 'b')"))
+    return engine
+
+
+@pytest.fixture
+def commits(engine) -> list:
+    seen = []
+    event.listen(engine, "commit", lambda conn: seen.append(conn))
+    return seen
+
+
+def stored(engine) -> list[tuple]:
+    with engine.connect() as conn:
+        return list(conn.execute(text("SELECT Id, Customer FROM Orders ORDER BY Id")))
+
+
+@pytest.mark.parametrize("query, kind", [
+    ("SELECT * INTO dbo.Copy FROM dbo.Orders", "SELECT INTO"),
+    ("EXEC dbo.purge_orders", "Execute"),
+    ("EXECUTE dbo.purge_orders @before = '2020-01-01'", "Execute"),
+])
+def test_writes_in_disguise_are_rejected_when_writes_are_off(query, kind, monkeypatch):
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", False)
+    assert get_validator().validate(query) == (False, f"Write operation '{kind}' is disabled")
+
+
+def test_select_into_temp_table_is_not_a_write():
+    assert get_validator().validate("SELECT * INTO #orders FROM dbo.Orders") == (True, "OK")
+
+
+def test_reads_are_never_committed(engine, commits):
+    executor = QueryExecutor(engine=engine)
+    assert executor.execute("SELECT Id FROM Orders")["row_count"] == 2
+    assert executor.execute("SELECT Id FROM Orders WHERE Id = 0")["row_count"] == 0
+    assert commits == []
+
+
+def test_write_without_rows_reports_rows_affected(engine, commits, monkeypatch):
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", True)
+    result = QueryExecutor(engine=engine).execute("UPDATE Orders SET Customer = 'z'")
+    assert result["rows_affected"] == 2
+    assert result["rows"] == []
+    assert len(commits) == 1
+    assert stored(engine) == [(1, "z"), (2, "z")]
+
+
+def test_write_returning_rows_is_committed(engine, commits, monkeypatch):
+    # As INSERT ... OUTPUT would on SQL Server.
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", True)
+    result = QueryExecutor(engine=engine).execute(
+        "INSERT INTO Orders (Id, Customer) VALUES (:id, :customer) RETURNING Id", {"id": 3, "customer": "c"}
+    )
+    assert result["rows"] == [{"Id": 3}]
+    assert "rows_affected" not in result
+    assert len(commits) == 1
+    assert stored(engine) == [(1, "a"), (2, "b"), (3, "c")]
+
+
+def test_write_returning_more_rows_than_max_rows_is_applied_in_full(engine, monkeypatch):
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", True)
+    monkeypatch.setattr(settings, "MAX_ROWS", 1)
+    result = QueryExecutor(engine=engine).execute("UPDATE Orders SET Customer = 'z' RETURNING Id")
+    assert result["truncated"]
+    assert stored(engine) == [(1, "z"), (2, "z")]
+
+
+def test_batches_refuse_select_into(monkeypatch):
+    monkeypatch.setattr(settings, "ALLOW_WRITE_OPERATIONS", True)
+    executor = QueryExecutor(engine=create_engine("sqlite://"))
+    result = executor.execute_batch([("SELECT * INTO dbo.Copy FROM dbo.Orders", None)])
+    assert result["results"][0]["error"] == "Batch queries must be read-only SELECT statements"